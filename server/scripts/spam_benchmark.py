@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+스팸 필터링 추론 경로 마이크로 벤치마크
+실제 모델 대신 작은 랜덤 초기화 RoBERTa와 문자 단위 토크나이저를 임시 디렉토리에 만들어
+네트워크 없이 CPU에서 실행합니다 (CI용). 측정 항목:
+- import: `import spam_check_single` 시간
+- load: load_model_and_tokenizer 시간 (첫 실행 = 변환 포함 cold, 이후 = warm)
+- tokenizer: 텍스트 길이별 토크나이저 처리량
+- predict: 텍스트 길이별 predict_text 지연 시간, 배치 크기별 predict_batch 텍스트당 시간
+측정마다 새 프로세스에서 실행하며, 결과는 JSON으로 저장하고 이전 결과와 비교할 수 있습니다.
+
+사용법:
+    python3 spam_benchmark.py --output bench.json
+    python3 spam_benchmark.py --output new.json --baseline bench.json --threshold 1.25
+SPAM_BACKEND, SPAM_PRECISION, SPAM_NUM_THREADS, SPAM_PADDING 등 환경 변수는 그대로 적용됩니다.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+from spam_runtime import get_option
+from spam_metrics import log
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+TEXT_LENGTHS = (16, 64, 256, 1024)
+BATCH_SIZES = (1, 8, 32)
+SAMPLE_PHRASES = (
+    '2025 전국 생활체육 배드민턴 대회 참가자 모집 안내',
+    '대회 일정과 장소는 추후 공지합니다',
+    'entry fee 20000 won, registration closes on friday',
+    '동호인 누구나 참가 가능하며 시상금이 있습니다',
+)
+
+
+def sample_text(length, seed=0):
+    """길이가 length(문자)인 결정적 예시 텍스트 (seed로 서로 다른 텍스트 생성)"""
+    text = ''
+    i = seed
+    while len(text) < length:
+        text += SAMPLE_PHRASES[i % len(SAMPLE_PHRASES)] + f' {seed} '
+        i += 1
+    return text[:length]
+
+
+def build_stand_in(workdir, hidden_size=64, num_layers=2):
+    """
+    작은 랜덤 RoBERTa와 문자 단위 토크나이저 생성
+    - workdir/model: 토크나이저/config 스냅샷 (SPAM_MODEL_DIR)
+    - workdir/tmp/sport-contest-models: title/describe 체크포인트 (TMPDIR로 CACHE_DIR 지정)
+    """
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaForSequenceClassification
+
+    vocab = {'<s>': 0, '<pad>': 1, '</s>': 2, '<unk>': 3}
+    for ch in 'abcdefghijklmnopqrstuvwxyz0123456789 .,!?:-@/' + ''.join(chr(c) for c in range(0xAC00, 0xD7A4)):
+        vocab.setdefault(ch, len(vocab))
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token='<unk>'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Split('', 'isolated')
+    tokenizer.post_processor = processors.TemplateProcessing(single='<s> $A </s>', special_tokens=[('<s>', 0), ('</s>', 2)])
+
+    model_dir = workdir / 'model'
+    PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, bos_token='<s>', eos_token='</s>', cls_token='<s>', sep_token='</s>',
+        pad_token='<pad>', unk_token='<unk>', model_max_length=512,
+    ).save_pretrained(str(model_dir))
+    config = RobertaConfig(
+        vocab_size=len(vocab), hidden_size=hidden_size, num_hidden_layers=num_layers,
+        num_attention_heads=max(1, hidden_size // 32), intermediate_size=hidden_size * 4,
+        max_position_embeddings=514, pad_token_id=1, bos_token_id=0, eos_token_id=2, num_labels=2,
+    )
+    config.save_pretrained(str(model_dir))
+
+    cache_dir = workdir / 'tmp' / 'sport-contest-models'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for seed, name in enumerate(('spam_model_title.pth', 'spam_model_describe.pth')):
+        torch.manual_seed(seed)
+        torch.save(RobertaForSequenceClassification(config).state_dict(), cache_dir / name)
+
+
+def worker_env(workdir):
+    """벤치마크 프로세스 환경 (임시 모델만 사용, 판정 캐시/사전 필터/다운로드 없음)"""
+    env = dict(os.environ)
+    env.update({
+        'TMPDIR': str(workdir / 'tmp'),
+        'SPAM_MODEL_DIR': str(workdir / 'model'),
+        'SPAM_VERDICT_CACHE': '0',
+        'SPAM_PREFILTER': '0',
+        'SPAM_MODEL_TITLE_URL': 'http://127.0.0.1:9/unavailable',
+        'SPAM_MODEL_DESCRIBE_URL': 'http://127.0.0.1:9/unavailable',
+        'HF_HUB_OFFLINE': '1',
+    })
+    return env
+
+
+def run_worker(name, workdir, repeats):
+    """새 프로세스에서 측정 하나 실행 (결과 JSON)"""
+    completed = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--worker', name, '--workdir', str(workdir), '--repeats', str(repeats)],
+        cwd=str(SCRIPT_DIR), env=worker_env(workdir), stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'{name} 측정 실패: {completed.stderr.decode("utf-8", "replace")[-2000:]}')
+    return json.loads(completed.stdout.decode('utf-8').strip().splitlines()[-1])
+
+
+def percentile(values, q):
+    """q(0~100) 백분위 값 (선형 보간)"""
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def measure_import():
+    start = time.perf_counter()
+    import spam_check_single  # noqa: F401
+    return {'import_seconds': time.perf_counter() - start}
+
+
+def measure_load():
+    import spam_check_single as spam
+    start = time.perf_counter()
+    spam.load_model_and_tokenizer()
+    return {'load_seconds': time.perf_counter() - start}
+
+
+def measure_tokenizer(repeats):
+    import spam_check_single as spam
+    tokenizer = spam.load_tokenizer()
+    results = {}
+    for length in TEXT_LENGTHS:
+        texts = [sample_text(length, seed) for seed in range(64)]
+        tokenizer(texts, truncation=True, max_length=spam.MAX_LEN)  # 워밍업
+        start = time.perf_counter()
+        tokens = 0
+        for _ in range(repeats):
+            encodings = tokenizer(texts, truncation=True, max_length=spam.MAX_LEN)
+            tokens += sum(len(ids) for ids in encodings['input_ids'])
+        elapsed = time.perf_counter() - start
+        results[f'tokenizer.len{length}.texts_per_sec'] = len(texts) * repeats / elapsed
+        results[f'tokenizer.len{length}.tokens_per_sec'] = tokens / elapsed
+    return results
+
+
+def measure_predict(repeats):
+    import spam_check_single as spam
+    spam.load_model_and_tokenizer()
+    results = {}
+
+    for model_type in ('title', 'describe'):
+        spam.predict_text(sample_text(64), model_type)  # 워밍업
+        for length in TEXT_LENGTHS:
+            timings = []
+            for seed in range(repeats):
+                text = sample_text(length, seed)
+                start = time.perf_counter()
+                spam.predict_text(text, model_type)
+                timings.append((time.perf_counter() - start) * 1000)
+            results[f'predict.{model_type}.len{length}.p50_ms'] = percentile(timings, 50)
+            results[f'predict.{model_type}.len{length}.p90_ms'] = percentile(timings, 90)
+
+    for batch_size in BATCH_SIZES:
+        spam.BATCH_SIZE = batch_size
+        texts = [sample_text(TEXT_LENGTHS[1], seed) for seed in range(max(batch_size, 1) * 4)]
+        spam.predict_batch(texts[:batch_size], 'title')  # 워밍업
+        start = time.perf_counter()
+        for _ in range(max(1, repeats // 5)):
+            spam.predict_batch(texts, 'title')
+        elapsed = time.perf_counter() - start
+        results[f'batch.bs{batch_size}.per_text_ms'] = elapsed * 1000 / (len(texts) * max(1, repeats // 5))
+    return results
+
+
+def run_worker_mode(name, repeats):
+    """--worker 모드: 측정 하나를 실행하고 결과를 stdout 마지막 줄에 JSON으로 출력"""
+    if name == 'import':
+        result = measure_import()
+    elif name == 'load':
+        result = measure_load()
+    elif name == 'tokenizer':
+        result = measure_tokenizer(repeats)
+    elif name == 'predict':
+        result = measure_predict(repeats)
+    else:
+        raise ValueError(f'알 수 없는 측정: {name}')
+    print(json.dumps(result), flush=True)
+
+
+def run_benchmark(repeats=20, processes=5, hidden_size=64, num_layers=2):
+    """전체 벤치마크 실행 (결과: {'meta': 실행 환경, 'results': {지표: 값}})"""
+    workdir = Path(tempfile.mkdtemp(prefix='spam-benchmark-'))
+    try:
+        build_stand_in(workdir, hidden_size, num_layers)
+        results = {}
+
+        imports = [run_worker('import', workdir, repeats)['import_seconds'] for _ in range(processes)]
+        results['import.median_seconds'] = statistics.median(imports)
+
+        # 첫 로드는 메모리 매핑 변환이 포함된 cold start
+        results['load.cold_seconds'] = run_worker('load', workdir, repeats)['load_seconds']
+        loads = [run_worker('load', workdir, repeats)['load_seconds'] for _ in range(processes)]
+        results['load.warm_median_seconds'] = statistics.median(loads)
+
+        results.update(run_worker('tokenizer', workdir, repeats))
+        results.update(run_worker('predict', workdir, repeats))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    import torch
+    meta = {
+        'timestamp': time.time(),
+        'machine': platform.node(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'stand_in': {'hidden_size': hidden_size, 'num_layers': num_layers},
+        'repeats': repeats,
+        'env': {key: value for key, value in os.environ.items() if key.startswith('SPAM_')},
+    }
+    return {'meta': meta, 'results': results}
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_sec')
+
+
+def compare(results, baseline, threshold):
+    """
+    기준 결과 대비 threshold배 이상 나빠진 지표 목록
+    (처리량 지표는 낮아질수록, 시간 지표는 높아질수록 나쁨)
+    """
+    regressions = []
+    for metric, value in results.items():
+        base = baseline.get(metric)
+        if not base or not value:
+            continue
+        ratio = base / value if higher_is_better(metric) else value / base
+        if ratio >= threshold:
+            regressions.append({'metric': metric, 'baseline': base, 'current': value, 'ratio': ratio})
+    return regressions
+
+
+def main():
+    worker = get_option('--worker', 'SPAM_BENCHMARK_WORKER')
+    repeats = int(get_option('--repeats', 'SPAM_BENCHMARK_REPEATS', '20'))
+    if worker:
+        run_worker_mode(worker, repeats)
+        return
+
+    report = run_benchmark(
+        repeats=repeats,
+        processes=int(get_option('--processes', 'SPAM_BENCHMARK_PROCESSES', '5')),
+        hidden_size=int(get_option('--hidden-size', 'SPAM_BENCHMARK_HIDDEN_SIZE', '64')),
+        num_layers=int(get_option('--num-layers', 'SPAM_BENCHMARK_NUM_LAYERS', '2')),
+    )
+
+    baseline_path = get_option('--baseline', 'SPAM_BENCHMARK_BASELINE')
+    if baseline_path:
+        baseline = json.loads(Path(baseline_path).read_text(encoding='utf-8'))
+        threshold = float(get_option('--threshold', 'SPAM_BENCHMARK_THRESHOLD', '1.25'))
+        report['regressions'] = compare(report['results'], baseline.get('results', {}), threshold)
+
+    output = get_option('--output', 'SPAM_BENCHMARK_OUTPUT')
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(json.dumps(report, indent=2), flush=True)
+
+    if report.get('regressions'):
+        log('error', f'성능 저하 {len(report["regressions"])}건')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
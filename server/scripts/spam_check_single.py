@@ -5,22 +5,109 @@
 """
 import sys
 import json
+import io
 import os
-import torch
-import urllib.request
+import atexit
+import time
+import hashlib
+import importlib
 import ssl
+import copy
+import random
 import tempfile
+import threading
+
+# import 단계 측정 시작 (numpy/transformers/torch import 포함)
+_IMPORT_START = time.perf_counter()
+
+import numpy as np
 from pathlib import Path
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from concurrent.futures import ThreadPoolExecutor
+from transformers import PreTrainedTokenizerFast
+from spam_runtime import configure_threads, get_option, has_flag, autotune_threads, checkpoint_hash
+from spam_metrics import log, span, observe, increment, snapshot, prometheus_text, write_prometheus
+from spam_download import download_file
+from spam_checkpoint import load_mmap_checkpoint, save_mmap_checkpoint, model_from_checkpoint, model_source, vendor_snapshot
+from spam_precision import resolve_precision, load_converted_model, convert_and_cache_model
+from spam_verdict_cache import VerdictCache
+from spam_fingerprint import FingerprintIndex
+from spam_prefilter import Prefilter, train_prefilter, cascade_report
+from spam_onnx import OnnxClassifier, onnxruntime_available, resolve_onnx_precision, load_onnx_classifier, onnx_model_path, export_onnx
+from spam_pool import fork_available, serve_pool
+from spam_server import serve_http
+from spam_schedule import ScheduledQueue, request_schedule, expired_error, queue_status
+from spam_registry import ModelRegistry, read_manifest, model_entry
+from spam_residency import Residency
+from spam_chunks import validate_chunking, token_limit, split_chunks, spam_probabilities
+from spam_compile import CompiledClassifier, resolve_compile_mode, load_traced_classifier, trace_classifier, compile_classifier, inductor_cache_dir
+
+# torch/transformers 모델 모듈 (ONNX 백엔드에서는 내보내기가 필요할 때만 import_torch()로 로드)
+torch = None
+AutoConfig = None
+AutoTokenizer = None
+
+def import_torch():
+    """torch와 transformers 모델 클래스 로드 (한 번만)"""
+    global torch, AutoConfig, AutoTokenizer
+    if torch is None:
+        torch = importlib.import_module('torch')
+        transformers = importlib.import_module('transformers')
+        AutoConfig = transformers.AutoConfig
+        AutoTokenizer = transformers.AutoTokenizer
+    return torch
+
+def resolve_backend(name):
+    """추론 백엔드 이름 검증 (onnxruntime이 없으면 torch로 대체)"""
+    backend = (name or 'torch').strip().lower()
+    if backend not in ('torch', 'onnx'):
+        raise ValueError(f'알 수 없는 backend: {backend} (가능: torch, onnx)')
+    if backend == 'onnx' and not onnxruntime_available():
+        log('warning', 'onnxruntime이 설치되어 있지 않아 torch 백엔드로 실행합니다')
+        backend = 'torch'
+    return backend
+
+def resolve_backend_precision(backend, name):
+    """백엔드에서 지원하는 추론 정밀도 (onnx는 fp32/int8)"""
+    if backend == 'onnx':
+        return resolve_onnx_precision(name)
+    return resolve_precision(name)
 
 # 설정
 MODEL_NAME = "klue/roberta-base"
+# 토크나이저/config 로컬 스냅샷 (있으면 HF 허브 없이 시작, `spam_check_single.py --vendor-model`로 생성)
+MODEL_DIR = Path(os.environ.get('SPAM_MODEL_DIR', Path(__file__).resolve().parent.parent / 'models' / 'klue-roberta-base'))
 MAX_LEN = 512
 
-# 클라우드 스토리지 URL
+# 필드별 최대 토큰 길이 (제목은 짧으므로 더 작게 설정 가능)
+TITLE_MAX_LEN = int(os.environ.get('SPAM_TITLE_MAX_LEN', MAX_LEN))
+DESCRIBE_MAX_LEN = int(os.environ.get('SPAM_DESCRIBE_MAX_LEN', MAX_LEN))
+
+# 패딩 방식: 'longest' = 입력 길이에 맞춘 동적 패딩, 'max_length' = 기존 방식(최대 길이까지 패딩)
+PADDING = os.environ.get('SPAM_PADDING', 'longest')
+
+# 배치 예측 시 한 번의 forward에 넣을 최대 텍스트 수
+BATCH_SIZE = int(os.environ.get('SPAM_BATCH_SIZE', 32))
+
+# 긴 설명 슬라이딩 윈도우 판정 (--describe-chunks / SPAM_DESCRIBE_CHUNKS)
+# CHUNK_SIZE 토큰보다 긴 설명은 CHUNK_STRIDE 토큰 간격으로 겹치는 조각(최대 CHUNK_MAX개)으로 나눠 판정하고, 한 조각이라도 스팸이면 스팸
+# 조각은 앞에서부터 CHUNKS_PER_PASS개씩 판정하며, 스팸 확률이 CHUNK_EXIT_THRESHOLD 이상인 조각이 나오면 나머지 조각은 판정하지 않음
+DESCRIBE_CHUNKS = has_flag('--describe-chunks', 'SPAM_DESCRIBE_CHUNKS')
+CHUNK_SIZE = min(int(get_option('--chunk-size', 'SPAM_CHUNK_SIZE', str(DESCRIBE_MAX_LEN))), DESCRIBE_MAX_LEN)
+CHUNK_STRIDE = int(get_option('--chunk-stride', 'SPAM_CHUNK_STRIDE', str(CHUNK_SIZE * 3 // 4)))
+CHUNK_MAX = int(get_option('--chunk-max', 'SPAM_CHUNK_MAX', '4'))
+CHUNKS_PER_PASS = int(get_option('--chunks-per-pass', 'SPAM_CHUNKS_PER_PASS', '1'))
+CHUNK_EXIT_THRESHOLD = float(get_option('--chunk-exit-threshold', 'SPAM_CHUNK_EXIT_THRESHOLD', '0.9'))
+if DESCRIBE_CHUNKS:
+    validate_chunking(CHUNK_SIZE, CHUNK_STRIDE, CHUNK_MAX, CHUNKS_PER_PASS, CHUNK_EXIT_THRESHOLD)
 
-MODEL_TITLE_URL = "https://kr1-api-object-storage.nhncloudservice.com/v1/AUTH_691dba506e2740d8bcfca8bca5f8ecc9/sport-contest/model/spam_model_title.pth"
-MODEL_DESCRIBE_URL = "https://kr1-api-object-storage.nhncloudservice.com/v1/AUTH_691dba506e2740d8bcfca8bca5f8ecc9/sport-contest/model/spam_model_describe.pth"
+# 클라우드 스토리지 URL
+MODEL_TITLE_URL = os.environ.get('SPAM_MODEL_TITLE_URL', "https://kr1-api-object-storage.nhncloudservice.com/v1/AUTH_691dba506e2740d8bcfca8bca5f8ecc9/sport-contest/model/spam_model_title.pth")
+MODEL_DESCRIBE_URL = os.environ.get('SPAM_MODEL_DESCRIBE_URL', "https://kr1-api-object-storage.nhncloudservice.com/v1/AUTH_691dba506e2740d8bcfca8bca5f8ecc9/sport-contest/model/spam_model_describe.pth")
+# 다운로드 검증용 SHA-256 (선택, 없으면 크기와 ETag로만 검증)
+MODEL_SHA256 = {
+    MODEL_TITLE_URL: os.environ.get('SPAM_MODEL_TITLE_SHA256'),
+    MODEL_DESCRIBE_URL: os.environ.get('SPAM_MODEL_DESCRIBE_SHA256'),
+}
 
 # 로컬 캐시 디렉토리
 CACHE_DIR = Path(tempfile.gettempdir()) / 'sport-contest-models'
@@ -28,151 +115,642 @@ CACHE_DIR.mkdir(parents=True, exist_ok=True)
 MODEL_TITLE_PATH = CACHE_DIR / 'spam_model_title.pth'
 MODEL_DESCRIBE_PATH = CACHE_DIR / 'spam_model_describe.pth'
 
+# 추론 백엔드: torch(기본) 또는 onnx (--backend / SPAM_BACKEND)
+# onnx는 체크포인트 해시에 맞는 ONNX 파일이 있으면 torch를 import하지 않음 (없으면 최초 1회 내보내기)
+BACKEND = resolve_backend(get_option('--backend', 'SPAM_BACKEND', 'torch'))
+if BACKEND == 'torch':
+    import_torch()
+
 # CPU 모드 강제 (메모리 부족 방지)
-device = torch.device("cpu")
+device = "cpu"
+
+# CPU 스레드 설정 (기본 1개: 메모리 절약)
+# --num-threads / SPAM_NUM_THREADS: 정수, auto(코어 수), tune(자동 튜닝, torch 백엔드만)
+# --num-interop-threads / SPAM_NUM_INTEROP_THREADS: 정수, auto
+NUM_THREADS, NUM_INTEROP_THREADS = configure_threads(use_torch=BACKEND == 'torch')
+THREAD_TUNING_PATH = CACHE_DIR / 'thread_tuning.json'
+TUNING_SAMPLE_TEXT = '2025 전국 생활체육 배드민턴 대회 참가자 모집 안내'
+
+# title/describe 모델 forward를 동시에 실행 (--parallel-models / SPAM_PARALLEL_MODELS=1)
+PARALLEL_MODELS = has_flag('--parallel-models', 'SPAM_PARALLEL_MODELS')
+
+# 추론 정밀도: fp32(기본), int8(Linear 동적 양자화), bf16 (--precision / SPAM_PRECISION, onnx는 fp32/int8)
+PRECISION = resolve_backend_precision(BACKEND, get_option('--precision', 'SPAM_PRECISION', 'fp32'))
+
+# torch 백엔드 컴파일 실행 경로 (--compile / SPAM_COMPILE): off(기본), trace(TorchScript, 체크포인트 해시/torch 버전별로 디스크에 저장), inductor(torch.compile)
+# 상주 모드는 시작 시 길이 버킷별 입력 모양을 WARMUP_BATCH_SIZES 배치 크기로 미리 실행 (--warmup-batch-sizes / SPAM_WARMUP_BATCH_SIZES, 쉼표 구분)
+COMPILE_MODE = resolve_compile_mode(get_option('--compile', 'SPAM_COMPILE', 'off'))
+WARMUP_BATCH_SIZES = tuple(int(size) for size in get_option('--warmup-batch-sizes', 'SPAM_WARMUP_BATCH_SIZES', '1').split(',') if size.strip())
+
+# 모델 레지스트리 manifest (--registry / SPAM_MODEL_REGISTRY, 형식은 spam_registry 참고)
+# 있으면 active 모델의 체크포인트/백엔드/정밀도를 사용하고, 상주 모드는 REGISTRY_POLL초마다 변경을 확인해 무중단 교체
+REGISTRY_PATH = Path(get_option('--registry', 'SPAM_MODEL_REGISTRY', str(Path(__file__).resolve().parent.parent / 'models' / 'registry.json')))
+REGISTRY_POLL = float(get_option('--registry-poll', 'SPAM_REGISTRY_POLL', '10'))
+# 섀도 판정 대기 작업 수 상한 (넘으면 표본을 버림, 서비스 지연 시간에 영향을 주지 않도록)
+SHADOW_MAX_PENDING = int(os.environ.get('SPAM_SHADOW_MAX_PENDING', 4))
+
+# 레지스트리가 없을 때의 모델 버전 (위 설정 그대로)
+_default_entry = {
+    'id': 'default',
+    'backend': BACKEND,
+    'precision': PRECISION,
+    'title': {'url': MODEL_TITLE_URL, 'path': str(MODEL_TITLE_PATH), 'sha256': MODEL_SHA256[MODEL_TITLE_URL]},
+    'describe': {'url': MODEL_DESCRIBE_URL, 'path': str(MODEL_DESCRIBE_PATH), 'sha256': MODEL_SHA256[MODEL_DESCRIBE_URL]},
+}
+# 현재 서비스 중인 모델 버전
+_active_entry = _default_entry
+
+def registry_entry(manifest, version):
+    """레지스트리 manifest의 모델 버전 (생략된 백엔드/정밀도는 프로세스 설정, 다운로드 검증용 해시 등록)"""
+    entry = model_entry(manifest, version, REGISTRY_PATH, CACHE_DIR)
+    entry['backend'] = resolve_backend(entry['backend'] or _default_entry['backend'])
+    entry['precision'] = resolve_backend_precision(entry['backend'], entry['precision'] or _default_entry['precision'])
+    for model_type in ('title', 'describe'):
+        source = entry[model_type]
+        if source['url'] and source['sha256']:
+            MODEL_SHA256[source['url']] = source['sha256']
+    return entry
+
+def apply_model_entry(entry):
+    """모델 버전의 체크포인트 위치/백엔드/정밀도를 전역 설정에 반영 (이미 로드된 모델 객체는 바꾸지 않음)"""
+    global MODEL_TITLE_URL, MODEL_DESCRIBE_URL, MODEL_TITLE_PATH, MODEL_DESCRIBE_PATH, BACKEND, PRECISION, TENSOR_TYPE, _active_entry
+    MODEL_TITLE_URL, MODEL_TITLE_PATH = entry['title']['url'], Path(entry['title']['path'])
+    MODEL_DESCRIBE_URL, MODEL_DESCRIBE_PATH = entry['describe']['url'], Path(entry['describe']['path'])
+    BACKEND, PRECISION = entry['backend'], entry['precision']
+    # 토크나이저 출력 형식 (torch: 텐서, onnx: numpy 배열)
+    TENSOR_TYPE = 'np' if BACKEND == 'onnx' else 'pt'
+    if BACKEND == 'torch' and torch is None:
+        # onnx로 시작한 프로세스가 torch 모델로 바뀌면 torch 스레드 수도 같은 설정으로 맞춤
+        import_torch()
+        configure_threads(use_torch=True)
+    _active_entry = entry
 
-# 메모리 최적화 설정
-torch.set_num_threads(1)  # 단일 스레드 사용
-if hasattr(torch, 'set_num_interop_threads'):
-    torch.set_num_interop_threads(1)
+_manifest = read_manifest(REGISTRY_PATH)
+apply_model_entry(registry_entry(_manifest, _manifest['active']) if _manifest else _default_entry)
 
-# 전역 변수로 모델과 토크나이저 저장 (한 번만 로드)
+# 판정 캐시 (CACHE_DIR/verdict_cache.sqlite3, 여러 프로세스 공유)
+# SPAM_VERDICT_CACHE=0이면 사용하지 않음, SPAM_VERDICT_CACHE_SIZE: 최대 항목 수
+VERDICT_CACHE_ENABLED = os.environ.get('SPAM_VERDICT_CACHE', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+VERDICT_CACHE_PATH = CACHE_DIR / 'verdict_cache.sqlite3'
+VERDICT_CACHE_SIZE = int(os.environ.get('SPAM_VERDICT_CACHE_SIZE', 100000))
+
+# 스팸 유사 문서 지문 색인 (--fingerprint / SPAM_FINGERPRINT, 형식은 spam_fingerprint 참고)
+# 모델이 스팸으로 판정한 텍스트와 추정 Jaccard 유사도가 FINGERPRINT_THRESHOLD 이상이면 모델 없이 스팸
+# 항목은 마지막 적중 후 FINGERPRINT_MAX_AGE_DAYS일이 지나거나 FINGERPRINT_MAX_ENTRIES개를 넘으면 오래된 것부터 삭제
+FINGERPRINT_ENABLED = has_flag('--fingerprint', 'SPAM_FINGERPRINT')
+FINGERPRINT_THRESHOLD = float(get_option('--fingerprint-threshold', 'SPAM_FINGERPRINT_THRESHOLD', '0.8'))
+FINGERPRINT_PATH = CACHE_DIR / 'spam_fingerprints.sqlite3'
+FINGERPRINT_MAX_ENTRIES = int(os.environ.get('SPAM_FINGERPRINT_MAX_ENTRIES', 1000000))
+FINGERPRINT_MAX_AGE_DAYS = float(os.environ.get('SPAM_FINGERPRINT_MAX_AGE_DAYS', 30))
+FINGERPRINT_MIN_LENGTH = int(os.environ.get('SPAM_FINGERPRINT_MIN_LENGTH', 20))
+
+# 사전 필터 캐스케이드 (--prefilter / SPAM_PREFILTER=1, 학습: --train-prefilter)
+# 스팸 확률이 PREFILTER_LOW 이하면 정상, PREFILTER_HIGH 이상이면 스팸으로 바로 판정하고 나머지만 트랜스포머로 판정
+PREFILTER_ENABLED = has_flag('--prefilter', 'SPAM_PREFILTER')
+PREFILTER_LOW = float(get_option('--prefilter-low', 'SPAM_PREFILTER_LOW', '0.05'))
+PREFILTER_HIGH = float(get_option('--prefilter-high', 'SPAM_PREFILTER_HIGH', '0.95'))
+PREFILTER_DIR = Path(get_option('--prefilter-dir', 'SPAM_PREFILTER_DIR', str(Path(__file__).resolve().parent.parent / 'models')))
+
+# 전역 변수로 모델과 토크나이저 저장 (각각 최초 사용 시 한 번만 로드)
 _model_title = None
 _model_describe = None
 _tokenizer = None
+_verdict_cache = None
+_fingerprint_index = None
+_model_ids = {}
+_prefilters = {}
+_registry = None
+# 섀도 모델 {"id", "sample_rate", "entry", "models": {model_type: 모델}} (manifest에 shadow가 있을 때만)
+_shadow = None
+_shadow_tokenizer = None
+_shadow_executor = None
+_shadow_pending = 0
+_shadow_lock = threading.Lock()
+
+# 단계별 시간/카운터 덤프 (serve 모드에서 METRICS_INTERVAL초마다 Prometheus 텍스트 파일로 저장, 일회성 실행은 --metrics로 stderr 출력)
+METRICS_FILE = get_option('--metrics-file', 'SPAM_METRICS_FILE')
+METRICS_INTERVAL = float(get_option('--metrics-interval', 'SPAM_METRICS_INTERVAL', '15'))
+PRINT_METRICS = has_flag('--metrics', 'SPAM_METRICS')
+_metrics_written = 0.0
+_metrics_labels = {}
+
+# 모델 상주 관리 (serve/--listen 모드, 워커 풀에서는 사용 안 함)
+# MODEL_IDLE_TTL초 동안 쓰지 않은 모델/토크나이저는 내리고 다음 요청에서 다시 로드, 상주 모델 크기 합이 MEMORY_BUDGET_MB를 넘으면 오래 쓰지 않은 모델부터 내림
+# 둘 다 0(기본)이면 한 번 로드한 모델을 계속 상주
+MODEL_IDLE_TTL = float(get_option('--model-idle-ttl', 'SPAM_MODEL_IDLE_TTL', '0'))
+MEMORY_BUDGET_MB = float(get_option('--memory-budget-mb', 'SPAM_MEMORY_BUDGET_MB', '0'))
+_residency = None
+
+# serve 모드 워커 프로세스 수 (--workers / SPAM_SERVE_WORKERS, 2 이상이면 모델을 한 번 로드한 부모가 fork한 워커 풀로 처리)
+SERVE_WORKERS = int(get_option('--workers', 'SPAM_SERVE_WORKERS', '1'))
+
+# 네트워크 서버 모드 (--listen [주소] / SPAM_LISTEN, 'host:port' 또는 'unix:/경로')
+# 요청을 큐에 모아 SERVER_MAX_BATCH개가 차거나 SERVER_MAX_WAIT_MS가 지나면 한 번에 배치 예측, 큐가 SERVER_MAX_QUEUE개면 503
+LISTEN_ADDRESS = get_option('--listen', 'SPAM_LISTEN', '127.0.0.1:8765')
+SERVER_MAX_BATCH = int(get_option('--max-batch', 'SPAM_SERVER_MAX_BATCH', str(BATCH_SIZE)))
+SERVER_MAX_WAIT_MS = float(get_option('--max-wait-ms', 'SPAM_SERVER_MAX_WAIT_MS', '5'))
+SERVER_MAX_QUEUE = int(get_option('--max-queue', 'SPAM_SERVER_MAX_QUEUE', '1024'))
+
+observe('import', time.perf_counter() - _IMPORT_START)
+
+class ModelLoadError(Exception):
+    """
+    모델/토크나이저 로드 실패
+    상주 모드(serve, --listen, 레지스트리 교체)에서는 요청 오류로 처리하고, 프로세스 종료는 스크립트 진입점에서만
+    """
 
 def download_and_cache_model(model_url, cache_path, model_name):
-    """오브젝트 스토리지에서 모델을 다운로드하고 로컬에 캐싱"""
+    """오브젝트 스토리지에서 모델을 다운로드하고 로컬에 캐싱 (스트리밍/이어받기/검증은 spam_download 참고)"""
     try:
-        # 이미 캐시된 파일이 있으면 그것을 사용
-        if cache_path.exists():
-            print(json.dumps({'info': f'{model_name} 모델 캐시에서 로딩 중...'}), file=sys.stderr, flush=True)
-            loaded_data = torch.load(cache_path, map_location='cpu')
-            print(json.dumps({'info': f'{model_name} 모델 캐시 로딩 완료'}), file=sys.stderr, flush=True)
-            return loaded_data
-        
-        # 캐시가 없으면 다운로드
-        print(json.dumps({'info': f'{model_name} 모델 다운로드 중... (최초 1회)'}), file=sys.stderr, flush=True)
-        
-        # SSL 인증서 검증 우회
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
+        if not cache_path.exists():
+            # SSL 인증서 검증 우회
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+            with span('download', model_name.lower()):
+                download_file(model_url, cache_path, model_name, ssl_context, MODEL_SHA256.get(model_url))
+
+        log('info', f'{model_name} 모델 캐시에서 로딩 중...')
+        # 원본은 전체 모델(pickle)일 수 있으므로 weights_only=False (자체 오브젝트 스토리지 파일)
+        loaded_data = torch.load(cache_path, map_location='cpu', weights_only=False)
+        log('info', f'{model_name} 모델 캐시 로딩 완료')
+        return loaded_data
         
-        # urlopen으로 다운로드 (context 매개변수 호환성 문제 해결)
-        with urllib.request.urlopen(model_url, context=ssl_context) as response:
-            # 파일 크기 확인
-            file_size = response.headers.get('Content-Length')
-            if file_size:
-                file_size_mb = int(file_size) / (1024 * 1024)
-                print(json.dumps({'info': f'{model_name} 모델 크기: {file_size_mb:.2f} MB'}), file=sys.stderr, flush=True)
-            
-            # 청크 단위로 다운로드 (진행 상황 표시)
-            chunk_size = 8192  # 8KB
-            downloaded = 0
-            chunks = []
-            
-            while True:
-                chunk = response.read(chunk_size)
-                if not chunk:
-                    break
-                chunks.append(chunk)
-                downloaded += len(chunk)
-                
-                # 10MB마다 진행 상황 출력
-                if downloaded % (10 * 1024 * 1024) < chunk_size:
-                    downloaded_mb = downloaded / (1024 * 1024)
-                    print(json.dumps({'info': f'{model_name} 다운로드 진행: {downloaded_mb:.2f} MB'}), file=sys.stderr, flush=True)
-            
-            model_data = b''.join(chunks)
-            print(json.dumps({'info': f'{model_name} 다운로드 완료: {downloaded / (1024 * 1024):.2f} MB'}), file=sys.stderr, flush=True)
+    except Exception as e:
+        error_msg = f'{model_name} 모델 로드 오류: {str(e)}'
+        log('error', error_msg)
+        raise ModelLoadError(error_msg) from e
+
+def load_tokenizer():
+    """토크나이저 로드 (최초 호출 시 한 번만, 상주 관리자가 내렸으면 다시 로드)"""
+    global _tokenizer
+    
+    # 상주 관리 스레드가 전역 참조를 지울 수 있으므로 지역 변수로 받아서 반환
+    tokenizer = _tokenizer
+    if tokenizer is not None:
+        get_residency().touch('tokenizer')
+        return tokenizer
+    
+    try:
+        source, local = model_source(MODEL_DIR, MODEL_NAME)
+        with span('load', 'tokenizer'):
+            if BACKEND == 'onnx':
+                # AutoTokenizer는 torch를 import하므로 tokenizer.json 기반 fast 토크나이저를 직접 사용
+                tokenizer = PreTrainedTokenizerFast.from_pretrained(source, local_files_only=local)
+            else:
+                tokenizer = AutoTokenizer.from_pretrained(source, local_files_only=local)
+    except Exception as tokenizer_error:
+        error_msg = f'토크나이저 로드 오류: {str(tokenizer_error)}'
+        log('error', error_msg)
+        raise ModelLoadError(error_msg) from tokenizer_error
+    
+    _tokenizer = tokenizer
+    get_residency().loaded('tokenizer')
+    return tokenizer
+
+def load_model_config():
+    """state_dict 체크포인트의 모델 골격 config (로컬 스냅샷 우선, 라벨 2개)"""
+    source, local = model_source(MODEL_DIR, MODEL_NAME)
+    return AutoConfig.from_pretrained(source, num_labels=2, local_files_only=local).to_dict()
+
+def build_model(model_url, cache_path, model_name, precision=None, backend=None):
+    """
+    BACKEND 설정에 맞는 추론용 모델 생성
+    precision/backend를 생략하면 PRECISION/BACKEND 설정 사용
+    """
+    precision = precision or PRECISION
+    if (backend or BACKEND) == 'onnx':
+        return build_onnx_model(model_url, cache_path, model_name, precision)
+    if COMPILE_MODE != 'off':
+        return build_compiled_model(model_url, cache_path, model_name, precision)
+    return build_torch_model(model_url, cache_path, model_name, precision)
+
+def build_onnx_model(model_url, cache_path, model_name, precision):
+    """
+    ONNX Runtime 모델 생성
+    체크포인트 해시에 맞는 ONNX 파일이 있으면 torch 없이 로드하고, 없으면 PyTorch 모델에서 최초 1회 내보내기
+    ONNX 준비에 실패하면 PyTorch 모델로 대체
+    """
+    try:
+        model = load_onnx_classifier(cache_path, precision, NUM_THREADS, NUM_INTEROP_THREADS)
+        if model is not None:
+            log('info', f'{model_name} ONNX 모델 로딩 완료 ({model.path.name})')
+            return model
         
-        # 파일로 저장
-        print(json.dumps({'info': f'{model_name} 파일 저장 중...'}), file=sys.stderr, flush=True)
-        with open(cache_path, 'wb') as f:
-            f.write(model_data)
-        print(json.dumps({'info': f'{model_name} 파일 저장 완료'}), file=sys.stderr, flush=True)
+        log('info', f'{model_name} 모델 ONNX 내보내기 중... (최초 1회)')
+        torch_model = None
+        if not cache_path.exists() or not onnx_model_path(cache_path, 'fp32').exists():
+            torch_model = build_torch_model(model_url, cache_path, model_name, 'fp32')
+        onnx_path = export_onnx(torch_model, cache_path, precision)
+        del torch_model
+        log('info', f'{model_name} 모델 ONNX 내보내기 완료 ({onnx_path.name})')
+        return OnnxClassifier(onnx_path, NUM_THREADS, NUM_INTEROP_THREADS)
+    except Exception as e:
+        log('warning', f'{model_name} ONNX 모델 준비 실패, PyTorch로 대체합니다: {str(e)}')
+        return build_torch_model(model_url, cache_path, model_name, precision)
+
+def build_compiled_model(model_url, cache_path, model_name, precision):
+    """
+    컴파일 실행 경로 모델 생성 (COMPILE_MODE)
+    trace: 체크포인트 해시/torch 버전에 맞는 TorchScript 파일이 있으면 eager 모델 없이 로드하고, 없으면 최초 1회 trace해서 저장
+    inductor: eager 모델을 torch.compile (실제 컴파일은 워밍업/첫 실행 시, 결과는 CACHE_DIR의 inductor 캐시에 저장)
+    컴파일에 실패하면 eager 모델로 대체
+    """
+    import_torch()
+    if COMPILE_MODE == 'trace':
+        model = load_traced_classifier(cache_path, precision, MAX_LEN)
+        if model is not None:
+            log('info', f'{model_name} TorchScript 모델 로딩 완료 ({model.path.name})')
+            return model
+    
+    eager_model = build_torch_model(model_url, cache_path, model_name, precision)
+    try:
+        if COMPILE_MODE == 'trace':
+            log('info', f'{model_name} 모델 TorchScript trace 중... (최초 1회)')
+            model = trace_classifier(eager_model, cache_path, precision, MAX_LEN)
+            log('info', f'{model_name} 모델 TorchScript 저장 완료 ({model.path.name})')
+            return model
+        return compile_classifier(eager_model, MAX_LEN, inductor_cache_dir(CACHE_DIR))
+    except Exception as e:
+        log('warning', f'{model_name} 모델 컴파일 실패, eager 모드로 실행합니다: {str(e)}')
+        return eager_model
+
+def build_torch_model(model_url, cache_path, model_name, precision):
+    """
+    체크포인트(state_dict 또는 전체 모델)로부터 PyTorch 추론 모델 생성
+    precision이 fp32가 아니면 저장된 변환본을 우선 사용
+    """
+    import_torch()
+    try:
+        if precision != 'fp32':
+            model = load_converted_model(cache_path, precision)
+            if model is not None:
+                log('info', f'{model_name} 모델 {precision} 변환본 로딩 완료')
+                return model
         
-        # 다운로드한 파일 로드
-        loaded_data = torch.load(cache_path, map_location='cpu')
+        # 변환된 체크포인트가 있으면 원본 pickle을 읽지 않고 메모리 매핑으로 로드
+        checkpoint = load_mmap_checkpoint(cache_path) if cache_path.exists() else None
+        if checkpoint is None:
+            loaded_data = download_and_cache_model(model_url, cache_path, model_name)
+            log('info', f'{model_name} 모델 메모리 매핑 형식으로 변환 중... (최초 1회)')
+            # state_dict 방식은 골격 config를 함께 저장 (전체 모델 방식은 모델의 config 사용)
+            config = load_model_config() if isinstance(loaded_data, dict) else None
+            checkpoint = save_mmap_checkpoint(loaded_data, cache_path, config)
+        else:
+            log('info', f'{model_name} 모델 메모리 매핑 로딩 완료')
         
-        print(json.dumps({'info': f'{model_name} 모델 다운로드 및 캐싱 완료'}), file=sys.stderr, flush=True)
-        return loaded_data
+        if checkpoint is None:
+            # HF 모델이 아닌 전체 모델 (골격을 다시 만들 수 없으므로 그대로 사용)
+            model = loaded_data
+        else:
+            # config로 빈 골격을 만들고 체크포인트 가중치를 바로 연결 (사전학습 가중치 로드/랜덤 초기화 없음)
+            state_dict, config = checkpoint
+            model = model_from_checkpoint(state_dict, config or load_model_config())
+            
+        model.to(device)
+        model.eval()
         
+        if precision != 'fp32':
+            log('info', f'{model_name} 모델 {precision} 변환 중... (최초 1회)')
+            model = convert_and_cache_model(model, cache_path, precision)
+        return model
     except Exception as e:
+        if isinstance(e, ModelLoadError):
+            raise
         error_msg = f'{model_name} 모델 로드 오류: {str(e)}'
-        print(json.dumps({'error': error_msg}), file=sys.stderr, flush=True)
-        raise Exception(error_msg)
+        log('error', error_msg)
+        raise ModelLoadError(error_msg) from e
 
-def load_model_and_tokenizer():
-    """모델과 토크나이저 로드"""
+def load_model(model_type):
+    """
+    model_type에 해당하는 모델만 로드 (최초 사용 시 한 번만, 상주 관리자가 내렸으면 다시 로드)
+    model_type: 'title' 또는 'describe'
+    """
+    global _model_title, _model_describe
+    
+    # 상주 관리 스레드가 전역 참조를 지울 수 있으므로 지역 변수로 받아서 반환
+    model = _model_title if model_type == 'title' else _model_describe
+    if model is not None:
+        get_residency().touch(model_type)
+        return model
+    
+    with span('load', model_type):
+        if model_type == 'title':
+            model = _model_title = build_model(MODEL_TITLE_URL, MODEL_TITLE_PATH, 'Title')
+        else:
+            model = _model_describe = build_model(MODEL_DESCRIBE_URL, MODEL_DESCRIBE_PATH, 'Describe')
+    get_residency().loaded(model_type, model)
+    return model
+
+def unload_resident(name):
+    """상주 관리자가 내린 모델/토크나이저의 전역 참조 해제 (다음 사용 시 다시 로드)"""
     global _model_title, _model_describe, _tokenizer
     
-    if _model_title is not None and _model_describe is not None and _tokenizer is not None:
-        return _model_title, _model_describe, _tokenizer
+    if name == 'title':
+        _model_title = None
+    elif name == 'describe':
+        _model_describe = None
+    elif name == 'tokenizer':
+        _tokenizer = None
+
+def get_residency():
+    """모델 상주 관리자 (MODEL_IDLE_TTL/MEMORY_BUDGET_MB가 0이면 크기/로드 횟수만 기록)"""
+    global _residency
+    
+    if _residency is None:
+        _residency = Residency(MODEL_IDLE_TTL, MEMORY_BUDGET_MB * 1024 * 1024, unload_resident)
+    return _residency
+
+def load_model_and_tokenizer():
+    """모델 두 개와 토크나이저를 모두 로드 (예측 경로는 load_model로 필요한 모델만 로드)"""
+    tokenizer = load_tokenizer()
+    return load_model('title'), load_model('describe'), tokenizer
+
+def warm_up_model(model, model_type):
+    """컴파일된 모델이면 길이 버킷별 입력 모양을 미리 실행 (첫 요청이 최적화/컴파일을 기다리지 않도록)"""
+    if not isinstance(model, CompiledClassifier):
+        return
+    with span('warmup', model_type):
+        elapsed = model.warm_up(get_max_len(model_type), WARMUP_BATCH_SIZES)
+    log('info', f'{model_type} 모델 워밍업 완료 ({elapsed:.2f}초)', mode=model.mode, batch_sizes=list(WARMUP_BATCH_SIZES))
+
+def warm_up_models():
+    """상주 모드 시작 시 실행: 컴파일 모드면 두 모델을 모두 로드해서 워밍업"""
+    if COMPILE_MODE == 'off' or BACKEND != 'torch':
+        return
+    for model_type in ('title', 'describe'):
+        warm_up_model(load_model(model_type), model_type)
+
+def apply_thread_tuning(force=False):
+    """NUM_THREADS가 tune이거나 force면 대표 입력으로 스레드 수 자동 튜닝"""
+    if NUM_THREADS != 'tune' and not force:
+        return None
+    if BACKEND != 'torch':
+        log('warning', '스레드 자동 튜닝은 torch 백엔드에서만 지원합니다')
+        return None
+    return autotune_threads(lambda: predict_logits(TUNING_SAMPLE_TEXT, 'title'), THREAD_TUNING_PATH, force=force)
+
+def normalize_text(text):
+    """예측 입력을 str로 정규화 (None이나 공백뿐이면 빈 문자열)"""
+    if text is None:
+        return ''
+    
+    # 문자열로 변환
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', errors='replace')
+    elif not isinstance(text, str):
+        text = str(text)
     
+    # 공백 제거
+    return text.strip()
+
+def forward_logits(model, input_ids, attention_mask):
+    """백엔드에 맞게 forward 실행 (ONNX: numpy 배열, PyTorch: 텐서 logits 반환)"""
+    if isinstance(model, (OnnxClassifier, CompiledClassifier)):
+        return model(input_ids, attention_mask)
+    with torch.no_grad():
+        return model(
+            input_ids=torch.as_tensor(input_ids).to(device),
+            attention_mask=torch.as_tensor(attention_mask).to(device),
+        ).logits
+
+def logits_to_numpy(logits):
+    """logits를 float32 numpy 배열로 변환 (백엔드/정밀도 간 비교용)"""
+    if isinstance(logits, np.ndarray):
+        return logits.astype(np.float32)
+    return logits.detach().float().cpu().numpy()
+
+def get_max_len(model_type):
+    """필드별 최대 토큰 길이"""
+    return TITLE_MAX_LEN if model_type == 'title' else DESCRIBE_MAX_LEN
+
+def encode_text(tokenizer, text, max_len, padding):
+    """
+    텍스트를 모델 입력 텐서로 변환
+    padding: 'longest' (입력 길이에 맞춤) 또는 'max_length' (max_len까지 패딩)
+    """
+    # tokenizer 호출 - 여러 방법 시도 (TextEncodeInput 오류 방지)
     try:
+        # 방법 1: 기본 방법
+        return tokenizer(
+            text,
+            add_special_tokens=True,
+            max_length=max_len,
+            padding=padding,
+            truncation=True,
+            return_tensors=TENSOR_TYPE,
+            return_attention_mask=True,
+        )
+    except (TypeError, ValueError) as tokenize_error:
+        error_msg = str(tokenize_error)
         
-        # 토크나이저 로드
-        try:
-            _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-        except Exception as tokenizer_error:
-            error_msg = f'토크나이저 로드 오류: {str(tokenizer_error)}'
-            print(json.dumps({'error': error_msg}), file=sys.stderr, flush=True)
-            sys.exit(1)
-        
-        # Title 모델 로드 (로컬 캐시 사용)
-        try:
-            loaded_data = download_and_cache_model(MODEL_TITLE_URL, MODEL_TITLE_PATH, 'Title')
-            
-            if isinstance(loaded_data, dict):
-                # state_dict 방식
-                _model_title = AutoModelForSequenceClassification.from_pretrained(
-                    MODEL_NAME, 
-                    num_labels=2
+        # TextEncodeInput 오류가 아니면 그대로 전달
+        if 'TextEncodeInput' not in error_msg and 'must be Union' not in error_msg:
+            raise
+    
+    try:
+        # 방법 2: encode_plus 사용
+        return tokenizer.encode_plus(
+            text,
+            add_special_tokens=True,
+            max_length=max_len,
+            padding=padding,
+            truncation=True,
+            return_tensors=TENSOR_TYPE,
+            return_attention_mask=True,
+        )
+    except Exception:
+        pass
+    
+    # 방법 3: encode 후 수동 처리
+    encoded = tokenizer.encode(
+        text,
+        add_special_tokens=True,
+        max_length=max_len,
+        truncation=True,
+    )[:max_len]
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+    attention = [1] * len(encoded)
+    if padding == 'max_length' and len(encoded) < max_len:
+        attention = attention + [0] * (max_len - len(encoded))
+        encoded = encoded + [pad_token_id] * (max_len - len(encoded))
+    
+    return {
+        'input_ids': np.array([encoded], dtype=np.int64),
+        'attention_mask': np.array([attention], dtype=np.int64),
+    }
+
+def predict_logits(text, model_type='title', padding=None, max_len=None):
+    """
+    정규화된 텍스트 하나의 logits([1, 2] 텐서 또는 numpy 배열) 계산
+    padding/max_len을 생략하면 PADDING과 필드별 최대 길이 설정을 사용
+    """
+    padding = padding or PADDING
+    max_len = max_len or get_max_len(model_type)
+    
+    tokenizer = load_tokenizer()
+    # 사용할 모델만 로드 (다른 모델은 필요할 때까지 로드하지 않음)
+    model = load_model(model_type)
+    
+    if chunking_enabled(model_type) and max_len == get_max_len(model_type):
+        with span('tokenize', model_type):
+            input_ids = tokenizer(text, add_special_tokens=True, max_length=chunk_token_limit(), truncation=True)['input_ids']
+            if len(input_ids) <= CHUNK_SIZE:
+                # 한 조각에 들어가면(CHUNK_SIZE ≤ max_len이므로 잘리지 않음) 길이 확인용 토큰을 그대로 패딩해서 사용
+                encoding = tokenizer.pad(
+                    {'input_ids': [input_ids], 'attention_mask': [[1] * len(input_ids)]},
+                    padding=padding,
+                    max_length=max_len,
+                    return_tensors=TENSOR_TYPE,
                 )
-                _model_title.load_state_dict(loaded_data)
-            else:
-                # 전체 모델 방식
-                _model_title = loaded_data
-                
-            _model_title.to(device)
-            _model_title.eval()
+        if len(input_ids) > CHUNK_SIZE:
+            return chunked_logits([input_ids], model, tokenizer, model_type)[0]
+    else:
+        with span('tokenize', model_type):
+            encoding = encode_text(tokenizer, text, max_len, padding)
+    log('debug', '{} 토크나이징 완료, 토큰 수: {} (padding={}, max_len={})', model_type, encoding['input_ids'].shape[1], padding, max_len)
+    
+    # 예측
+    with span('forward', model_type):
+        return forward_logits(model, encoding['input_ids'], encoding['attention_mask'])
+
+def get_verdict_cache():
+    """판정 캐시 반환 (비활성화되었거나 열 수 없으면 None)"""
+    global _verdict_cache, VERDICT_CACHE_ENABLED
+    
+    if not VERDICT_CACHE_ENABLED:
+        return None
+    if _verdict_cache is None:
+        try:
+            _verdict_cache = VerdictCache(VERDICT_CACHE_PATH, VERDICT_CACHE_SIZE)
+            # 조회 때 모아 둔 사용 시각/적중 수는 종료 전에 반영
+            atexit.register(_verdict_cache.flush)
         except Exception as e:
-            error_msg = f'Title 모델 로드 오류: {str(e)}'
-            print(json.dumps({'error': error_msg}), file=sys.stderr, flush=True)
-            sys.exit(1)
-        
-        # Describe 모델 로드 (로컬 캐시 사용)
+            log('warning', f'판정 캐시를 열 수 없어 사용하지 않습니다: {str(e)}')
+            VERDICT_CACHE_ENABLED = False
+            return None
+    return _verdict_cache
+
+def tokenizer_id():
+    """판정 캐시용 토크나이저 식별자 (로컬 스냅샷이면 tokenizer.json 해시, 아니면 HF 허브 모델 이름)"""
+    source, local = model_source(MODEL_DIR, MODEL_NAME)
+    tokenizer_file = Path(source) / 'tokenizer.json'
+    if local and tokenizer_file.exists():
+        return hashlib.sha256(tokenizer_file.read_bytes()).hexdigest()[:16]
+    return source
+
+def model_id(model_type):
+    """
+    판정 캐시용 모델 식별자 (체크포인트 해시 + 판정에 영향을 주는 추론 설정)
+    백엔드, 정밀도, 컴파일 실행 경로(torch만), 패딩 방식, 최대 길이, 토크나이저, 조각 설정이 다르면 다른 키
+    (스레드 수, 배치 크기, 병렬 모드처럼 실행 방식만 바꾸는 설정은 제외)
+    체크포인트가 아직 다운로드되지 않았으면 None
+    """
+    if model_type not in _model_ids:
+        cache_path = MODEL_TITLE_PATH if model_type == 'title' else MODEL_DESCRIBE_PATH
+        if not cache_path.exists():
+            return None
+        compile_mode = COMPILE_MODE if BACKEND == 'torch' else 'off'
+        _model_ids[model_type] = (f'{checkpoint_hash(cache_path)}:{BACKEND}:{PRECISION}:compile-{compile_mode}'
+                                  f':pad-{PADDING}:{get_max_len(model_type)}:tok-{tokenizer_id()}')
+        if chunking_enabled(model_type):
+            # 조각 판정은 긴 텍스트의 판정이 달라지므로 조각 설정별로 따로 캐시 (조기 종료 기준은 판정에 영향 없음)
+            _model_ids[model_type] += f':chunks{CHUNK_SIZE}/{CHUNK_STRIDE}/{CHUNK_MAX}'
+    return _model_ids[model_type]
+
+def cached_verdicts(texts, model_type):
+    """판정 캐시 조회 (결과: {텍스트: 판정}, 캐시를 쓰지 않으면 빈 dict)"""
+    cache = get_verdict_cache()
+    current_model_id = model_id(model_type) if cache is not None else None
+    if current_model_id is None or not texts:
+        return {}
+    try:
+        return cache.get_many(current_model_id, model_type, texts)
+    except Exception as e:
+        log('warning', f'판정 캐시 조회 실패: {str(e)}')
+        return {}
+
+def store_verdicts(verdicts, model_type):
+    """판정 캐시에 저장 (verdicts: {텍스트: 판정})"""
+    cache = get_verdict_cache()
+    current_model_id = model_id(model_type) if cache is not None else None
+    if current_model_id is None or not verdicts:
+        return
+    try:
+        cache.put_many(current_model_id, model_type, verdicts)
+    except Exception as e:
+        log('warning', f'판정 캐시 저장 실패: {str(e)}')
+
+def get_fingerprint_index():
+    """스팸 지문 색인 반환 (비활성화되었거나 열 수 없으면 None)"""
+    global _fingerprint_index, FINGERPRINT_ENABLED
+    
+    if not FINGERPRINT_ENABLED:
+        return None
+    if _fingerprint_index is None:
         try:
-            loaded_data = download_and_cache_model(MODEL_DESCRIBE_URL, MODEL_DESCRIBE_PATH, 'Describe')
-            
-            if isinstance(loaded_data, dict):
-                # state_dict 방식
-                _model_describe = AutoModelForSequenceClassification.from_pretrained(
-                    MODEL_NAME, 
-                    num_labels=2
-                )
-                _model_describe.load_state_dict(loaded_data)
-            else:
-                # 전체 모델 방식
-                _model_describe = loaded_data
-                
-            _model_describe.to(device)
-            _model_describe.eval()
+            _fingerprint_index = FingerprintIndex(FINGERPRINT_PATH, FINGERPRINT_THRESHOLD, FINGERPRINT_MAX_ENTRIES,
+                                                  FINGERPRINT_MAX_AGE_DAYS * 86400, min_length=FINGERPRINT_MIN_LENGTH)
         except Exception as e:
-            error_msg = f'Describe 모델 로드 오류: {str(e)}'
-            print(json.dumps({'error': error_msg}), file=sys.stderr, flush=True)
-            sys.exit(1)
-        
-        # 메모리 정리
-        torch.cuda.empty_cache() if torch.cuda.is_available() else None
-        
-        return _model_title, _model_describe, _tokenizer
+            log('warning', f'스팸 지문 색인을 열 수 없어 사용하지 않습니다: {str(e)}')
+            FINGERPRINT_ENABLED = False
+            return None
+    return _fingerprint_index
+
+def fingerprint_verdicts(texts, model_type):
+    """확인된 스팸과 거의 같은 텍스트 (결과: {텍스트: 1}, 색인을 쓰지 않으면 빈 dict)"""
+    index = get_fingerprint_index()
+    current_model_id = model_id(model_type) if index is not None else None
+    if current_model_id is None or not texts:
+        return {}
+    try:
+        matches = index.match_many(f'{current_model_id}:{model_type}', texts)
     except Exception as e:
-        error_msg = f'모델/토크나이저 로드 오류: {str(e)}'
-        print(json.dumps({'error': error_msg}), file=sys.stderr, flush=True)
-        sys.exit(1)
+        log('warning', f'스팸 지문 조회 실패: {str(e)}')
+        return {}
+    for text, score in matches.items():
+        log('debug', '{} 스팸 지문 적중 (유사도 {:.2f})', model_type, score, text_preview=text[:100])
+    return {text: 1 for text in matches}
+
+def record_spam_fingerprints(verdicts, model_type):
+    """모델이 스팸으로 판정한 텍스트를 지문 색인에 저장 (verdicts: {텍스트: 판정})"""
+    index = get_fingerprint_index()
+    current_model_id = model_id(model_type) if index is not None else None
+    spam_texts = [text for text, verdict in verdicts.items() if verdict == 1]
+    if current_model_id is None or not spam_texts:
+        return
+    try:
+        index.add_many(f'{current_model_id}:{model_type}', spam_texts)
+    except Exception as e:
+        log('warning', f'스팸 지문 저장 실패: {str(e)}')
+
+def prefilter_path(model_type):
+    """model_type별 사전 필터 모델 파일 경로"""
+    return PREFILTER_DIR / f'prefilter_{model_type}.npz'
+
+def get_prefilter(model_type, required=False):
+    """
+    사전 필터 반환 (최초 사용 시 한 번만 로드)
+    비활성화되었거나 모델 파일이 없으면 None (required면 활성화 여부와 관계없이 로드)
+    """
+    if not PREFILTER_ENABLED and not required:
+        return None
+    if model_type not in _prefilters:
+        path = prefilter_path(model_type)
+        try:
+            _prefilters[model_type] = Prefilter.load(path)
+        except Exception as e:
+            log('warning', f'{model_type} 사전 필터를 불러올 수 없어 사용하지 않습니다 ({path}): {str(e)}')
+            _prefilters[model_type] = None
+    return _prefilters[model_type]
+
+def prefilter_verdicts(texts, model_type):
+    """사전 필터로 확실한 텍스트만 판정 (결과: {텍스트: 판정}, 애매한 텍스트는 제외)"""
+    prefilter = get_prefilter(model_type)
+    if prefilter is None or not texts:
+        return {}
+    decisions = prefilter.decide(texts, PREFILTER_LOW, PREFILTER_HIGH)
+    return {text: verdict for text, verdict in zip(texts, decisions) if verdict is not None}
 
 def predict_text(text, model_type='title'):
     """
@@ -181,108 +759,361 @@ def predict_text(text, model_type='title'):
     결과: 0 = 정상, 1 = 스팸
     """
     try:
-        # 입력 검증 및 정규화
-        if text is None:
+        # 입력 검증 및 정규화 (빈 문자열이면 정상)
+        text = normalize_text(text)
+        if not text:
             return 0
         
-        # 문자열로 변환
-        if isinstance(text, bytes):
-            text = text.decode('utf-8', errors='replace')
-        elif not isinstance(text, str):
-            text = str(text)
-        
-        # 공백 제거 및 빈 문자열 체크
-        text = text.strip()
-        if not text or not isinstance(text, str):
-            return 0
-        
-        print(json.dumps({'debug': f'{model_type} 모델 로드 중...'}), file=sys.stderr, flush=True)
-        model_title, model_describe, tokenizer = load_model_and_tokenizer()
-        print(json.dumps({'debug': f'{model_type} 모델 로드 완료'}), file=sys.stderr, flush=True)
-        
-        # 사용할 모델 선택
-        model = model_title if model_type == 'title' else model_describe
-        
-        print(json.dumps({'debug': f'{model_type} 토크나이징 시작...'}), file=sys.stderr, flush=True)
-        # tokenizer 호출 - 여러 방법 시도 (TextEncodeInput 오류 방지)
-        try:
-            # 방법 1: 기본 방법
-            encoding = tokenizer(
-                text,
-                add_special_tokens=True,
-                max_length=MAX_LEN,
-                padding='max_length',
-                truncation=True,
-                return_tensors='pt',
-                return_attention_mask=True,
-            )
-            print(json.dumps({'debug': f'{model_type} 토크나이징 완료'}), file=sys.stderr, flush=True)
-        except (TypeError, ValueError) as tokenize_error:
-            error_msg = str(tokenize_error)
+        with span('total', model_type):
+            # 같은 텍스트의 판정이 캐시에 있으면 토크나이징/추론 생략
+            cached = cached_verdicts([text], model_type)
+            if text in cached:
+                increment('verdict_cache_hit')
+                log('debug', '{} 판정 캐시 적중, 결과: {}', model_type, cached[text])
+                return cached[text]
             
-            # TextEncodeInput 오류인 경우 대체 방법 시도
-            if 'TextEncodeInput' in error_msg or 'must be Union' in error_msg:
-                try:
-                    # 방법 2: encode_plus 사용
-                    encoding = tokenizer.encode_plus(
-                        text,
-                        add_special_tokens=True,
-                        max_length=MAX_LEN,
-                        padding='max_length',
-                        truncation=True,
-                        return_tensors='pt',
-                        return_attention_mask=True,
-                    )
-                except Exception:
-                    # 방법 3: encode 후 수동 처리
-                    encoded = tokenizer.encode(
-                        text,
-                        add_special_tokens=True,
-                        max_length=MAX_LEN,
-                        truncation=True,
-                    )
-                    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
-                    if len(encoded) < MAX_LEN:
-                        encoded = encoded + [pad_token_id] * (MAX_LEN - len(encoded))
-                    elif len(encoded) > MAX_LEN:
-                        encoded = encoded[:MAX_LEN]
-                    
-                    input_ids = torch.tensor([encoded]).to(device)
-                    attention_mask = (input_ids != pad_token_id).long().to(device)
-                    encoding = {
-                        'input_ids': input_ids,
-                        'attention_mask': attention_mask
-                    }
-            else:
-                raise
-        
-        # return_tensors='pt'를 사용하면 이미 [1, MAX_LEN] 형태의 텐서
-        print(json.dumps({'debug': f'{model_type} 텐서 변환 중...'}), file=sys.stderr, flush=True)
-        input_ids = encoding['input_ids'].to(device)
-        attention_mask = encoding['attention_mask'].to(device)
-        print(json.dumps({'debug': f'{model_type} 텐서 변환 완료'}), file=sys.stderr, flush=True)
-        
-        # 예측
-        print(json.dumps({'debug': f'{model_type} 모델 예측 시작...'}), file=sys.stderr, flush=True)
-        with torch.no_grad():
-            outputs = model(input_ids=input_ids, attention_mask=attention_mask)
-            logits = outputs.logits
-            pred = torch.argmax(logits, dim=1).item()
-        print(json.dumps({'debug': f'{model_type} 모델 예측 완료, 결과: {pred}'}), file=sys.stderr, flush=True)
-        
-        # 메모리 정리
-        del input_ids, attention_mask, outputs, logits
-        torch.cuda.empty_cache() if torch.cuda.is_available() else None
-        
-        return pred
+            # 사전 필터가 확실하게 판정하면 트랜스포머 생략
+            settled = prefilter_verdicts([text], model_type)
+            if text in settled:
+                increment('prefilter_settled')
+                log('debug', '{} 사전 필터 판정, 결과: {}', model_type, settled[text])
+                return settled[text]
+            
+            # 확인된 스팸을 조금 고쳐 다시 올린 텍스트면 트랜스포머 생략
+            if fingerprint_verdicts([text], model_type):
+                increment('fingerprint_hit')
+                return 1
+            
+            logits = predict_logits(text, model_type)
+            pred = int(logits.argmax())
+            increment('model_predictions')
+            log('debug', '{} 모델 예측 완료, 결과: {}', model_type, pred)
+            
+            store_verdicts({text: pred}, model_type)
+            record_spam_fingerprints({text: pred}, model_type)
+            submit_shadow({text: pred}, model_type)
+            return pred
     except Exception as e:
         error_msg = f'예측 오류: {str(e)}'
-        print(json.dumps({'error': error_msg}), file=sys.stderr, flush=True)
+        log('error', error_msg)
         raise Exception(error_msg)
 
+def batch_logits(texts, model_type='title', model=None, tokenizer=None, label=None):
+    """
+    정규화된(비어있지 않은) 텍스트 목록의 logits 계산
+    한 번의 토크나이저 호출로 길이를 구한 뒤 길이순으로 정렬해 BATCH_SIZE씩 묶고
+    (길이가 비슷한 것끼리 묶어 패딩 낭비 최소화) 묶음마다 한 번씩 forward
+    model/tokenizer를 생략하면 model_type의 기본 모델과 공용 토크나이저 사용
+    label: 단계별 시간을 기록할 모델 이름 (생략 시 model_type, 섀도 판정은 shadow-title 등으로 따로 기록)
+    결과: texts와 같은 순서의 logits 텐서 목록
+    """
+    if not texts:
+        return []
+    
+    label = label or model_type
+    tokenizer = tokenizer if tokenizer is not None else load_tokenizer()
+    model = model if model is not None else load_model(model_type)
+    max_len = get_max_len(model_type)
+    chunking = chunking_enabled(model_type)
+    
+    # 패딩 없이 한 번에 토크나이징 (길이 계산 및 묶음 구성용, 조각 판정이면 조각 CHUNK_MAX개가 덮는 길이까지)
+    tokenize_start = time.perf_counter()
+    encodings = tokenizer(
+        texts,
+        add_special_tokens=True,
+        max_length=chunk_token_limit() if chunking else max_len,
+        truncation=True,
+        return_attention_mask=True,
+    )
+    order = sorted(range(len(texts)), key=lambda i: len(encodings['input_ids'][i]))
+    tokenize_seconds = time.perf_counter() - tokenize_start
+    
+    results = [None] * len(texts)
+    if chunking:
+        # CHUNK_SIZE보다 긴 텍스트는 조각 판정, 나머지는 아래에서 그대로 묶음 판정
+        long_texts = [i for i in order if len(encodings['input_ids'][i]) > CHUNK_SIZE]
+        if long_texts:
+            chunk_results = chunked_logits([encodings['input_ids'][i] for i in long_texts], model, tokenizer, label)
+            for i, logits in zip(long_texts, chunk_results):
+                results[i] = logits
+            order = [i for i in order if results[i] is None]
+    
+    for start in range(0, len(order), BATCH_SIZE):
+        bucket = order[start:start + BATCH_SIZE]
+        pad_start = time.perf_counter()
+        batch = tokenizer.pad(
+            {
+                'input_ids': [encodings['input_ids'][i] for i in bucket],
+                'attention_mask': [encodings['attention_mask'][i] for i in bucket],
+            },
+            padding=PADDING,
+            max_length=max_len,
+            return_tensors=TENSOR_TYPE,
+        )
+        tokenize_seconds += time.perf_counter() - pad_start
+        with span('forward', label):
+            logits = forward_logits(model, batch['input_ids'], batch['attention_mask'])
+        for row, i in enumerate(bucket):
+            results[i] = logits[row:row + 1]
+    
+    observe('tokenize', tokenize_seconds, label)
+    if label == model_type:
+        increment('model_predictions', len(texts))
+    log('debug', '{} 배치 예측 완료: {}건, {}개 묶음', label, len(texts), (len(order) + BATCH_SIZE - 1) // BATCH_SIZE)
+    return results
+
+def chunking_enabled(model_type):
+    """model_type에 긴 텍스트 조각 판정을 적용하는지 (describe 모델만)"""
+    return DESCRIBE_CHUNKS and model_type == 'describe'
+
+def chunk_token_limit():
+    """조각 판정에서 읽는 최대 토큰 수 (이보다 뒤는 판정하지 않으므로 토크나이저에서 잘라냄)"""
+    return token_limit(CHUNK_SIZE, CHUNK_STRIDE, CHUNK_MAX)
+
+def chunked_logits(encoded, model, tokenizer, label):
+    """
+    CHUNK_SIZE보다 긴 텍스트들의 조각 판정 (encoded: 특수 토큰이 붙은 토큰 id 목록들)
+    회차마다 아직 끝나지 않은 텍스트의 다음 CHUNKS_PER_PASS개 조각을 모아 BATCH_SIZE씩 forward하고,
+    스팸 확률이 CHUNK_EXIT_THRESHOLD 이상인 조각이 나온 텍스트는 남은 조각을 판정하지 않음
+    결과: 텍스트별로 스팸 확률이 가장 높은 조각의 logits (한 조각이라도 스팸이면 argmax가 1)
+    """
+    chunks = [split_chunks(input_ids, CHUNK_SIZE, CHUNK_STRIDE, CHUNK_MAX) for input_ids in encoded]
+    best = [None] * len(encoded)
+    best_probability = [-1.0] * len(encoded)
+    next_chunk = [0] * len(encoded)
+    pending = list(range(len(encoded)))
+    scored = 0
+    while pending:
+        rows = [(i, chunk) for i in pending for chunk in chunks[i][next_chunk[i]:next_chunk[i] + CHUNKS_PER_PASS]]
+        for start in range(0, len(rows), BATCH_SIZE):
+            group = rows[start:start + BATCH_SIZE]
+            batch = tokenizer.pad(
+                {
+                    'input_ids': [chunk for _, chunk in group],
+                    'attention_mask': [[1] * len(chunk) for _, chunk in group],
+                },
+                padding=PADDING,
+                max_length=CHUNK_SIZE,
+                return_tensors=TENSOR_TYPE,
+            )
+            with span('forward', label):
+                logits = forward_logits(model, batch['input_ids'], batch['attention_mask'])
+            for row, probability in enumerate(spam_probabilities(logits_to_numpy(logits))):
+                i = group[row][0]
+                if probability > best_probability[i]:
+                    best_probability[i], best[i] = probability, logits[row:row + 1]
+        scored += len(rows)
+        for i in pending:
+            next_chunk[i] += CHUNKS_PER_PASS
+        pending = [i for i in pending if best_probability[i] < CHUNK_EXIT_THRESHOLD and next_chunk[i] < len(chunks[i])]
+    
+    early_exits = sum(1 for i in range(len(encoded)) if next_chunk[i] < len(chunks[i]))
+    increment('chunked_texts', len(encoded))
+    increment('chunks_scored', scored)
+    increment('chunk_early_exits', early_exits)
+    log('debug', '{} 조각 판정 완료: {}건, {}개 조각 (조기 종료 {}건)', label, len(encoded), scored, early_exits)
+    return best
+
+def predict_batch(texts, model_type='title'):
+    """
+    여러 텍스트를 묶음 단위로 예측
+    빈 텍스트는 0, 같은 텍스트는 한 번만 계산
+    결과: texts와 같은 순서의 판정 목록 (0 = 정상, 1 = 스팸)
+    """
+    try:
+        with span('total', model_type):
+            normalized = [normalize_text(text) for text in texts]
+            # 중복 제거 (입력 순서 유지)
+            unique_texts = list(dict.fromkeys(text for text in normalized if text))
+            
+            # 캐시에 있는 텍스트는 제외하고 나머지만 추론
+            verdicts = cached_verdicts(unique_texts, model_type)
+            increment('verdict_cache_hit', len(verdicts))
+            missing = [text for text in unique_texts if text not in verdicts]
+            # 사전 필터가 확실하게 판정한 텍스트도 트랜스포머 생략
+            settled = prefilter_verdicts(missing, model_type)
+            increment('prefilter_settled', len(settled))
+            verdicts.update(settled)
+            missing = [text for text in missing if text not in settled]
+            # 확인된 스팸과 거의 같은 텍스트도 트랜스포머 생략
+            near_duplicates = fingerprint_verdicts(missing, model_type)
+            increment('fingerprint_hit', len(near_duplicates))
+            verdicts.update(near_duplicates)
+            missing = [text for text in missing if text not in near_duplicates]
+            logits = batch_logits(missing, model_type)
+            computed = {text: int(row.argmax()) for text, row in zip(missing, logits)}
+            store_verdicts(computed, model_type)
+            record_spam_fingerprints(computed, model_type)
+            submit_shadow(computed, model_type)
+            verdicts.update(computed)
+            
+            return [verdicts[text] if text else 0 for text in normalized]
+    except Exception as e:
+        error_msg = f'배치 예측 오류: {str(e)}'
+        log('error', error_msg)
+        raise Exception(error_msg)
+
+def get_shadow_executor():
+    """섀도 판정 스레드 (프로세스마다 하나, fork된 워커에서는 새로 생성)"""
+    global _shadow_executor
+    
+    if _shadow_executor is None or _shadow_executor[0] != os.getpid():
+        _shadow_executor = (os.getpid(), ThreadPoolExecutor(max_workers=1, thread_name_prefix='spam-shadow'))
+    return _shadow_executor[1]
+
+def shadow_model(shadow, model_type):
+    """섀도 모델 반환 (워커 풀에서 ONNX 세션처럼 fork 후 버린 모델은 섀도 스레드에서 다시 로드)"""
+    model = shadow['models'].get(model_type)
+    if model is None:
+        model = shadow['models'][model_type] = build_entry_model(shadow['entry'], model_type)
+    return model
+
+def submit_shadow(computed, model_type):
+    """
+    모델 판정 중 표본(sample_rate)을 섀도 모델로 다시 판정하도록 백그라운드 스레드에 넘김
+    computed: {텍스트: 현재 모델 판정}, 대기 작업이 SHADOW_MAX_PENDING개면 표본을 버림 (서비스 경로는 기다리지 않음)
+    """
+    global _shadow_pending
+    
+    shadow = _shadow
+    if shadow is None or not computed:
+        return
+    sample = {text: verdict for text, verdict in computed.items() if random.random() < shadow['sample_rate']}
+    if not sample:
+        return
+    with _shadow_lock:
+        if _shadow_pending >= SHADOW_MAX_PENDING:
+            increment('shadow_dropped', len(sample))
+            return
+        _shadow_pending += 1
+    get_shadow_executor().submit(shadow_score, shadow, sample, model_type)
+
+def shadow_score(shadow, sample, model_type):
+    """섀도 모델로 표본 판정 후 지연 시간(shadow 단계)과 현재 모델과의 일치/불일치 수 기록"""
+    global _shadow_pending
+    
+    try:
+        texts = list(sample)
+        model = shadow_model(shadow, model_type)
+        start = time.perf_counter()
+        logits = batch_logits(texts, model_type, model=model, tokenizer=_shadow_tokenizer, label=f'shadow-{model_type}')
+        observe('shadow', time.perf_counter() - start, model_type)
+        disagree = [text for text, row in zip(texts, logits) if int(row.argmax()) != sample[text]]
+        increment(f'shadow_agree_{model_type}', len(texts) - len(disagree))
+        increment(f'shadow_disagree_{model_type}', len(disagree))
+        for text in disagree:
+            log('debug', '{} 섀도 모델 판정 불일치', model_type, shadow=shadow['id'], current=sample[text], text_preview=text[:100])
+    except Exception as e:
+        increment('shadow_errors')
+        log('warning', f'{model_type} 섀도 판정 실패 ({shadow["id"]}): {str(e) or type(e).__name__}')
+    finally:
+        with _shadow_lock:
+            _shadow_pending -= 1
+
+def check_events_batch(events):
+    """
+    여러 행사의 title/description 판정 (title이 스팸인 행사는 description 체크 생략)
+    events: {"title", "description"} 목록
+    결과: events와 같은 순서의 판정 목록 (0 = 정상, 1 = 스팸)
+    """
+    titles = [event.get('title') for event in events]
+    descriptions = [event.get('description') for event in events]
+    
+    results = predict_batch(titles, 'title')
+    remaining = [i for i, result in enumerate(results) if result == 0]
+    description_results = predict_batch([descriptions[i] for i in remaining], 'describe')
+    for i, result in zip(remaining, description_results):
+        results[i] = result
+    
+    return results
+
+def predict_items(items, model_type='title'):
+    """
+    {"items": [...]} 요청 처리
+    items의 각 항목은 텍스트(문자열, model_type 모델로 판정) 또는
+    {"title", "description"} 객체(행사 단위 판정)
+    결과: items와 같은 순서의 판정 목록
+    """
+    if not isinstance(items, list):
+        raise ValueError('items는 배열이어야 합니다')
+    if model_type not in ('title', 'describe'):
+        raise ValueError(f'알 수 없는 model_type: {model_type}')
+    
+    text_indices = [i for i, item in enumerate(items) if not isinstance(item, dict)]
+    event_indices = [i for i, item in enumerate(items) if isinstance(item, dict)]
+    
+    results = [0] * len(items)
+    for i, result in zip(text_indices, predict_batch([items[i] for i in text_indices], model_type)):
+        results[i] = result
+    for i, result in zip(event_indices, check_events_batch([items[i] for i in event_indices])):
+        results[i] = result
+    
+    return results
+
+def parity_check(samples):
+    """
+    기존 방식(MAX_LEN까지 max_length 패딩)과 현재 설정(PADDING, 필드별 최대 길이)의 판정 비교
+    samples: (model_type, text) 목록
+    결과: 필드별 비교 건수, 판정 일치 건수, 최대 logit 차이, 불일치 샘플
+    """
+    report = {}
+    for model_type, text in samples:
+        text = normalize_text(text)
+        if not text:
+            continue
+        
+        reference = predict_logits(text, model_type, padding='max_length', max_len=MAX_LEN)
+        candidate = predict_logits(text, model_type)
+        reference_pred = int(reference.argmax())
+        candidate_pred = int(candidate.argmax())
+        
+        stats = report.setdefault(model_type, {'total': 0, 'agree': 0, 'max_logit_diff': 0.0, 'mismatches': []})
+        stats['total'] += 1
+        stats['max_logit_diff'] = max(stats['max_logit_diff'], float(np.abs(logits_to_numpy(reference) - logits_to_numpy(candidate)).max()))
+        if reference_pred == candidate_pred:
+            stats['agree'] += 1
+        else:
+            stats['mismatches'].append({'text_preview': text[:100], 'reference': reference_pred, 'candidate': candidate_pred})
+    
+    return report
+
+def run_parity_check():
+    """
+    --parity-check 모드: stdin의 각 줄(JSON {"title", "description"} 또는 일반 텍스트)로
+    판정 일치 여부를 확인하고 결과를 stdout에 출력. 불일치가 있으면 종료 코드 1
+    """
+    stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+    samples = []
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = line
+        if isinstance(row, dict):
+            samples.append(('title', row.get('title')))
+            samples.append(('describe', row.get('description')))
+        else:
+            samples.append(('title', line))
+    
+    report = parity_check(samples)
+    print(json.dumps({
+        'padding': PADDING,
+        'title_max_len': TITLE_MAX_LEN,
+        'describe_max_len': DESCRIBE_MAX_LEN,
+        'report': report,
+    }, ensure_ascii=False), flush=True)
+    
+    if any(stats['agree'] != stats['total'] for stats in report.values()):
+        sys.exit(1)
+
 def main():
     """메인 함수"""
     try:
+        apply_thread_tuning()
+        
         # 표준 입력에서 JSON 읽기 (바이너리 모드)
         try:
             input_bytes = sys.stdin.buffer.read()
@@ -293,33 +1124,38 @@ def main():
         try:
             input_text = input_bytes.decode('utf-8', errors='replace')
         except Exception as decode_error:
-            print(json.dumps({'error': f'입력 디코딩 오류: {str(decode_error)}'}), flush=True, file=sys.stderr)
+            log('error', f'입력 디코딩 오류: {str(decode_error)}')
             sys.exit(1)
         
         # JSON 파싱
         try:
             input_data = json.loads(input_text)
+            
+            # 배치 요청: {"items": [...], "model_type": "title"}
+            if isinstance(input_data, dict) and 'items' in input_data:
+                results = predict_items(input_data['items'], input_data.get('model_type') or 'title')
+                print(json.dumps({'results': results}), flush=True)
+                return
+            
             title = input_data.get('title', '').strip()
             description = input_data.get('description', '').strip()
             
             # 디버깅: 입력 데이터 로그
-            print(json.dumps({
-                'debug': '입력 데이터 수신',
-                'title_length': len(title),
-                'description_length': len(description),
-                'title_preview': title[:50] if title else '(비어있음)',
-                'description_preview': description[:50] if description else '(비어있음)'
-            }), file=sys.stderr, flush=True)
+            log('debug', '입력 데이터 수신',
+                title_length=len(title),
+                description_length=len(description),
+                title_preview=title[:50] if title else '(비어있음)',
+                description_preview=description[:50] if description else '(비어있음)')
             
         except json.JSONDecodeError:
             # JSON이 아니면 기존 방식 (단일 텍스트)으로 처리
             text = input_text.strip()
-            print(json.dumps({'debug': '단일 텍스트 모드 (JSON 아님)'}), file=sys.stderr, flush=True)
+            log('debug', '단일 텍스트 모드 (JSON 아님)')
             if not text:
                 print(json.dumps({'result': 0}), flush=True)
                 return
             pred_result = predict_text(text, 'title')
-            print(json.dumps({'debug': f'단일 텍스트 결과: {pred_result}'}), file=sys.stderr, flush=True)
+            log('debug', f'단일 텍스트 결과: {pred_result}')
             print(json.dumps({'result': pred_result}), flush=True)
             return
         
@@ -327,24 +1163,20 @@ def main():
         title_result = 0
         if title:
             try:
-                print(json.dumps({'debug': 'Title 모델 예측 시작...'}), file=sys.stderr, flush=True)
+                log('debug', 'Title 모델 예측 시작...')
                 title_result = predict_text(title, 'title')
-                print(json.dumps({
-                    'debug': 'Title 모델 예측 완료',
-                    'result': '스팸' if title_result == 1 else '정상',
-                    'title_preview': title[:100]
-                }), file=sys.stderr, flush=True)
+                log('debug', 'Title 모델 예측 완료',
+                    result='스팸' if title_result == 1 else '정상',
+                    title_preview=title[:100])
             except Exception as e:
-                print(json.dumps({'error': f'Title 예측 오류: {str(e)}'}), flush=True, file=sys.stderr)
+                log('error', f'Title 예측 오류: {str(e)}')
                 sys.exit(1)
         else:
-            print(json.dumps({'debug': 'Title이 비어있음 - 스킵'}), file=sys.stderr, flush=True)
+            log('debug', 'Title이 비어있음 - 스킵')
         
         # title이 스팸이면 즉시 스팸으로 판정
         if title_result == 1:
-            print(json.dumps({
-                'debug': '최종 판정: 스팸 (Title에서 스팸 판정, Description 체크 생략)'
-            }), file=sys.stderr, flush=True)
+            log('debug', '최종 판정: 스팸 (Title에서 스팸 판정, Description 체크 생략)')
             print(json.dumps({'result': 1}), flush=True)
             return
         
@@ -352,34 +1184,536 @@ def main():
         description_result = 0
         if description:
             try:
-                print(json.dumps({'debug': 'Description 모델 예측 시작...'}), file=sys.stderr, flush=True)
+                log('debug', 'Description 모델 예측 시작...')
                 description_result = predict_text(description, 'describe')
-                print(json.dumps({
-                    'debug': 'Description 모델 예측 완료',
-                    'result': '스팸' if description_result == 1 else '정상',
-                    'description_preview': description[:100]
-                }), file=sys.stderr, flush=True)
+                log('debug', 'Description 모델 예측 완료',
+                    result='스팸' if description_result == 1 else '정상',
+                    description_preview=description[:100])
             except Exception as e:
-                print(json.dumps({'error': f'Description 예측 오류: {str(e)}'}), flush=True, file=sys.stderr)
+                log('error', f'Description 예측 오류: {str(e)}')
                 sys.exit(1)
         else:
-            print(json.dumps({'debug': 'Description이 비어있음 - 스킵'}), file=sys.stderr, flush=True)
+            log('debug', 'Description이 비어있음 - 스킵')
         
         # 최종 결과 (둘 중 하나라도 스팸이면 스팸)
         final_result = 1 if (title_result == 1 or description_result == 1) else 0
-        print(json.dumps({
-            'debug': '최종 판정 완료',
-            'title_result': '스팸' if title_result == 1 else '정상',
-            'description_result': '스팸' if description_result == 1 else '정상',
-            'final_result': '스팸' if final_result == 1 else '정상'
-        }), file=sys.stderr, flush=True)
+        log('debug', '최종 판정 완료',
+            title_result='스팸' if title_result == 1 else '정상',
+            description_result='스팸' if description_result == 1 else '정상',
+            final_result='스팸' if final_result == 1 else '정상')
         print(json.dumps({'result': final_result}), flush=True)
         
     except Exception as e:
-        error_msg = json.dumps({'error': str(e)})
-        print(error_msg, flush=True, file=sys.stderr)
+        log('error', str(e))
         sys.exit(1)
 
+def precision_report(samples):
+    """
+    fp32 모델과 PRECISION 설정 모델의 정확도/판정 일치율/속도 비교
+    samples: (model_type, text, label) 목록 (label: 0 = 정상, 1 = 스팸)
+    """
+    sources = {
+        'title': (MODEL_TITLE_URL, MODEL_TITLE_PATH, 'Title'),
+        'describe': (MODEL_DESCRIBE_URL, MODEL_DESCRIBE_PATH, 'Describe'),
+    }
+    report = {}
+    for model_type, (model_url, cache_path, model_name) in sources.items():
+        rows = [(normalize_text(text), int(label)) for t, text, label in samples if t == model_type]
+        rows = [(text, label) for text, label in rows if text]
+        if not rows:
+            continue
+        texts = [text for text, _ in rows]
+        labels = [label for _, label in rows]
+        
+        stats = {'total': len(rows)}
+        predictions = {}
+        logits = {}
+        for precision in ('fp32', PRECISION):
+            if precision in predictions:
+                continue
+            model = build_model(model_url, cache_path, model_name, precision=precision)
+            start = time.perf_counter()
+            logits[precision] = [logits_to_numpy(row) for row in batch_logits(texts, model_type, model=model)]
+            elapsed = time.perf_counter() - start
+            predictions[precision] = [int(row.argmax()) for row in logits[precision]]
+            stats[precision] = {
+                'accuracy': sum(p == l for p, l in zip(predictions[precision], labels)) / len(rows),
+                'seconds': elapsed,
+            }
+            del model
+        
+        stats['agreement'] = sum(a == b for a, b in zip(predictions['fp32'], predictions[PRECISION])) / len(rows)
+        stats['accuracy_diff'] = stats[PRECISION]['accuracy'] - stats['fp32']['accuracy']
+        stats['max_logit_diff'] = max(float(np.abs(a - b).max()) for a, b in zip(logits['fp32'], logits[PRECISION]))
+        report[model_type] = stats
+    
+    return report
+
+def read_labeled_samples():
+    """stdin의 각 줄 {"text", "label", "model_type"(생략 시 title)} 읽기 (결과: (model_type, text, label) 목록)"""
+    stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+    samples = []
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        row = json.loads(line)
+        samples.append((row.get('model_type') or 'title', row.get('text'), row.get('label')))
+    return samples
+
+def run_precision_report():
+    """
+    --precision-report 모드: stdin의 각 줄 {"text", "label", "model_type"(생략 시 title)}로
+    fp32 대비 정확도 차이를 계산해 stdout에 출력
+    """
+    samples = [(model_type, text, label or 0) for model_type, text, label in read_labeled_samples()]
+    print(json.dumps({'precision': PRECISION, 'report': precision_report(samples)}, ensure_ascii=False), flush=True)
+
+def run_train_prefilter():
+    """
+    --train-prefilter 모드: stdin의 라벨 데이터({"text", "label", "model_type"})로
+    model_type별 사전 필터를 학습해 PREFILTER_DIR에 저장
+    """
+    samples = read_labeled_samples()
+    report = {}
+    for model_type in ('title', 'describe'):
+        rows = [(normalize_text(text), int(label)) for t, text, label in samples if t == model_type and label is not None]
+        rows = [(text, label) for text, label in rows if text]
+        if not rows:
+            continue
+        texts = [text for text, _ in rows]
+        labels = np.asarray([label for _, label in rows])
+        
+        start = time.perf_counter()
+        prefilter = train_prefilter(texts, labels)
+        elapsed = time.perf_counter() - start
+        
+        PREFILTER_DIR.mkdir(parents=True, exist_ok=True)
+        prefilter.save(prefilter_path(model_type))
+        proba = prefilter.predict_proba(texts)
+        report[model_type] = {
+            'path': str(prefilter_path(model_type)),
+            'total': len(rows),
+            'spam': int(labels.sum()),
+            'train_accuracy': float(((proba >= 0.5) == labels).mean()),
+            'train_offload_rate': float(((proba <= PREFILTER_LOW) | (proba >= PREFILTER_HIGH)).mean()),
+            'seconds': elapsed,
+        }
+    print(json.dumps({'report': report}, ensure_ascii=False), flush=True)
+
+def run_prefilter_report():
+    """
+    --prefilter-report 모드: stdin의 각 줄 {"text", "label"(선택), "model_type"}마다
+    사전 필터와 전체 모델을 모두 실행해 오프로드 비율과 판정 불일치를 계산해 stdout에 출력
+    """
+    samples = read_labeled_samples()
+    report = {}
+    for model_type in ('title', 'describe'):
+        rows = [(normalize_text(text), label) for t, text, label in samples if t == model_type]
+        rows = [(text, label) for text, label in rows if text]
+        if not rows:
+            continue
+        prefilter = get_prefilter(model_type, required=True)
+        if prefilter is None:
+            continue
+        texts = [text for text, _ in rows]
+        labels = [label for _, label in rows]
+        
+        start = time.perf_counter()
+        proba = prefilter.predict_proba(texts)
+        prefilter_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        full_verdicts = [int(row.argmax()) for row in batch_logits(texts, model_type)]
+        full_seconds = time.perf_counter() - start
+        
+        stats = cascade_report(proba, full_verdicts, PREFILTER_LOW, PREFILTER_HIGH,
+                               labels=labels if all(label is not None for label in labels) else None)
+        stats['prefilter_seconds'] = prefilter_seconds
+        stats['full_seconds'] = full_seconds
+        report[model_type] = stats
+    print(json.dumps({'report': report}, ensure_ascii=False), flush=True)
+
+def check_event(title, description):
+    """
+    title/description 판정 (title이 스팸이면 description 체크 생략, 병렬 모드에서는 동시에 계산)
+    결과: 0 = 정상, 1 = 스팸
+    """
+    if PARALLEL_MODELS and title and description:
+        # 병렬 모드: description도 미리 함께 계산 (지연 시간 ≈ forward 1회)
+        load_model_and_tokenizer()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            title_future = executor.submit(predict_text, title, 'title')
+            description_future = executor.submit(predict_text, description, 'describe')
+            return 1 if (title_future.result() == 1 or description_future.result() == 1) else 0
+    
+    if title and predict_text(title, 'title') == 1:
+        return 1
+    if description and predict_text(description, 'describe') == 1:
+        return 1
+    return 0
+
+def handle_request(request):
+    """
+    serve 모드 요청 하나를 처리하여 응답 dict 반환
+    요청 형식:
+      {"id": ..., "text": "...", "model_type": "title"}  (단일 텍스트, model_type 생략 시 title)
+      {"id": ..., "title": "...", "description": "..."}  (행사 단위 판정)
+      {"id": ..., "items": [...], "model_type": "title"}  (배치 판정, 응답은 "results" 목록)
+      {"id": ..., "metrics": "json" 또는 "prometheus"}  (단계별 시간/카운터, 응답은 "metrics")
+      {"id": ..., "registry": "status" 또는 "reload"}  (모델 레지스트리 상태/다시 읽기, 응답은 "registry")
+      {"id": ..., "queue": "status"}  (우선순위 등급별 대기 수/대기 시간/마감 초과 수, 응답은 "queue")
+      {"id": ..., "residency": "status"}  (상주 모델별 크기/유휴 시간, 로드/내림 횟수, 응답은 "residency")
+      {"id": ..., "ping": true}  (상태 확인, 응답은 {"id", "pong": true}: 대기열을 거치므로 판정 루프가 진행 중인지 확인하는 용도)
+    모든 요청에 "priority"(interactive, normal, bulk)와 "deadline"(Unix 시각 초)을 붙일 수 있음 (대기열에서 사용, spam_schedule)
+    """
+    request_id = request.get('id')
+    if 'ping' in request:
+        return {'id': request_id, 'pong': True}
+    if 'metrics' in request:
+        return {'id': request_id, 'metrics': prometheus_text() if request['metrics'] == 'prometheus' else snapshot()}
+    if 'queue' in request:
+        return {'id': request_id, 'queue': queue_status()}
+    if 'residency' in request:
+        return {'id': request_id, 'residency': get_residency().status()}
+    if 'registry' in request:
+        try:
+            return {'id': request_id, 'registry': registry_request(request['registry'])}
+        except ValueError as e:
+            return {'id': request_id, 'error': str(e)}
+    increment('requests')
+    try:
+        with span('request'):
+            return handle_prediction_request(request)
+    except Exception as e:
+        increment('errors')
+        return {'id': request_id, 'error': str(e)}
+
+def handle_prediction_request(request):
+    """판정 요청 처리 (handle_request 참고)"""
+    request_id = request.get('id')
+    if 'items' in request:
+        results = predict_items(request['items'], request.get('model_type') or 'title')
+        return {'id': request_id, 'results': results}
+    if 'text' in request:
+        model_type = request.get('model_type') or 'title'
+        if model_type not in ('title', 'describe'):
+            raise ValueError(f'알 수 없는 model_type: {model_type}')
+        result = predict_text(request.get('text'), model_type)
+    else:
+        title = str(request.get('title') or '').strip()
+        description = str(request.get('description') or '').strip()
+        result = check_event(title, description)
+    return {'id': request_id, 'result': result}
+
+def build_entry_model(entry, model_type):
+    """레지스트리 모델 버전의 model_type 모델 생성"""
+    source = entry[model_type]
+    return build_model(source['url'], Path(source['path']), f'{model_type.capitalize()}({entry["id"]})',
+                       precision=entry['precision'], backend=entry['backend'])
+
+def shadow_set(manifest, models=None):
+    """
+    manifest의 shadow 설정 (없으면 None)
+    현재 섀도 모델과 같은 버전이면 로드된 모델을 재사용하고, 아니면 models(또는 빈 dict, 첫 섀도 판정 때 로드)
+    """
+    shadow = manifest.get('shadow') if manifest else None
+    if not shadow:
+        return None
+    entry = registry_entry(manifest, shadow['model'])
+    if _shadow is not None and _shadow['entry'] == entry:
+        models = _shadow['models']
+    return {'id': entry['id'], 'sample_rate': float(shadow.get('sample_rate', 0.1)), 'entry': entry, 'models': dict(models or {})}
+
+def prepare_model_set(manifest):
+    """
+    레지스트리 manifest의 active/shadow 모델 로드 (감시 스레드에서 실행, 그동안 현재 모델로 계속 응답)
+    버전 설정이 현재와 같으면 이미 로드된 모델을 그대로 사용
+    """
+    entry = registry_entry(manifest, manifest['active'])
+    current = {}
+    if entry == _active_entry:
+        current = {'title': _model_title, 'describe': _model_describe}
+    elif _shadow is not None and _shadow['entry'] == entry:
+        # 섀도로 검증하던 모델을 active로 올리는 경우
+        current = _shadow['models']
+    models = {}
+    for model_type in ('title', 'describe'):
+        models[model_type] = current.get(model_type)
+        if models[model_type] is None:
+            models[model_type] = build_entry_model(entry, model_type)
+            warm_up_model(models[model_type], model_type)
+        # 판정 캐시용 체크포인트 해시를 미리 계산 (교체 후 첫 요청이 대용량 파일 해시를 기다리지 않도록)
+        if Path(entry[model_type]['path']).exists():
+            checkpoint_hash(Path(entry[model_type]['path']))
+    
+    shadow = shadow_set(manifest, models if (manifest.get('shadow') or {}).get('model') == entry['id'] else None)
+    if shadow is not None:
+        for model_type in ('title', 'describe'):
+            shadow_model(shadow, model_type)
+    return {'active': entry['id'], 'shadow': shadow['id'] if shadow else None, 'entry': entry, 'models': models, 'shadow_set': shadow}
+
+def install_shadow(shadow):
+    """섀도 설정 교체 (섀도 스레드는 전용 토크나이저 사용: 같은 토크나이저 객체를 두 스레드에서 동시에 쓰지 않도록)"""
+    global _shadow, _shadow_tokenizer
+    
+    if shadow is not None and _shadow_tokenizer is None:
+        _shadow_tokenizer = copy.deepcopy(load_tokenizer())
+    _shadow = shadow
+
+def install_model_set(prepared):
+    """준비된 모델 묶음으로 한 번에 교체 (요청 처리 스레드에서 요청 사이에 실행)"""
+    global _model_title, _model_describe
+    
+    previous = _active_entry['id']
+    apply_model_entry(prepared['entry'])
+    _model_title, _model_describe = prepared['models']['title'], prepared['models']['describe']
+    for model_type in ('title', 'describe'):
+        get_residency().loaded(model_type, prepared['models'][model_type])
+    # 판정 캐시 키도 새 체크포인트 기준 (이전 모델의 판정은 재사용하지 않음)
+    _model_ids.clear()
+    install_shadow(prepared['shadow_set'])
+    log('info', '모델 교체 완료: {} -> {}', previous, prepared['active'], shadow=prepared['shadow'])
+
+def get_registry():
+    """모델 레지스트리 (상주 모드 시작 시 manifest의 shadow 설정도 적용, 섀도 모델은 첫 사용 시 로드)"""
+    global _registry
+    
+    if _registry is None:
+        install_shadow(shadow_set(_manifest))
+        _registry = ModelRegistry(REGISTRY_PATH, REGISTRY_POLL, prepare_model_set, install_model_set,
+                                  active=_active_entry['id'], shadow=_shadow['id'] if _shadow else None)
+    return _registry
+
+def registry_request(command):
+    """레지스트리 제어 요청 ('status': 상태, 'reload': manifest 다시 읽기), 결과: 상태와 필드별 섀도 판정 일치율"""
+    registry = get_registry()
+    if command == 'reload':
+        registry.reload()
+    elif command != 'status':
+        raise ValueError(f'알 수 없는 registry 요청: {command} (가능: status, reload)')
+    status = registry.status()
+    counters = snapshot()['counters']
+    for model_type in ('title', 'describe'):
+        agree = counters.get(f'shadow_agree_{model_type}', 0)
+        disagree = counters.get(f'shadow_disagree_{model_type}', 0)
+        if agree + disagree:
+            status.setdefault('shadow_agreement', {})[model_type] = agree / (agree + disagree)
+    return status
+
+def write_metrics_file():
+    """METRICS_INTERVAL초마다 단계별 시간/카운터를 Prometheus 텍스트 파일로 저장"""
+    global _metrics_written
+    
+    if not METRICS_FILE or time.monotonic() - _metrics_written < METRICS_INTERVAL:
+        return
+    try:
+        write_prometheus(METRICS_FILE, **_metrics_labels)
+    except OSError as e:
+        log('warning', f'측정값 파일 저장 실패: {str(e)}')
+    _metrics_written = time.monotonic()
+
+def serve():
+    """
+    상주(serve) 모드: 모델을 한 번만 로드하고 stdin에서 JSON 요청을 한 줄씩 읽어
+    stdout으로 JSON 응답을 한 줄씩 출력합니다. 응답에는 요청의 id가 그대로 붙습니다.
+    요청은 priority 등급 순으로 처리하므로(spam_schedule) 응답 순서가 요청 순서와 다를 수 있고,
+    deadline이 지난 요청은 판정하지 않고 {"id", "error", "expired": true}로 응답합니다.
+    """
+    if SERVE_WORKERS > 1:
+        if fork_available():
+            return serve_workers()
+        log('warning', 'fork를 지원하지 않는 플랫폼이라 워커 풀 없이 단일 프로세스로 실행합니다')
+    
+    # 토크나이저와 title 모델만 미리 로드 (describe 모델은 첫 사용 시 로드)
+    load_tokenizer()
+    load_model('title')
+    apply_thread_tuning()
+    warm_up_models()
+    # manifest가 바뀌면 감시 스레드가 새 모델을 로드하고, 교체는 요청 사이에서
+    registry = get_registry()
+    registry.watch()
+    get_residency().start()
+    print(json.dumps({'ready': True}), flush=True)
+    log('info', '스팸 체크 워커 준비 완료 (serve 모드)', model=_active_entry['id'])
+
+    queue = ScheduledQueue()
+    arrived = threading.Condition()
+    closed = threading.Event()
+    output_lock = threading.Lock()
+    
+    def respond(response):
+        with output_lock:
+            print(json.dumps(response), flush=True)
+    
+    def read_requests():
+        # 판정 중에도 stdin을 계속 읽어 대기열에 넣으므로, 나중에 온 interactive 요청이 밀린 bulk 요청보다 먼저 처리됨
+        stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+        for line in stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('요청은 JSON 객체여야 합니다')
+            except ValueError as e:
+                respond({'id': None, 'error': f'잘못된 요청: {str(e)}'})
+                continue
+            try:
+                priority, deadline = request_schedule(request)
+            except ValueError as e:
+                respond({'id': request.get('id'), 'error': str(e)})
+                continue
+            queue.push(request, priority, deadline)
+            with arrived:
+                arrived.notify()
+        closed.set()
+        with arrived:
+            arrived.notify()
+    
+    def expire(entry):
+        respond({'id': entry.item.get('id'), 'error': expired_error(entry.priority, entry.deadline), 'expired': True})
+    
+    threading.Thread(target=read_requests, name='spam-serve-reader', daemon=True).start()
+    while True:
+        with arrived:
+            while not len(queue) and not closed.is_set():
+                arrived.wait()
+        entry = queue.pop(on_expired=expire)
+        if entry is None:
+            if closed.is_set() and not len(queue):
+                break
+            continue
+        registry.poll()
+        respond(handle_request(entry.item))
+        write_metrics_file()
+
+def init_pool_worker(index):
+    """워커 풀의 워커 프로세스 시작 시 실행 (fork 직후)"""
+    global METRICS_FILE
+    
+    if BACKEND == 'onnx':
+        # ONNX Runtime 세션은 fork 후 재사용할 수 없으므로 워커마다 새로 로드 (파일은 부모가 미리 준비)
+        load_model('title')
+        load_model('describe')
+    apply_thread_tuning()
+    # TorchScript 최적화 그래프/컴파일 결과는 워커 프로세스별로 만들어지므로 워커마다 워밍업
+    warm_up_models()
+    # 측정값 파일은 워커별로 저장 (예: spam.prom -> spam.worker0.prom, worker 라벨 추가)
+    if METRICS_FILE:
+        path = Path(METRICS_FILE)
+        METRICS_FILE = str(path.with_name(f'{path.stem}.worker{index}{path.suffix}'))
+        _metrics_labels['worker'] = str(index)
+    if _shadow is not None:
+        # 섀도 모델의 ONNX 세션도 워커에서 새로 로드 (섀도 스레드가 첫 사용 시)
+        _shadow['models'] = {model_type: model for model_type, model in _shadow['models'].items() if not isinstance(model, OnnxClassifier)}
+
+def handle_pool_request(request):
+    """워커 풀의 워커에서 요청 하나 처리"""
+    response = handle_request(request)
+    write_metrics_file()
+    return response
+
+def serve_workers():
+    """
+    serve 모드 워커 풀: 부모가 토크나이저/모델 두 개/사전 필터를 한 번 로드한 뒤 SERVE_WORKERS개 워커를 fork
+    워커는 부모의 가중치를 copy-on-write로 공유하고, 죽은 워커는 부모가 새로 fork해서 교체합니다.
+    레지스트리 manifest가 바뀌면 부모가 새 모델을 로드한 뒤 워커를 하나씩(처리 중인 요청이 끝나는 대로) 새로 fork합니다.
+    요청/응답 형식은 단일 프로세스 serve 모드와 같습니다 (응답 순서는 완료 순이므로 id로 구분).
+    """
+    # 워커는 부모의 가중치를 공유하므로 워커에서 내렸다가 다시 로드하면 오히려 워커마다 사본이 생김
+    residency = get_residency()
+    if residency.enabled:
+        log('warning', '워커 풀에서는 모델 상주 관리(유휴 시간/메모리 예산)를 사용하지 않습니다')
+        residency.disable()
+    load_tokenizer()
+    load_model('title')
+    load_model('describe')
+    registry = get_registry()
+    for model_type in ('title', 'describe'):
+        get_prefilter(model_type)
+        if _shadow is not None:
+            shadow_model(_shadow, model_type)
+    release_pool_models()
+    
+    def tick():
+        # 부모는 스레드 없이 동작하므로 manifest 확인/모델 로드도 이벤트 루프에서 (로드 중 요청은 대기열에 쌓임)
+        if not registry.check():
+            return False
+        release_pool_models()
+        return True
+    
+    def control(request):
+        # 대기열은 부모에 있으므로 대기열 상태도 부모가 응답
+        return handle_request(request) if 'registry' in request or 'queue' in request else None
+    
+    serve_pool(SERVE_WORKERS, handle_pool_request, initializer=init_pool_worker, control=control,
+               tick=tick, tick_interval=REGISTRY_POLL)
+
+def release_pool_models():
+    """워커 fork 전 부모 준비: 판정 캐시용 모델 식별자 계산, ONNX 세션은 부모에서 버림 (파일 준비(내보내기)만 부모에서 하고 세션은 워커에서 생성)"""
+    global _model_title, _model_describe
+    
+    for model_type in ('title', 'describe'):
+        model_id(model_type)
+    if BACKEND == 'onnx':
+        _model_title = _model_describe = None
+
+def run_server():
+    """
+    --listen 모드: asyncio HTTP 서버 (localhost TCP 또는 Unix 소켓)
+    동시에 들어온 요청의 텍스트를 모아 predict_batch로 한 번에 판정 (판정 캐시/사전 필터 포함)
+    """
+    registry = get_registry()
+    
+    def load():
+        load_tokenizer()
+        load_model('title')
+        load_model('describe')
+        apply_thread_tuning()
+        warm_up_models()
+        registry.watch()
+        get_residency().start()
+    
+    # 모델 교체(registry.poll)와 레지스트리 요청도 추론 스레드에서 실행되므로 배치 처리 도중에는 모델이 바뀌지 않음
+    serve_http(LISTEN_ADDRESS, predict_batch, load, max_batch=SERVER_MAX_BATCH, max_wait_ms=SERVER_MAX_WAIT_MS,
+               max_queue=SERVER_MAX_QUEUE, parallel=PARALLEL_MODELS, maintain=registry.poll, control=registry_request,
+               residency=get_residency().status)
+
 if __name__ == '__main__':
-    main()
+    try:
+        if '--serve' in sys.argv[1:]:
+            serve()
+        elif any(arg == '--listen' or arg.startswith('--listen=') for arg in sys.argv[1:]):
+            run_server()
+        elif '--parity-check' in sys.argv[1:]:
+            run_parity_check()
+        elif '--precision-report' in sys.argv[1:]:
+            run_precision_report()
+        elif '--train-prefilter' in sys.argv[1:]:
+            run_train_prefilter()
+        elif '--prefilter-report' in sys.argv[1:]:
+            run_prefilter_report()
+        elif '--verdict-cache-stats' in sys.argv[1:]:
+            cache = get_verdict_cache()
+            print(json.dumps(cache.stats() if cache is not None else {'enabled': False}), flush=True)
+        elif '--fingerprint-stats' in sys.argv[1:]:
+            index = get_fingerprint_index()
+            print(json.dumps(index.stats() if index is not None else {'enabled': False}), flush=True)
+        elif '--vendor-model' in sys.argv[1:]:
+            # 네트워크가 있는 곳에서 1회 실행해 토크나이저/config 스냅샷 생성 (`--vendor-model 디렉토리`로 위치 지정 가능)
+            model_dir = get_option('--vendor-model', 'SPAM_MODEL_DIR', str(MODEL_DIR))
+            print(json.dumps({'model_dir': model_dir, 'files': vendor_snapshot(MODEL_NAME, model_dir)}), flush=True)
+        elif '--autotune-threads' in sys.argv[1:]:
+            print(json.dumps(apply_thread_tuning(force=True)), flush=True)
+        else:
+            with span('total'):
+                main()
+    except ModelLoadError:
+        # 로드 함수가 이미 오류를 기록함
+        sys.exit(1)
+    
+    # 일회성 실행: 단계별 시간/카운터를 stderr로 출력
+    if PRINT_METRICS:
+        print(json.dumps({'metrics': snapshot()}), file=sys.stderr, flush=True)
 
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+메모리 매핑 체크포인트 (빠른 콜드 스타트)
+원본 `.pth`(state_dict 또는 pickle된 전체 모델)를 최초 1회 가중치만 담은 표준 형식으로 변환해
+`<원본>.<해시>.mmap.pt`에 저장합니다. 이후에는 `torch.load(mmap=True)`로 파일을 메모리에 매핑해
+복사 없이 모델 파라미터로 사용하므로, 같은 호스트의 여러 워커가 페이지 캐시를 공유합니다.
+모델 골격은 저장된 config로 만들고(랜덤 초기화/사전학습 가중치 로드 없음), 토크나이저와 config는
+로컬 스냅샷 디렉토리가 있으면 HF 허브를 거치지 않고 읽습니다.
+torch는 ONNX 백엔드에서 import하지 않도록 함수 안에서만 import합니다.
+"""
+import json
+from pathlib import Path
+from contextlib import contextmanager
+from spam_runtime import checkpoint_hash, unique_temp_path
+from spam_metrics import log
+
+# 로컬 스냅샷으로 인정하는 데 필요한 파일 (fast 토크나이저 + 모델 config)
+SNAPSHOT_FILES = ('config.json', 'tokenizer.json')
+
+
+def snapshot_ready(model_dir):
+    """model_dir에 토크나이저/config 스냅샷이 있는지 확인"""
+    return model_dir is not None and all((Path(model_dir) / name).exists() for name in SNAPSHOT_FILES)
+
+
+def model_source(model_dir, model_name):
+    """
+    토크나이저/config를 읽을 위치
+    결과: (로컬 스냅샷 디렉토리 또는 HF 허브 모델 이름, 로컬 여부)
+    """
+    if snapshot_ready(model_dir):
+        return str(model_dir), True
+    if Path(model_name).is_dir():
+        return model_name, True
+    return model_name, False
+
+
+def vendor_snapshot(model_name, model_dir, num_labels=2):
+    """
+    HF 허브(또는 HF 로컬 캐시)에서 토크나이저와 config를 받아 model_dir에 저장 (네트워크가 있는 곳에서 1회)
+    이후 실행은 이 디렉토리만 읽으므로 외부 네트워크 없이 시작할 수 있습니다.
+    """
+    from transformers import AutoConfig, AutoTokenizer
+
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(str(model_dir))
+    AutoConfig.from_pretrained(model_name, num_labels=num_labels).save_pretrained(str(model_dir))
+    return sorted(path.name for path in model_dir.iterdir())
+
+
+def meta_allocation_mode():
+    """torch.empty 할당만 meta 장치로 보내는 TorchFunctionMode (nn.Linear/Embedding/LayerNorm 파라미터가 여기서 생성됨)"""
+    import torch
+    from torch.overrides import TorchFunctionMode
+
+    class MetaAllocation(TorchFunctionMode):
+        def __torch_function__(self, func, types, args=(), kwargs=None):
+            kwargs = kwargs or {}
+            if func is torch.empty:
+                kwargs['device'] = 'meta'
+            return func(*args, **kwargs)
+
+    return MetaAllocation()
+
+
+@contextmanager
+def empty_parameters():
+    """
+    이 안에서 만든 모듈의 파라미터는 meta 장치에 생성 (메모리 할당/랜덤 초기화 없음)
+    TorchFunctionMode는 스레드별로 적용되므로 다른 스레드의 모델 생성에는 영향이 없습니다.
+    torch.device('meta')와 달리 position_ids 같은 버퍼(torch.arange/zeros)는 체크포인트에 없을 수 있으므로 CPU에 그대로 둡니다.
+    """
+    with meta_allocation_mode():
+        yield
+
+
+def empty_model(config):
+    """config(dict)로 파라미터가 비어 있는(meta) 모델 골격 생성"""
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    config = AutoConfig.for_model(**config)
+    with empty_parameters():
+        return AutoModelForSequenceClassification.from_config(config)
+
+
+def assign_weights(model, state_dict):
+    """
+    state_dict 텐서를 그대로(assign) 골격의 파라미터로 사용 (매핑된 텐서를 복사하지 않음)
+    체크포인트에 없는 파라미터가 있으면 load_state_dict(strict)가 오류를 냄
+    """
+    model.load_state_dict(state_dict, assign=True)
+
+    # torch.empty로 만든 버퍼도 meta에 있으므로 함께 확인
+    missing = [name for name, tensor in (*model.named_parameters(), *model.named_buffers()) if tensor.is_meta]
+    if missing:
+        raise ValueError(f'체크포인트에 없는 파라미터: {", ".join(missing[:5])}')
+    return model
+
+
+def model_from_checkpoint(state_dict, config):
+    """config로 빈 골격을 만들고 state_dict 텐서를 그대로(assign) 파라미터로 사용"""
+    return assign_weights(empty_model(config), state_dict)
+
+
+def mmap_checkpoint_path(cache_path):
+    """원본 체크포인트 해시로 구분되는 변환 파일 경로 (예: spam_model_title.3f2a9c1e5b7d4a60.mmap.pt)"""
+    file_hash = checkpoint_hash(cache_path)[:16]
+    return cache_path.with_name(f'{cache_path.stem}.{file_hash}.mmap.pt')
+
+
+def load_mmap_checkpoint(cache_path):
+    """
+    변환된 체크포인트를 메모리 매핑으로 로드 (가중치는 읽을 때 페이지 단위로 올라오며 복사되지 않음)
+    결과: (state_dict, config dict 또는 None), 변환 파일이 없으면 None
+    config가 None이면 config 없이 변환된 파일 (호출하는 쪽에서 MODEL_NAME 설정으로 골격 생성)
+    """
+    import torch
+
+    if not cache_path.exists():
+        return None
+    mmap_path = mmap_checkpoint_path(cache_path)
+    if not mmap_path.exists():
+        return None
+
+    try:
+        saved = torch.load(mmap_path, map_location='cpu', mmap=True, weights_only=True)
+        config = json.loads(saved['config']) if saved.get('config') else None
+        return saved['state_dict'], config
+    except Exception as e:
+        log('warning', f'메모리 매핑 체크포인트 로드 실패, 다시 변환합니다: {str(e)}')
+        return None
+
+
+def save_mmap_checkpoint(loaded_data, cache_path, config=None):
+    """
+    torch.load한 원본(state_dict 또는 전체 모델)을 메모리 매핑용 형식으로 저장
+    state_dict 원본은 config(모델 골격 설정 dict)를 함께 저장하고, 전체 모델은 모델의 config를 저장
+    전체 모델이 HF 모델이 아니면(config 없음) 골격을 다시 만들 수 없으므로 변환하지 않음
+    결과: (state_dict, config dict 또는 None), 변환할 수 없으면 None
+    """
+    import torch
+
+    if isinstance(loaded_data, dict):
+        state_dict = loaded_data
+    elif hasattr(loaded_data, 'config') and hasattr(loaded_data.config, 'to_dict'):
+        state_dict, config = loaded_data.state_dict(), loaded_data.config.to_dict()
+    else:
+        return None
+
+    # 공유 저장소(view, tied weight)를 풀어 텐서마다 독립적인 연속 메모리로 저장
+    state_dict = {key: value.detach().contiguous().clone() for key, value in state_dict.items()}
+
+    mmap_path = mmap_checkpoint_path(cache_path)
+    tmp_path = None
+    try:
+        tmp_path = unique_temp_path(mmap_path)
+        torch.save({
+            'state_dict': state_dict,
+            'config': json.dumps(config) if config else None,
+        }, tmp_path)
+        tmp_path.replace(mmap_path)
+    except Exception as e:
+        log('warning', f'메모리 매핑 체크포인트 저장 실패: {str(e)}')
+    finally:
+        # 저장 도중 실패하면 반쯤 쓴 임시 파일이 남지 않도록 (교체에 성공했으면 이미 없음)
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+    return state_dict, config
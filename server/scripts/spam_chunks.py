@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+긴 텍스트 슬라이딩 윈도우 판정 유틸리티
+토큰 수가 조각 크기보다 긴 텍스트를 stride 토큰 간격으로 겹치는 조각으로 나누고,
+조각마다 [CLS] ... [SEP] 특수 토큰을 붙여 따로 판정합니다 (한 조각이라도 스팸이면 스팸).
+조각 수 상한(max_chunks)이 있으므로 아무리 긴 글도 forward 횟수가 제한됩니다.
+"""
+import numpy as np
+
+
+def validate_chunking(size, stride, max_chunks, per_pass, exit_threshold):
+    """조각 설정 검증 (잘못되었으면 ValueError)"""
+    if size < 8:
+        raise ValueError(f'조각 크기는 8 토큰 이상이어야 합니다: {size}')
+    if not 0 < stride <= size - 2:
+        raise ValueError(f'조각 간격(stride)은 1 이상 {size - 2} 이하여야 합니다: {stride}')
+    if max_chunks < 1 or per_pass < 1:
+        raise ValueError(f'최대 조각 수와 회차당 조각 수는 1 이상이어야 합니다: {max_chunks}, {per_pass}')
+    if not 0.5 <= exit_threshold <= 1.0:
+        raise ValueError(f'조기 종료 스팸 확률은 0.5~1이어야 합니다: {exit_threshold}')
+
+
+def token_limit(size, stride, max_chunks):
+    """조각 max_chunks개가 덮는 최대 토큰 수 (특수 토큰 2개 포함, 이보다 뒤는 판정하지 않음)"""
+    return size + stride * (max_chunks - 1)
+
+
+def split_chunks(input_ids, size, stride, max_chunks):
+    """
+    특수 토큰이 붙은 토큰 id 목록([CLS] 내용 [SEP])을 겹치는 조각 목록으로 분할
+    각 조각은 size 토큰 이하이고 같은 [CLS]/[SEP]로 감쌈, 마지막 조각이 내용 끝에 닿거나 max_chunks개가 되면 중단
+    """
+    cls_id, content, sep_id = input_ids[0], list(input_ids[1:-1]), input_ids[-1]
+    width = size - 2
+    chunks = []
+    start = 0
+    while len(chunks) < max_chunks:
+        chunks.append([cls_id] + content[start:start + width] + [sep_id])
+        if start + width >= len(content):
+            break
+        start += stride
+    return chunks
+
+
+def spam_probabilities(logits):
+    """[N, 2] logits(numpy) -> 행별 스팸 확률 (softmax의 1번 라벨)"""
+    logits = np.asarray(logits, dtype=np.float64)
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp[:, 1] / exp.sum(axis=1)
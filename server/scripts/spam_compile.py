@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+torch 백엔드 컴파일 실행 경로 (TorchScript trace / torch.compile)
+- trace: eager 모델을 최초 1회 TorchScript로 trace해서 `<원본>.<해시>.<정밀도>.torch<버전>.ts`로 저장하고,
+  이후에는 eager 모델 없이 저장된 모듈을 로드 (체크포인트나 torch 버전이 바뀌면 파일 이름이 달라져 다시 trace)
+- inductor: torch.compile(CPU inductor), 컴파일 결과는 torch 버전별 inductor 캐시 디렉토리에 저장되어 재시작 시 재사용
+입력은 고정 길이 버킷(16, 32, 64, ..., 최대 길이)까지 패딩해서 실행하므로 실행되는 입력 모양이 몇 가지로 제한되고,
+warm_up으로 버킷별 모양을 시작 시 미리 실행해 첫 요청이 최적화/컴파일 시간을 기다리지 않게 합니다.
+torch는 이 모듈을 사용할 때만 import합니다.
+"""
+import os
+import json
+import time
+import warnings
+from pathlib import Path
+
+from spam_runtime import checkpoint_hash, unique_temp_path
+from spam_metrics import log
+
+COMPILE_MODES = ('off', 'trace', 'inductor')
+LENGTH_BUCKETS = (16, 32, 64, 128, 256, 512)
+# trace 결과 검증 허용 오차 (eager 대비 logits 최대 차이)
+TRACE_TOLERANCE = 1e-3
+# 사용자가 지정한 inductor 캐시 디렉토리 (transformers 모델 모듈을 import하면 기본값이 환경 변수에 채워지므로 import 전에 기록)
+USER_INDUCTOR_CACHE_DIR = os.environ.get('TORCHINDUCTOR_CACHE_DIR')
+
+
+def resolve_compile_mode(mode):
+    """컴파일 모드 설정 검증 (off, trace, inductor)"""
+    mode = (mode or 'off').strip().lower()
+    if mode in ('0', 'false', 'no', ''):
+        return 'off'
+    if mode not in COMPILE_MODES:
+        raise ValueError(f'알 수 없는 compile 모드: {mode} (가능: {", ".join(COMPILE_MODES)})')
+    return mode
+
+
+def length_buckets(max_len):
+    """max_len 이하의 버킷 길이 목록 (max_len 포함)"""
+    return sorted({length for length in LENGTH_BUCKETS if length < max_len} | {max_len})
+
+
+def torch_version_tag():
+    import torch
+
+    return torch.__version__.replace('+', '-')
+
+
+def traced_model_path(cache_path, precision):
+    """체크포인트 해시/정밀도/torch 버전으로 구분되는 TorchScript 파일 경로 (예: spam_model_title.3f2a9c1e5b7d4a60.fp32.torch2.4.1.ts)"""
+    file_hash = checkpoint_hash(cache_path)[:16]
+    return cache_path.with_name(f'{cache_path.stem}.{file_hash}.{precision}.torch{torch_version_tag()}.ts')
+
+
+def inductor_cache_dir(cache_dir):
+    """torch 버전별 inductor 컴파일 캐시 디렉토리"""
+    return Path(cache_dir) / f'inductor-torch{torch_version_tag()}'
+
+
+def logits_only(model):
+    """HF 출력 객체 대신 logits 텐서만 반환하는 모듈 (trace/compile 입력 고정용)"""
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, classifier):
+            super().__init__()
+            self.classifier = classifier
+
+        def forward(self, input_ids, attention_mask):
+            return self.classifier(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)[0]
+
+    return LogitsOnly(model).eval()
+
+
+def sample_inputs(batch_size, length, pad_token_id, pad_rows=1):
+    """특수 토큰과 패딩이 들어간 임의 입력 (처음 pad_rows개 행은 뒤쪽 절반을 패딩)"""
+    import torch
+
+    generator = torch.Generator().manual_seed(batch_size * 1000 + length)
+    input_ids = torch.randint(5, 1000, (batch_size, length), generator=generator)
+    input_ids[:, 0] = 0
+    input_ids[:, -1] = 2
+    for row in range(min(pad_rows, batch_size)):
+        input_ids[row, max(2, length // 2):] = pad_token_id
+    attention_mask = (input_ids != pad_token_id).long()
+    return input_ids, attention_mask
+
+
+class CompiledClassifier:
+    """컴파일된 모듈 래퍼: (input_ids, attention_mask)를 버킷 길이까지 패딩해서 실행 → logits 텐서"""
+
+    def __init__(self, module, mode, pad_token_id, max_len, path=None):
+        self.module = module
+        self.mode = mode
+        self.pad_token_id = pad_token_id
+        self.buckets = length_buckets(max_len)
+        self.path = path
+
+    def parameters(self):
+        return self.module.parameters()
+
+    def buffers(self):
+        return self.module.buffers()
+
+    def bucket_length(self, length):
+        for bucket in self.buckets:
+            if bucket >= length:
+                return bucket
+        return length
+
+    def __call__(self, input_ids, attention_mask):
+        import torch
+
+        input_ids = torch.as_tensor(input_ids)
+        attention_mask = torch.as_tensor(attention_mask)
+        padding = self.bucket_length(input_ids.shape[1]) - input_ids.shape[1]
+        if padding:
+            input_ids = torch.nn.functional.pad(input_ids, (0, padding), value=self.pad_token_id)
+            attention_mask = torch.nn.functional.pad(attention_mask, (0, padding), value=0)
+        with torch.no_grad():
+            return self.module(input_ids, attention_mask)
+
+    def warm_up(self, max_len=None, batch_sizes=(1,), repeats=2):
+        """
+        max_len 이하 버킷 길이 x batch_sizes 모양을 repeats번씩 미리 실행
+        (TorchScript 프로파일링 최적화/torch.compile 컴파일을 시작 시 끝냄), 결과: 소요 시간(초)
+        """
+        start = time.perf_counter()
+        for length in self.buckets:
+            if max_len is not None and length > self.bucket_length(max_len):
+                break
+            for batch_size in batch_sizes:
+                input_ids, attention_mask = sample_inputs(batch_size, length, self.pad_token_id)
+                for _ in range(repeats):
+                    self(input_ids, attention_mask)
+        return time.perf_counter() - start
+
+
+def load_traced_classifier(cache_path, precision, max_len):
+    """저장된 TorchScript 모듈 로드 (없거나 읽을 수 없으면 None)"""
+    import torch
+
+    if not cache_path.exists():
+        return None
+    path = traced_model_path(cache_path, precision)
+    if not path.exists():
+        return None
+    try:
+        extra_files = {'meta.json': ''}
+        with warnings.catch_warnings():
+            # 최근 torch의 TorchScript 지원 중단 예고 경고 (동작에는 영향 없음)
+            warnings.simplefilter('ignore', FutureWarning)
+            module = torch.jit.load(str(path), map_location='cpu', _extra_files=extra_files)
+        meta = json.loads(extra_files['meta.json'] or '{}')
+        return CompiledClassifier(module.eval(), 'trace', meta.get('pad_token_id', 1), max_len, path)
+    except Exception as e:
+        log('warning', f'TorchScript 모델 로드 실패, 다시 trace합니다: {str(e)}')
+        return None
+
+
+def trace_classifier(model, cache_path, precision, max_len):
+    """
+    eager 모델을 TorchScript로 trace해서 저장
+    trace에 쓴 것과 다른 배치/길이 입력에서 eager와 logits를 비교해, 모양에 따라 결과가 달라지면 ValueError
+    """
+    import torch
+
+    pad_token_id = getattr(model.config, 'pad_token_id', None)
+    pad_token_id = 1 if pad_token_id is None else pad_token_id
+    wrapper = logits_only(model)
+    with torch.no_grad(), warnings.catch_warnings():
+        # 모양에 따른 분기가 상수로 고정된다는 TracerWarning은 아래 검증으로 대신함
+        warnings.simplefilter('ignore', torch.jit.TracerWarning)
+        warnings.simplefilter('ignore', FutureWarning)
+        module = torch.jit.trace(wrapper, sample_inputs(2, 16, pad_token_id), check_trace=False)
+        for batch_size, length in ((1, 8), (3, 40)):
+            input_ids, attention_mask = sample_inputs(batch_size, length, pad_token_id)
+            diff = float((module(input_ids, attention_mask).float() - wrapper(input_ids, attention_mask).float()).abs().max())
+            if diff > TRACE_TOLERANCE:
+                raise ValueError(f'trace 결과가 eager와 다릅니다 (batch={batch_size}, length={length}, 최대 차이 {diff:.2e})')
+
+    path = traced_model_path(cache_path, precision)
+    # 이 프로세스 전용 임시 파일 (동시에 trace하는 다른 프로세스와 섞이지 않도록), 실패하면 삭제
+    tmp_path = unique_temp_path(path)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            torch.jit.save(module, str(tmp_path), _extra_files={'meta.json': json.dumps({'pad_token_id': pad_token_id, 'torch_version': torch.__version__})})
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return CompiledClassifier(module, 'trace', pad_token_id, max_len, path)
+
+
+def compile_classifier(model, max_len, cache_dir):
+    """eager 모델을 torch.compile (실제 컴파일은 첫 실행 시, inductor 캐시는 TORCHINDUCTOR_CACHE_DIR을 지정하지 않았으면 cache_dir)"""
+    import torch
+
+    os.environ['TORCHINDUCTOR_CACHE_DIR'] = USER_INDUCTOR_CACHE_DIR or str(cache_dir)
+    pad_token_id = getattr(model.config, 'pad_token_id', None)
+    pad_token_id = 1 if pad_token_id is None else pad_token_id
+    module = torch.compile(logits_only(model), backend='inductor')
+    return CompiledClassifier(module, 'inductor', pad_token_id, max_len)
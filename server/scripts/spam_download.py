@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+모델 체크포인트 다운로드 (스트리밍, 이어받기, 동시 실행 안전)
+- 메모리에 모으지 않고 `<파일>.part`에 큰 버퍼 단위로 바로 기록
+- 중단된 `.part`가 있으면 HTTP Range 요청으로 이어받기 (받기 시작할 때 `<파일>.part.json`에 기록한 ETag/Last-Modified를
+  If-Range로 보내므로, 원격 파일이 바뀌었으면 서버가 전체를 다시 보내고 이전 `.part`와 이어 붙이지 않음)
+- `.part`가 이미 원격 파일 크기와 같거나 더 크면(416 응답) 같으면 검증 후 완료, 크면 지우고 처음부터
+- 크기(Content-Length/Content-Range)와 체크섬(지정한 SHA-256 또는 MD5 형식의 ETag) 검증
+- 파일 잠금 안에서 최종 경로로 원자적 rename → 여러 프로세스가 동시에 받아도 깨진 파일이 보이지 않음
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import urllib.error
+import urllib.request
+from spam_runtime import remember_checkpoint_hash
+from spam_metrics import log
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+MAX_ATTEMPTS = 5
+# 서버 오류(5xx) 외에 다시 시도하는 HTTP 상태 (요청 시간 초과, 요청 과다)
+RETRYABLE_HTTP_STATUS = (408, 429)
+PROGRESS_INTERVAL = 10 * 1024 * 1024  # 10MB마다 진행 상황 출력
+
+
+class FileLock:
+    """프로세스 간 배타 잠금 (`<파일>.lock`, POSIX는 fcntl, Windows는 msvcrt)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, 'a+b')
+        try:
+            import fcntl
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+            self.file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            import fcntl
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        except ImportError:
+            import msvcrt
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        return False
+
+
+def expected_total_size(response, offset):
+    """응답 헤더로 전체 파일 크기 계산 (알 수 없으면 None)"""
+    content_range = response.headers.get('Content-Range')
+    if content_range:
+        match = re.match(r'bytes\s+\d+-\d+/(\d+)', content_range)
+        if match:
+            return int(match.group(1))
+    content_length = response.headers.get('Content-Length')
+    if content_length is not None:
+        return offset + int(content_length)
+    return None
+
+
+def etag_md5(etag):
+    """ETag 헤더 값이 MD5 형식(32자리 16진수)이면 반환 (멀티파트 업로드 ETag 등은 None)"""
+    etag = (etag or '').strip('"').lower()
+    return etag if re.fullmatch(r'[0-9a-f]{32}', etag) else None
+
+
+def hash_existing(path, digests):
+    """이어받기 전 이미 받은 부분을 체크섬에 반영"""
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            for digest in digests:
+                digest.update(chunk)
+
+
+def validator_path(part_path):
+    return part_path.with_name(part_path.name + '.json')
+
+
+def read_validator(part_path):
+    """`.part`를 받기 시작할 때 기록한 원격 파일 식별 정보 ({'etag', 'last_modified'}, 없으면 None)"""
+    try:
+        validator = json.loads(validator_path(part_path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return validator if validator.get('etag') or validator.get('last_modified') else None
+
+
+def write_validator(part_path, response):
+    validator = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+    validator_path(part_path).write_text(json.dumps(validator), encoding='utf-8')
+
+
+def if_range_value(validator):
+    """If-Range 헤더 값 (강한 ETag 우선, 약한 ETag는 If-Range에 쓸 수 없으므로 Last-Modified)"""
+    etag = validator.get('etag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return validator.get('last_modified')
+
+
+def discard_part(part_path):
+    """받던 `.part`와 식별 정보 삭제 (다음 시도는 처음부터)"""
+    part_path.unlink(missing_ok=True)
+    validator_path(part_path).unlink(missing_ok=True)
+
+
+def unsatisfiable_total(error):
+    """416 응답의 `Content-Range: bytes */전체 크기`에서 전체 크기 (없으면 None)"""
+    match = re.match(r'bytes\s+\*/(\d+)', error.headers.get('Content-Range') or '')
+    return int(match.group(1)) if match else None
+
+
+def download_once(url, part_path, name, ssl_context):
+    """
+    한 번의 HTTP 요청으로 part_path에 이어서 기록
+    결과: (sha256 hexdigest, md5 hexdigest, 전체 크기 또는 None, ETag MD5 또는 None)
+    """
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    validator = read_validator(part_path) if offset else None
+    if offset and (validator is None or not if_range_value(validator)):
+        # 어떤 원격 파일의 앞부분인지 알 수 없으면 이어 붙이지 않음
+        log('info', f'{name} 이전 .part의 원격 파일 정보가 없어 처음부터 다시 다운로드')
+        discard_part(part_path)
+        offset = 0
+    request = urllib.request.Request(url)
+    if offset:
+        request.add_header('Range', f'bytes={offset}-')
+        request.add_header('If-Range', if_range_value(validator))
+
+    try:
+        response = urllib.request.urlopen(request, context=ssl_context, timeout=60)
+    except urllib.error.HTTPError as e:
+        if e.code != 416 or not offset:
+            raise
+        # If-Range가 맞았는데 범위가 없음: .part가 이미 원격 파일 전체이거나(rename 직전 중단) 원격 파일보다 큼
+        total_size = unsatisfiable_total(e)
+        if total_size == offset:
+            log('info', f'{name} 이미 전부 받은 .part 확인, 검증 후 완료')
+            sha256 = hashlib.sha256()
+            md5 = hashlib.md5()
+            hash_existing(part_path, (sha256, md5))
+            return sha256.hexdigest(), md5.hexdigest(), total_size, etag_md5(validator.get('etag'))
+        log('warning', f'{name} .part({offset} bytes)가 원격 파일({total_size} bytes)과 맞지 않아 처음부터 다시 다운로드')
+        discard_part(part_path)
+        return download_once(url, part_path, name, ssl_context)
+
+    with response:
+        if offset and response.status != 206:
+            # 서버가 Range를 무시했거나 원격 파일이 바뀜(If-Range 불일치) → 처음부터 다시 받기
+            log('info', f'{name} 이어받기 불가 응답 ({response.status}), 처음부터 다시 다운로드')
+            offset = 0
+        elif offset:
+            log('info', f'{name} 다운로드 이어받기: {offset / (1024 * 1024):.2f} MB부터')
+        if not offset:
+            write_validator(part_path, response)
+
+        total_size = expected_total_size(response, offset)
+        expected_md5 = etag_md5(response.headers.get('ETag'))
+        if total_size:
+            log('info', f'{name} 모델 크기: {total_size / (1024 * 1024):.2f} MB')
+
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        if offset:
+            hash_existing(part_path, (sha256, md5))
+
+        downloaded = offset
+        next_progress = (downloaded // PROGRESS_INTERVAL + 1) * PROGRESS_INTERVAL
+        with open(part_path, 'ab' if offset else 'wb') as f:
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                sha256.update(chunk)
+                md5.update(chunk)
+                downloaded += len(chunk)
+                if downloaded >= next_progress:
+                    log('info', f'{name} 다운로드 진행: {downloaded / (1024 * 1024):.2f} MB')
+                    next_progress += PROGRESS_INTERVAL
+            f.flush()
+            os.fsync(f.fileno())
+
+    return sha256.hexdigest(), md5.hexdigest(), total_size, expected_md5
+
+
+def retryable(error):
+    """
+    다시 시도할 오류인지 (네트워크 오류, 5xx, 408/429)
+    주소가 틀렸거나(404) 인증이 만료된(401/403) 응답은 다시 시도해도 같으므로 바로 실패
+    """
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code >= 500 or error.code in RETRYABLE_HTTP_STATUS
+    return True
+
+
+def download_file(url, dest_path, name, ssl_context=None, expected_sha256=None):
+    """
+    url을 dest_path로 다운로드 (이미 있으면 아무것도 하지 않음)
+    expected_sha256을 주면 다운로드 후 SHA-256을 검증하고, 없으면 MD5 형식 ETag가 있을 때 MD5로 검증
+    """
+    part_path = dest_path.with_name(dest_path.name + '.part')
+
+    with FileLock(dest_path.with_name(dest_path.name + '.lock')):
+        # 잠금을 기다리는 동안 다른 프로세스가 다운로드를 끝냈을 수 있음
+        if dest_path.exists():
+            return dest_path
+
+        log('info', f'{name} 모델 다운로드 중... (최초 1회)')
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                sha256, md5, total_size, expected_md5 = download_once(url, part_path, name, ssl_context)
+            except (urllib.error.URLError, ConnectionError, TimeoutError, OSError) as e:
+                if attempt == MAX_ATTEMPTS or not retryable(e):
+                    raise
+                wait = min(2 ** attempt, 30)
+                log('warning', f'{name} 다운로드 중단 ({str(e)}), {wait}초 후 이어받기 ({attempt}/{MAX_ATTEMPTS})')
+                time.sleep(wait)
+                continue
+
+            size = part_path.stat().st_size
+            if total_size is not None and size < total_size:
+                # 연결이 중간에 끊김 → 이어받기
+                if attempt == MAX_ATTEMPTS:
+                    raise IOError(f'{name} 다운로드 불완전: {size}/{total_size} bytes')
+                log('warning', f'{name} 다운로드 불완전 ({size}/{total_size} bytes), 이어받기 ({attempt}/{MAX_ATTEMPTS})')
+                continue
+            break
+
+        # 검증 실패 시 .part를 지워 다음 시도는 처음부터 받도록 함
+        if total_size is not None and size != total_size:
+            discard_part(part_path)
+            raise IOError(f'{name} 파일 크기 불일치: {size} != {total_size} bytes')
+        if expected_sha256 and sha256 != expected_sha256.lower():
+            discard_part(part_path)
+            raise IOError(f'{name} SHA-256 불일치: {sha256} != {expected_sha256}')
+        if not expected_sha256 and expected_md5 and md5 != expected_md5:
+            discard_part(part_path)
+            raise IOError(f'{name} MD5(ETag) 불일치: {md5} != {expected_md5}')
+
+        os.replace(part_path, dest_path)
+        validator_path(part_path).unlink(missing_ok=True)
+        remember_checkpoint_hash(dest_path, sha256)
+        log('info', f'{name} 다운로드 완료: {size / (1024 * 1024):.2f} MB')
+
+    return dest_path
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+스팸 유사 문서 지문 색인 (MinHash + LSH, SQLite, 여러 프로세스 공유)
+모델이 스팸으로 판정한 텍스트의 MinHash 서명(정규화한 문자 shingle 기준)을 저장해 두고,
+새 텍스트의 추정 Jaccard 유사도가 threshold 이상인 스팸이 있으면 모델 없이 스팸으로 판정합니다
+(같은 행사를 조금씩 고쳐 다시 올리는 스팸 캠페인용).
+
+- 서명은 num_perm개의 32비트 최솟값, LSH는 rows개씩 묶은 band의 해시로 후보를 찾음
+  (band 수/rows는 threshold에서 유사도 threshold인 쌍을 95% 이상 후보로 찾도록 자동 선택)
+- 후보는 저장된 서명과 비교해 추정 유사도가 threshold 이상일 때만 적중
+- band 키는 (모델 식별자, 필드, band 번호, band 값)의 64비트 해시 하나이므로 색인이 커져도 조회는 band 수만큼의 인덱스 탐색
+- 마지막 적중(또는 저장) 후 max_age초가 지난 항목과 max_entries를 넘는 오래된 항목은 삭제
+"""
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+import numpy as np
+
+_WHITESPACE = re.compile(r'\s+')
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+_HASH_PRIME = np.uint64(1099511628211)
+# 유사도 threshold인 쌍이 후보로 잡혀야 하는 최소 확률
+_CANDIDATE_RECALL = 0.95
+# 크기/나이 제한 정리 주기 (초)
+_EVICT_INTERVAL = 60.0
+
+
+def normalize_for_fingerprint(text):
+    """shingle 추출용 정규화 (NFKC, 소문자, 공백 제거: 띄어쓰기만 바꾼 변형도 같은 shingle)"""
+    return _WHITESPACE.sub('', unicodedata.normalize('NFKC', text)).lower()
+
+
+def shingle_hashes(text, size):
+    """문자 size-gram의 64비트 해시 (중복 제거), 텍스트가 size보다 짧으면 텍스트 전체 하나"""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    size = max(1, min(size, len(codes)))
+    count = len(codes) - size + 1
+    h = np.full(count, size, dtype=np.uint64)
+    for k in range(size):
+        h = h * _HASH_PRIME + codes[k:k + count]
+    return np.unique(h)
+
+
+def band_layout(num_perm, threshold):
+    """
+    (bands, rows): 유사도가 threshold인 쌍이 _CANDIDATE_RECALL 이상 후보가 되는 가장 큰 rows
+    (rows가 클수록 유사도가 낮은 후보가 줄어듦)
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= _CANDIDATE_RECALL:
+            best = (bands, rows)
+    return best
+
+
+class FingerprintIndex:
+    """MinHash/LSH 스팸 지문 색인 (scope: 모델 식별자와 필드처럼 서로 섞이면 안 되는 구분)"""
+
+    def __init__(self, path, threshold=0.8, max_entries=1000000, max_age=30 * 86400, num_perm=64, shingle_size=4, min_length=20, seed=0):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f'지문 유사도 기준은 0~1이어야 합니다: {threshold}')
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.min_length = min_length
+        self.bands, self.rows = band_layout(num_perm, threshold)
+        self.seeds = np.random.RandomState(seed).randint(1, 2 ** 63 - 1, size=num_perm, dtype=np.int64).astype(np.uint64)[:, None]
+        self.params = f'perm={num_perm};shingle={shingle_size};seed={seed}'
+        self.evicted_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        # 연결 하나를 여러 스레드(병렬 모델 모드)가 함께 쓰므로 직렬화
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' id INTEGER PRIMARY KEY,'
+            ' scope TEXT NOT NULL,'
+            ' signature BLOB NOT NULL,'
+            ' last_seen REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS entries_last_seen ON entries (last_seen)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS bands (key INTEGER NOT NULL, entry_id INTEGER NOT NULL, PRIMARY KEY (key, entry_id)) WITHOUT ROWID')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS bands_entry ON bands (entry_id)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self.check_layout()
+
+    def check_layout(self):
+        """
+        저장된 서명 설정이 다르면 색인을 비우고, band 구성(threshold)만 다르면 저장된 서명으로 band를 다시 만듦
+        """
+        meta = dict(self.conn.execute('SELECT name, value FROM meta').fetchall())
+        layout = f'{self.bands}x{self.rows}'
+        if meta.get('params') == self.params and meta.get('layout') == layout:
+            return
+        with self.lock, self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            meta = dict(self.conn.execute('SELECT name, value FROM meta').fetchall())
+            if meta.get('params') != self.params:
+                self.conn.execute('DELETE FROM bands')
+                self.conn.execute('DELETE FROM entries')
+            elif meta.get('layout') != layout:
+                self.conn.execute('DELETE FROM bands')
+                for entry_id, scope, signature in self.conn.execute('SELECT id, scope, signature FROM entries').fetchall():
+                    keys = self.band_keys(scope, np.frombuffer(signature, dtype=np.uint32))
+                    self.conn.executemany('INSERT OR IGNORE INTO bands (key, entry_id) VALUES (?, ?)', [(key, entry_id) for key in keys])
+            self.conn.executemany('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', [('params', self.params), ('layout', layout)])
+
+    def signature(self, text):
+        """텍스트의 MinHash 서명 (uint32 num_perm개), 정규화 후 min_length자보다 짧으면 None"""
+        normalized = normalize_for_fingerprint(text)
+        if len(normalized) < self.min_length:
+            return None
+        hashes = shingle_hashes(normalized, self.shingle_size)
+        # 해시 함수 num_perm개: seed와 xor 후 splitmix64 혼합
+        mixed = hashes[None, :] ^ self.seeds
+        mixed ^= mixed >> np.uint64(30)
+        mixed *= _MIX1
+        mixed ^= mixed >> np.uint64(27)
+        mixed *= _MIX2
+        mixed ^= mixed >> np.uint64(31)
+        return (mixed.min(axis=1) >> np.uint64(32)).astype(np.uint32)
+
+    def band_keys(self, scope, signature):
+        """band별 64비트 키 (SQLite INTEGER 범위의 부호 있는 정수)"""
+        keys = []
+        prefix = scope.encode('utf-8') + b'\0'
+        for band in range(self.bands):
+            values = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(prefix + bytes([band]) + values, digest_size=8).digest()
+            keys.append(int.from_bytes(digest, 'little', signed=True))
+        return keys
+
+    def similarity(self, a, b):
+        """추정 Jaccard 유사도 (서명이 같은 위치의 비율)"""
+        return float(np.mean(a == b))
+
+    def match_many(self, scope, texts):
+        """
+        색인된 스팸과 유사도가 threshold 이상인 텍스트 (결과: {텍스트: 가장 높은 추정 유사도})
+        적중한 항목은 마지막 적중 시각을 갱신해 오래된 항목 삭제에서 제외
+        """
+        signatures = {text: self.signature(text) for text in texts}
+        signatures = {text: signature for text, signature in signatures.items() if signature is not None}
+        if not signatures:
+            return {}
+        found = {}
+        matched_ids = set()
+        with self.lock:
+            for text, signature in signatures.items():
+                keys = self.band_keys(scope, signature)
+                placeholders = ','.join('?' * len(keys))
+                rows = self.conn.execute(
+                    f'SELECT id, signature FROM entries WHERE id IN (SELECT entry_id FROM bands WHERE key IN ({placeholders})) AND scope = ?',
+                    keys + [scope],
+                ).fetchall()
+                for entry_id, stored in rows:
+                    score = self.similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+                    if score >= self.threshold:
+                        matched_ids.add(entry_id)
+                        found[text] = max(found.get(text, 0.0), score)
+            self.hits += len(found)
+            self.misses += len(signatures) - len(found)
+            if matched_ids:
+                now = time.time()
+                with self.conn:
+                    self.conn.execute('BEGIN')
+                    self.conn.executemany('UPDATE entries SET last_seen = ? WHERE id = ?', [(now, entry_id) for entry_id in matched_ids])
+        return found
+
+    def add_many(self, scope, texts):
+        """스팸으로 확인된 텍스트 저장 (너무 짧은 텍스트는 제외), 결과: 저장한 수"""
+        signatures = [signature for signature in (self.signature(text) for text in texts) if signature is not None]
+        if not signatures:
+            return 0
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute('BEGIN')
+            for signature in signatures:
+                entry_id = self.conn.execute(
+                    'INSERT INTO entries (scope, signature, last_seen) VALUES (?, ?, ?)', (scope, signature.tobytes(), now)
+                ).lastrowid
+                self.conn.executemany('INSERT OR IGNORE INTO bands (key, entry_id) VALUES (?, ?)',
+                                      [(key, entry_id) for key in self.band_keys(scope, signature)])
+            if now - self.evicted_at >= _EVICT_INTERVAL:
+                self.evict(now)
+        return len(signatures)
+
+    def evict(self, now=None):
+        """max_age초 넘게 적중하지 않은 항목과 max_entries를 넘는 오래된 항목 삭제 (결과: 삭제 수)"""
+        now = now or time.time()
+        self.evicted_at = now
+        stale = []
+        if self.max_age > 0:
+            stale = [row[0] for row in self.conn.execute('SELECT id FROM entries WHERE last_seen < ?', (now - self.max_age,)).fetchall()]
+        excess = self.conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - len(stale) - self.max_entries
+        if excess > 0:
+            stale += [row[0] for row in self.conn.execute(
+                'SELECT id FROM entries WHERE last_seen >= ? ORDER BY last_seen LIMIT ?', (now - self.max_age if self.max_age > 0 else 0, excess)
+            ).fetchall()]
+        for start in range(0, len(stale), 500):
+            chunk = stale[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            self.conn.execute(f'DELETE FROM bands WHERE entry_id IN ({placeholders})', chunk)
+            self.conn.execute(f'DELETE FROM entries WHERE id IN ({placeholders})', chunk)
+        return len(stale)
+
+    def stats(self):
+        """항목 수, band 구성, 이번 프로세스의 적중/미적중 수"""
+        with self.lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return {
+            'path': str(self.path),
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'max_age_seconds': self.max_age,
+            'threshold': self.threshold,
+            'num_perm': self.num_perm,
+            'bands': self.bands,
+            'rows': self.rows,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def close(self):
+        self.conn.close()
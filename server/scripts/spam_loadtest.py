@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+스팸 필터링 부하 테스트
+spam_benchmark와 같은 작은 랜덤 초기화 대체 모델을 임시 디렉토리에 만들어 네트워크 없이 실행하고,
+실제 실행 방식별로 처리량, 지연 시간(p50/p95/p99), 오류/타임아웃 비율, 프로세스별 최대 RSS를 측정합니다.
+
+대상(--target):
+- oneshot: 요청마다 `spam_check_single.py` 프로세스 실행 (stdin JSON 1건, 기존 호출 방식)
+- serve: `--serve` 상주 프로세스에 줄 단위 JSON 요청 (SPAM_SERVE_WORKERS로 워커 풀)
+- listen: `--listen unix:<임시 소켓>` HTTP 서버에 POST /check
+
+부하: 요청은 --rate(초당 요청 수, 포아송 도착)로 도착하고 처리 중인 요청은 --concurrency개로 제한합니다.
+--rate 0이면 동시성만큼 쉬지 않고 요청합니다. 지연 시간은 예정 도착 시각부터 재므로 동시성 제한 때문에 기다린 시간도 포함됩니다.
+워크로드는 길이가 다양한 한국어 합성 제목/설명이며, --duplicate-rate 비율의 요청은 이전 요청을 그대로 다시 보냅니다.
+
+사용법:
+    python3 spam_loadtest.py --target serve --rate 20 --concurrency 8 --requests 500
+    SPAM_SERVE_WORKERS=4 python3 spam_loadtest.py --target serve --rate 50 --output load.json
+SPAM_BACKEND, SPAM_PRECISION, SPAM_NUM_THREADS 등 환경 변수는 대상 프로세스에 그대로 적용됩니다.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+import http.client
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from spam_runtime import get_option
+from spam_benchmark import build_stand_in, worker_env, percentile
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+SCRIPT_PATH = SCRIPT_DIR / 'spam_check_single.py'
+TARGETS = ('oneshot', 'serve', 'listen')
+
+TITLE_PHRASES = (
+    '전국 생활체육 배드민턴 대회', '주말 풋살 리그 참가팀 모집', '시민 마라톤 10km 부문 접수',
+    '청소년 탁구 교실 회원 모집', '직장인 농구 대회 안내', '어린이 수영 강습 신청',
+    '동호회 테니스 친선 경기', '가을 등산 대회 참가 안내',
+)
+DESCRIPTION_PHRASES = (
+    '대회 일정과 장소는 추후 공지합니다.', '참가비는 2만원이며 현장 접수도 가능합니다.',
+    '동호인 누구나 참가 가능하며 시상금이 있습니다.', '주차 공간이 부족하니 대중교통을 이용해 주세요.',
+    '우천 시에는 실내 체육관에서 진행합니다.', '경기 규칙은 대한체육회 규정을 따릅니다.',
+    '문의 사항은 운영진에게 연락 바랍니다.', '개인 장비를 지참해 주시기 바랍니다.',
+)
+SPAM_PHRASES = (
+    '무료 상품권 지급 지금 바로 클릭', '카톡 문의 주시면 고수익 부업 안내', '저금리 대출 당일 승인',
+    '회원 가입만 해도 현금 지급', '최저가 할인 링크 확인하세요',
+)
+
+
+def synthetic_event(rng, spam_rate=0.1):
+    """길이가 다양한 합성 행사 (제목 1~3구, 설명은 비어있음~수천 자, 일부는 스팸 문구 포함)"""
+    title = ' '.join(rng.choice(TITLE_PHRASES) for _ in range(rng.randint(1, 3)))
+    # 설명 길이는 대부분 짧고 가끔 매우 긴 분포 (로그 정규)
+    sentences = 0 if rng.random() < 0.1 else min(200, int(rng.lognormvariate(1.5, 1.0)) + 1)
+    description = ' '.join(rng.choice(DESCRIPTION_PHRASES) for _ in range(sentences))
+    if rng.random() < spam_rate:
+        phrase = rng.choice(SPAM_PHRASES)
+        if rng.random() < 0.5:
+            title = f'{title} {phrase}'
+        else:
+            description = f'{description} {phrase}'
+    return {'title': f'{title} {rng.randint(1, 9999)}', 'description': description}
+
+
+def build_workload(count, duplicate_rate, seed=0):
+    """요청 count개 (duplicate_rate 비율은 이전 요청 중 하나를 그대로 재사용)"""
+    rng = random.Random(seed)
+    events = []
+    for _ in range(count):
+        if events and rng.random() < duplicate_rate:
+            events.append(rng.choice(events))
+        else:
+            events.append(synthetic_event(rng))
+    return events
+
+
+def proc_peak_rss(pid):
+    """/proc의 프로세스 최대 RSS(VmHWM, 바이트), 알 수 없으면 None"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def proc_children(pid):
+    """/proc의 자식 프로세스 pid 목록 (워커 풀 워커), 알 수 없으면 빈 목록"""
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+    except (OSError, ValueError):
+        pass
+    return children
+
+
+def wait_rss(process):
+    """종료된 자식 프로세스를 회수하고 최대 RSS(바이트) 반환 (wait4 미지원이면 None)"""
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except (AttributeError, ChildProcessError):
+        process.wait()
+        return None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # macOS는 바이트, Linux는 KB 단위
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+class OneshotClient:
+    """요청마다 spam_check_single.py 프로세스 실행 (프로세스별 최대 RSS 기록)"""
+
+    def __init__(self, env):
+        self.env = env
+        self.peaks = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        # 첫 실행은 메모리 매핑 변환이 포함되므로 측정 전에 한 번 실행
+        self.request({'title': '준비', 'description': ''}, None)
+        self.peaks.clear()
+
+    def request(self, event, timeout):
+        process = subprocess.Popen([sys.executable, str(SCRIPT_PATH)], cwd=str(SCRIPT_DIR), env=self.env,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, kill) if timeout else None
+        if timer is not None:
+            timer.start()
+        try:
+            process.stdin.write(json.dumps(event, ensure_ascii=False).encode('utf-8'))
+            process.stdin.close()
+            output = process.stdout.read()
+            peak = wait_rss(process)
+        finally:
+            if timer is not None:
+                timer.cancel()
+        with self.lock:
+            if peak is not None:
+                self.peaks.append(peak)
+        if timed_out.is_set():
+            raise TimeoutError('요청 타임아웃')
+        if process.returncode != 0:
+            raise RuntimeError(f'종료 코드 {process.returncode}')
+        response = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response
+
+    def stop(self):
+        pass
+
+    def peak_rss(self):
+        if not self.peaks:
+            return {}
+        return {'processes': len(self.peaks), 'per_process_max': max(self.peaks), 'per_process_median': statistics.median(self.peaks)}
+
+
+class ResidentClient:
+    """상주 프로세스 공통: 시작/종료와 프로세스(워커 포함)별 최대 RSS 추적"""
+
+    def __init__(self, env):
+        self.env = env
+        self.process = None
+        self.peaks = {}
+        self.sampler = None
+        self.stopped = threading.Event()
+
+    def sample_rss(self):
+        """자식(워커)은 교체되면 사라지므로 주기적으로 최대 RSS 기록"""
+        for pid in proc_children(self.process.pid):
+            peak = proc_peak_rss(pid)
+            if peak is not None:
+                key = f'worker-{pid}'
+                self.peaks[key] = max(self.peaks.get(key, 0), peak)
+
+    def sample_loop(self):
+        while not self.stopped.wait(0.5):
+            self.sample_rss()
+
+    def start_sampler(self):
+        self.sampler = threading.Thread(target=self.sample_loop, name='loadtest-rss', daemon=True)
+        self.sampler.start()
+
+    def stop_process(self, grace=0.0):
+        """grace초 안에 스스로 끝나지 않으면 SIGTERM, 회수하면서 메인 프로세스 최대 RSS 기록"""
+        self.stopped.set()
+        self.sample_rss()
+        timer = threading.Timer(grace, self.process.terminate)
+        timer.start()
+        try:
+            peak = wait_rss(self.process)
+        finally:
+            timer.cancel()
+        if peak is not None:
+            self.peaks['main'] = peak
+
+    def peak_rss(self):
+        return dict(self.peaks)
+
+
+class ServeClient(ResidentClient):
+    """`--serve` 프로세스 하나에 id를 붙여 요청을 연달아 보내고, 응답은 읽기 스레드가 id로 찾아 전달"""
+
+    def __init__(self, env):
+        super().__init__(env)
+        self.write_lock = threading.Lock()
+        self.pending = {}
+        self.next_id = 0
+
+    def start(self):
+        self.process = subprocess.Popen([sys.executable, '-u', str(SCRIPT_PATH), '--serve'], cwd=str(SCRIPT_DIR), env=self.env,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        ready = self.process.stdout.readline()
+        if not ready or not json.loads(ready).get('ready'):
+            raise RuntimeError('serve 프로세스가 준비되지 않았습니다')
+        threading.Thread(target=self.read_loop, name='loadtest-reader', daemon=True).start()
+        self.start_sampler()
+
+    def read_loop(self):
+        for line in self.process.stdout:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+            waiter = self.pending.pop(response.get('id'), None)
+            if waiter is not None:
+                waiter[1] = response
+                waiter[0].set()
+        # 프로세스가 끝나면 기다리던 요청을 모두 깨움 (응답 없음 = 오류)
+        for waiter in list(self.pending.values()):
+            waiter[0].set()
+
+    def request(self, event, timeout):
+        waiter = [threading.Event(), None]
+        with self.write_lock:
+            self.next_id += 1
+            request_id = self.next_id
+            self.pending[request_id] = waiter
+            self.process.stdin.write((json.dumps(dict(event, id=request_id), ensure_ascii=False) + '\n').encode('utf-8'))
+            self.process.stdin.flush()
+        if not waiter[0].wait(timeout):
+            self.pending.pop(request_id, None)
+            raise TimeoutError('요청 타임아웃')
+        response = waiter[1]
+        if response is None:
+            raise RuntimeError('serve 프로세스가 종료되었습니다')
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response
+
+    def stop(self):
+        # stdin을 닫으면 serve 모드는 남은 요청을 처리하고 종료
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.stop_process(grace=10.0)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """Unix 소켓 HTTP 연결"""
+
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ListenClient(ResidentClient):
+    """`--listen unix:<소켓>` 서버에 스레드별 keep-alive 연결로 POST /check"""
+
+    def __init__(self, env, socket_path):
+        super().__init__(env)
+        self.socket_path = socket_path
+        self.local = threading.local()
+
+    def start(self):
+        self.process = subprocess.Popen([sys.executable, '-u', str(SCRIPT_PATH), '--listen', f'unix:{self.socket_path}'],
+                                        cwd=str(SCRIPT_DIR), env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 300
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'listen 서버가 종료되었습니다 (종료 코드 {self.process.returncode})')
+            try:
+                status, _ = self.call('GET', '/readyz', None, 5)
+                if status == 200:
+                    self.start_sampler()
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError('listen 서버가 준비되지 않았습니다')
+
+    def call(self, method, path, body, timeout):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = UnixHTTPConnection(self.socket_path, timeout=timeout)
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        try:
+            connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            # 타임아웃 등으로 연결 상태를 알 수 없으면 다음 요청은 새 연결로
+            connection.close()
+            self.local.connection = None
+            raise
+
+    def request(self, event, timeout):
+        try:
+            status, data = self.call('POST', '/check', json.dumps(event, ensure_ascii=False).encode('utf-8'), timeout)
+        except socket.timeout:
+            raise TimeoutError('요청 타임아웃')
+        response = json.loads(data.decode('utf-8'))
+        if status != 200 or 'error' in response:
+            raise RuntimeError(f'HTTP {status}: {response.get("error")}')
+        return response
+
+    def stop(self):
+        self.stop_process()
+
+
+def run_load(client, events, rate, concurrency, timeout, seed=0):
+    """
+    events를 rate(초당, 0이면 제한 없음) 포아송 도착으로 보내고 처리 중 요청은 concurrency개로 제한
+    결과: (요청별 (상태, 지연 시간 ms) 목록, 전체 소요 시간 초)
+    """
+    rng = random.Random(seed)
+    slots = threading.BoundedSemaphore(concurrency)
+    outcomes = []
+    lock = threading.Lock()
+
+    def send(event, arrival):
+        try:
+            client.request(event, timeout)
+            status = 'ok'
+        except TimeoutError:
+            status = 'timeout'
+        except Exception:
+            status = 'error'
+        finally:
+            slots.release()
+        with lock:
+            outcomes.append((status, (time.perf_counter() - arrival) * 1000))
+
+    start = time.perf_counter()
+    arrival = start
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='loadtest') as executor:
+        for event in events:
+            if rate > 0:
+                arrival += rng.expovariate(rate)
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                arrival = time.perf_counter()
+            slots.acquire()
+            executor.submit(send, event, arrival)
+    return outcomes, time.perf_counter() - start
+
+
+def summarize(outcomes, elapsed):
+    """처리량/지연 시간/오류율 요약"""
+    total = len(outcomes)
+    latencies = [latency for status, latency in outcomes if status == 'ok']
+    errors = sum(1 for status, _ in outcomes if status == 'error')
+    timeouts = sum(1 for status, _ in outcomes if status == 'timeout')
+    summary = {
+        'requests': total,
+        'ok': len(latencies),
+        'errors': errors,
+        'timeouts': timeouts,
+        'error_rate': errors / total if total else 0.0,
+        'timeout_rate': timeouts / total if total else 0.0,
+        'elapsed_seconds': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+    }
+    if latencies:
+        summary['latency_ms'] = {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies),
+            'mean': statistics.fmean(latencies),
+        }
+    return summary
+
+
+def make_client(target, workdir, env):
+    if target == 'oneshot':
+        return OneshotClient(env)
+    if target == 'serve':
+        return ServeClient(env)
+    if target == 'listen':
+        return ListenClient(env, str(workdir / 'spam.sock'))
+    raise ValueError(f'알 수 없는 대상: {target} (가능: {", ".join(TARGETS)})')
+
+
+def run_loadtest(target, requests, rate, concurrency, timeout, duplicate_rate, warmup=5, verdict_cache=True,
+                 hidden_size=64, num_layers=2, seed=0):
+    """부하 테스트 실행 (결과: {'meta': 실행 환경, 'settings': 부하 설정, 'results': 요약}"""
+    workdir = Path(tempfile.mkdtemp(prefix='spam-loadtest-'))
+    client = None
+    try:
+        build_stand_in(workdir, hidden_size, num_layers)
+        env = worker_env(workdir)
+        # 중복 요청은 운영과 같이 판정 캐시로 처리 (캐시 파일은 임시 디렉토리)
+        env['SPAM_VERDICT_CACHE'] = '1' if verdict_cache else '0'
+        env['SPAM_MODEL_REGISTRY'] = str(workdir / 'registry.json')
+        events = build_workload(requests, duplicate_rate, seed)
+
+        client = make_client(target, workdir, env)
+        client.start()
+        # 워밍업은 측정하지 않으므로 타임아웃을 넉넉하게 (첫 요청의 지연 로드 포함)
+        for event in build_workload(warmup, 0.0, seed + 1):
+            client.request(event, max(timeout, 300.0))
+        outcomes, elapsed = run_load(client, events, rate, concurrency, timeout, seed)
+        client.stop()
+        results = summarize(outcomes, elapsed)
+        results['peak_rss_bytes'] = client.peak_rss()
+        client = None
+    finally:
+        if client is not None:
+            try:
+                client.stop()
+            except Exception:
+                pass
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    meta = {
+        'timestamp': time.time(),
+        'machine': platform.node(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'stand_in': {'hidden_size': hidden_size, 'num_layers': num_layers},
+        'env': {key: value for key, value in os.environ.items() if key.startswith('SPAM_')},
+    }
+    settings = {
+        'target': target, 'requests': requests, 'rate': rate, 'concurrency': concurrency, 'timeout_seconds': timeout,
+        'duplicate_rate': duplicate_rate, 'warmup': warmup, 'verdict_cache': verdict_cache, 'seed': seed,
+    }
+    return {'meta': meta, 'settings': settings, 'results': results}
+
+
+def main():
+    target = get_option('--target', 'SPAM_LOADTEST_TARGET', 'serve')
+    if target not in TARGETS:
+        raise ValueError(f'알 수 없는 대상: {target} (가능: {", ".join(TARGETS)})')
+    rate = float(get_option('--rate', 'SPAM_LOADTEST_RATE', '10'))
+    requests = get_option('--requests', 'SPAM_LOADTEST_REQUESTS')
+    duration = get_option('--duration', 'SPAM_LOADTEST_DURATION')
+    if requests is None:
+        # --duration초 동안 rate로 도착하는 만큼 (rate 0이면 기본 200건)
+        requests = int(float(duration) * rate) if duration and rate > 0 else 200
+
+    report = run_loadtest(
+        target,
+        requests=int(requests),
+        rate=rate,
+        concurrency=int(get_option('--concurrency', 'SPAM_LOADTEST_CONCURRENCY', '4')),
+        timeout=float(get_option('--timeout', 'SPAM_LOADTEST_TIMEOUT', '30')),
+        duplicate_rate=float(get_option('--duplicate-rate', 'SPAM_LOADTEST_DUPLICATE_RATE', '0.2')),
+        warmup=int(get_option('--warmup', 'SPAM_LOADTEST_WARMUP', '5')),
+        verdict_cache=get_option('--verdict-cache', 'SPAM_LOADTEST_VERDICT_CACHE', '1').strip().lower() not in ('0', 'false', 'no', 'off'),
+        hidden_size=int(get_option('--hidden-size', 'SPAM_BENCHMARK_HIDDEN_SIZE', '64')),
+        num_layers=int(get_option('--num-layers', 'SPAM_BENCHMARK_NUM_LAYERS', '2')),
+        seed=int(get_option('--seed', 'SPAM_LOADTEST_SEED', '0')),
+    )
+
+    output = get_option('--output', 'SPAM_LOADTEST_OUTPUT')
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(json.dumps(report, indent=2), flush=True)
+
+
+if __name__ == '__main__':
+    main()
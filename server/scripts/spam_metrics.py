@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+스팸 필터링 스크립트 로그/측정 공통 모듈
+- log: stderr JSON 로그 (레벨 미만이면 메시지 포맷팅 없이 바로 반환)
+- span / observe: 단계(import, download, load, tokenize, forward, total, request)별 소요 시간을 단조 타이머로 기록
+- increment: 누적 카운터 (판정 캐시 적중, 사전 필터 판정 등)
+- gauge: 현재 값 (RSS, 상주 모델 크기 등, add_collector로 등록한 함수가 출력 직전에 갱신)
+- snapshot / prometheus_text: 단계별 p50/p90/p99 요약(JSON)과 Prometheus 텍스트 형식 덤프
+로그 레벨: --log-level / SPAM_LOG_LEVEL (debug, info, warning, error, 기본 info)
+"""
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from spam_runtime import get_option
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+LOG_LEVEL = (get_option('--log-level', 'SPAM_LOG_LEVEL', 'info') or 'info').strip().lower()
+_threshold = LEVELS.get(LOG_LEVEL, LEVELS['info'])
+
+# Prometheus 히스토그램 버킷 (초)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 백분위 계산에 쓰는 최근 측정값 개수 (단계/모델별)
+SAMPLE_LIMIT = 2048
+
+_lock = threading.Lock()
+_series = {}
+_counters = {}
+_gauges = {}
+_collectors = []
+_started = time.time()
+
+
+def log_enabled(level):
+    """level 로그가 출력되는지 여부 (여러 값을 모아 출력하기 전에 확인)"""
+    return LEVELS[level] >= _threshold
+
+
+def log(level, message, *args, **fields):
+    """
+    stderr JSON 로그 한 줄 출력 ({level: 메시지, ...fields})
+    args가 있으면 출력할 때만 message.format(*args)로 포맷팅
+    """
+    if LEVELS[level] < _threshold:
+        return
+    if args:
+        message = message.format(*args)
+    record = {level: message}
+    record.update(fields)
+    print(json.dumps(record), file=sys.stderr, flush=True)
+
+
+class Series:
+    """단계 하나(모델별)의 누적 히스토그램과 최근 측정값"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples = deque(maxlen=SAMPLE_LIMIT)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.samples.append(seconds)
+
+    def summary(self):
+        samples = sorted(self.samples)
+
+        def percentile(q):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))] * 1000
+
+        return {
+            'count': self.count,
+            'sum_seconds': self.total,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': percentile(50),
+            'p90_ms': percentile(90),
+            'p99_ms': percentile(99),
+            'max_ms': self.max * 1000,
+        }
+
+
+def observe(stage, seconds, model=None):
+    """stage 소요 시간(초) 기록 (debug 레벨이면 로그도 출력)"""
+    key = (stage, model or '')
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = Series()
+        series.add(seconds)
+    if LEVELS['debug'] >= _threshold:
+        fields = {'span': stage, 'ms': round(seconds * 1000, 3)}
+        if model:
+            fields['model'] = model
+        log('debug', '{} 완료', f'{model} {stage}' if model else stage, **fields)
+
+
+@contextmanager
+def span(stage, model=None):
+    """with 블록의 소요 시간을 stage로 기록 (time.perf_counter 단조 타이머)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, model)
+
+
+def increment(name, value=1):
+    """누적 카운터 증가"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def gauge(name, value, model=None):
+    """현재 값 기록 (model별로 따로 저장)"""
+    with _lock:
+        _gauges[(name, model or '')] = value
+
+
+def add_collector(collect):
+    """snapshot/prometheus_text 직전에 호출할 gauge 갱신 함수 등록"""
+    _collectors.append(collect)
+
+
+def _collect():
+    for collect in _collectors:
+        try:
+            collect()
+        except Exception as e:
+            log('warning', f'측정값 수집 실패: {str(e)}')
+
+
+def snapshot():
+    """단계별 요약, 카운터, 현재 값 (JSON 직렬화 가능)"""
+    _collect()
+    with _lock:
+        stages = {f'{stage}:{model}' if model else stage: series.summary() for (stage, model), series in sorted(_series.items())}
+        counters = dict(sorted(_counters.items()))
+        gauges = {f'{name}:{model}' if model else name: value for (name, model), value in sorted(_gauges.items())}
+    return {'uptime_seconds': time.time() - _started, 'stages': stages, 'counters': counters, 'gauges': gauges}
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels.items() if value)
+
+
+def prometheus_text(**labels):
+    """누적 히스토그램/카운터를 Prometheus 텍스트 형식으로 변환 (labels: 모든 값에 붙일 고정 라벨, 예: worker)"""
+    _collect()
+    lines = [
+        '# HELP spam_stage_seconds 스팸 필터링 단계별 소요 시간',
+        '# TYPE spam_stage_seconds histogram',
+    ]
+    with _lock:
+        for (stage, model), series in sorted(_series.items()):
+            stage_labels = _labels(stage=stage, model=model, **labels)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, series.buckets):
+                cumulative += count
+                lines.append(f'spam_stage_seconds_bucket{{{stage_labels},le="{bound}"}} {cumulative}')
+            lines.append(f'spam_stage_seconds_bucket{{{stage_labels},le="+Inf"}} {series.count}')
+            lines.append(f'spam_stage_seconds_sum{{{stage_labels}}} {series.total}')
+            lines.append(f'spam_stage_seconds_count{{{stage_labels}}} {series.count}')
+        lines.append('# HELP spam_events_total 스팸 필터링 누적 이벤트 수')
+        lines.append('# TYPE spam_events_total counter')
+        for name, value in sorted(_counters.items()):
+            lines.append(f'spam_events_total{{{_labels(event=name, **labels)}}} {value}')
+        lines.append('# HELP spam_gauge 스팸 필터링 현재 값 (RSS, 상주 모델 크기 등)')
+        lines.append('# TYPE spam_gauge gauge')
+        for (name, model), value in sorted(_gauges.items()):
+            lines.append(f'spam_gauge{{{_labels(name=name, model=model, **labels)}}} {value}')
+    lines.append('# HELP spam_uptime_seconds 프로세스 실행 시간')
+    lines.append('# TYPE spam_uptime_seconds gauge')
+    uptime_labels = _labels(**labels)
+    lines.append(f'spam_uptime_seconds{{{uptime_labels}}} {time.time() - _started}' if uptime_labels else f'spam_uptime_seconds {time.time() - _started}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path, **labels):
+    """Prometheus 텍스트 파일로 저장 (node_exporter textfile collector 등에서 수집, 임시 파일에 쓴 뒤 교체)"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text(**labels))
+    os.replace(tmp_path, path)
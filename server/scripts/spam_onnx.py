@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+스팸 분류 모델 ONNX Runtime 백엔드
+PyTorch 체크포인트를 최초 1회 ONNX로 내보내고(체크포인트 해시별로 캐시), 이후에는 torch 없이
+onnxruntime으로 CPU 추론합니다. onnxruntime은 선택 의존성이며 torch는 내보내기 때만 import합니다.
+"""
+import numpy as np
+from spam_runtime import checkpoint_hash, unique_temp_path
+from spam_metrics import log
+
+ONNX_OPSET = 17
+ONNX_PRECISIONS = ('fp32', 'int8')
+
+
+def onnxruntime_available():
+    """onnxruntime 설치 여부"""
+    try:
+        import onnxruntime  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_onnx_precision(precision):
+    """ONNX 백엔드 정밀도 설정 검증 (fp32, int8 지원, bf16은 fp32로 대체)"""
+    precision = (precision or 'fp32').strip().lower()
+    if precision == 'bf16':
+        log('warning', 'ONNX 백엔드는 bf16을 지원하지 않아 fp32로 실행합니다')
+        return 'fp32'
+    if precision not in ONNX_PRECISIONS:
+        raise ValueError(f'알 수 없는 precision: {precision} (ONNX 가능: {", ".join(ONNX_PRECISIONS)})')
+    return precision
+
+
+def onnx_model_path(cache_path, precision='fp32'):
+    """체크포인트 해시로 구분되는 ONNX 파일 경로 (예: spam_model_title.3f2a9c1e5b7d4a60.int8.onnx)"""
+    file_hash = checkpoint_hash(cache_path)[:16]
+    suffix = '' if precision == 'fp32' else f'.{precision}'
+    return cache_path.with_name(f'{cache_path.stem}.{file_hash}{suffix}.onnx')
+
+
+class OnnxClassifier:
+    """ONNX Runtime 세션 래퍼: (input_ids, attention_mask) numpy 배열 → logits numpy 배열"""
+
+    def __init__(self, onnx_path, num_threads=1, num_interop_threads=1):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = num_interop_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.path = onnx_path
+        self.session = ort.InferenceSession(str(onnx_path), sess_options=options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, input_ids, attention_mask):
+        return self.session.run(['logits'], {
+            'input_ids': np.asarray(input_ids, dtype=np.int64),
+            'attention_mask': np.asarray(attention_mask, dtype=np.int64),
+        })[0]
+
+
+def load_onnx_classifier(cache_path, precision, num_threads=1, num_interop_threads=1):
+    """내보낸 ONNX 파일이 있으면 세션 생성, 없으면 None"""
+    if not cache_path.exists():
+        return None
+    onnx_path = onnx_model_path(cache_path, precision)
+    if not onnx_path.exists():
+        return None
+    return OnnxClassifier(onnx_path, num_threads, num_interop_threads)
+
+
+def export_onnx(model, cache_path, precision='fp32'):
+    """
+    PyTorch 분류 모델을 ONNX로 내보내기 (batch/sequence 길이는 동적 축)
+    int8이면 내보낸 fp32 그래프에 ONNX Runtime 동적 양자화를 추가로 적용
+    fp32 ONNX 파일이 이미 있으면 model은 사용하지 않음 (None 가능)
+    결과: precision에 해당하는 ONNX 파일 경로
+    """
+    fp32_path = onnx_model_path(cache_path, 'fp32')
+    if not fp32_path.exists():
+        import torch
+
+        class LogitsOnly(torch.nn.Module):
+            """HF 출력 객체 대신 logits 텐서만 반환 (ONNX 출력 이름 고정용)"""
+
+            def __init__(self, classifier):
+                super().__init__()
+                self.classifier = classifier
+
+            def forward(self, input_ids, attention_mask):
+                return self.classifier(input_ids=input_ids, attention_mask=attention_mask).logits
+
+        wrapper = LogitsOnly(model).eval()
+        # 패딩이 있는 샘플을 포함해야 attention mask 경로가 그래프에 기록됨
+        pad_token_id = getattr(model.config, 'pad_token_id', None)
+        pad_token_id = 1 if pad_token_id is None else pad_token_id
+        input_ids = torch.tensor([[0, 5, 6, 7, 2, pad_token_id], [0, 5, 6, 7, 8, 2]], dtype=torch.long)
+        attention_mask = (input_ids != pad_token_id).long()
+
+        # 이 프로세스 전용 임시 파일 (동시에 내보내는 다른 프로세스와 섞이지 않도록), 실패하면 삭제
+        tmp_path = unique_temp_path(fp32_path)
+        try:
+            with torch.no_grad():
+                torch.onnx.export(
+                    wrapper,
+                    (input_ids, attention_mask),
+                    str(tmp_path),
+                    input_names=['input_ids', 'attention_mask'],
+                    output_names=['logits'],
+                    dynamic_axes={
+                        'input_ids': {0: 'batch', 1: 'sequence'},
+                        'attention_mask': {0: 'batch', 1: 'sequence'},
+                        'logits': {0: 'batch'},
+                    },
+                    opset_version=ONNX_OPSET,
+                    dynamo=False,
+                )
+            tmp_path.replace(fp32_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        model.eval()
+
+    if precision == 'fp32':
+        return fp32_path
+
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    int8_path = onnx_model_path(cache_path, 'int8')
+    tmp_path = unique_temp_path(int8_path)
+    try:
+        quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+        tmp_path.replace(int8_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return int8_path
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+최적화 설정 판정 일치/속도 회귀 검사
+라벨이 있는 골든 세트를 기준 설정(torch fp32 eager, 최대 길이 패딩, 조각 판정 없음)과
+후보 설정(현재 환경 변수 + --candidate 지정 값: 백엔드, 정밀도, 컴파일, 패딩, 최대 길이 등)으로
+각각 새 프로세스에서 판정해 비교합니다. 측정 항목 (필드별):
+- agreement: 판정 일치율 (텍스트 하나씩 predict_logits 경로와 batch_logits 배치 경로 각각)
+- logit drift: 기준 대비 logits 차이의 최댓값/평균
+- accuracy/precision/recall/f1: 두 설정 각각의 라벨 대비 성능 (스팸 = 1)
+- latency: 텍스트당 지연 시간(p50/p90/평균)과 기준 대비 비율
+판정 일치율이 --min-agreement보다 낮으면(또는 지정한 logit 차이/지연 시간 비율 상한을 넘으면) 종료 코드 1.
+판정 캐시, 사전 필터, 유사 스팸 지문 색인은 두 설정 모두 끄고 모델 경로만 비교합니다.
+
+사용법:
+    python3 spam_parity.py --golden golden.jsonl --candidate "SPAM_PRECISION=int8 SPAM_PADDING=longest"
+    SPAM_BACKEND=onnx python3 spam_parity.py --golden golden.jsonl --min-agreement 0.995 --output parity.json
+    python3 spam_parity.py --stand-in --candidate "SPAM_COMPILE=trace" < golden.jsonl
+골든 세트는 --precision-report와 같은 형식 ({"text", "label", "model_type"(생략 시 title)}, 생략 시 stdin).
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+from spam_runtime import get_option, has_flag
+from spam_metrics import log
+from spam_chunks import spam_probabilities
+from spam_benchmark import build_stand_in, worker_env, percentile
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# 기준 설정: 최적화 이전의 판정 경로
+REFERENCE_ENV = {
+    'SPAM_BACKEND': 'torch',
+    'SPAM_PRECISION': 'fp32',
+    'SPAM_COMPILE': 'off',
+    'SPAM_PADDING': 'max_length',
+    'SPAM_TITLE_MAX_LEN': '512',
+    'SPAM_DESCRIBE_MAX_LEN': '512',
+    'SPAM_DESCRIBE_CHUNKS': '0',
+}
+# 두 설정 모두 모델 경로만 비교하도록 끄는 기능
+ISOLATION_ENV = {
+    'SPAM_VERDICT_CACHE': '0',
+    'SPAM_PREFILTER': '0',
+    'SPAM_FINGERPRINT': '0',
+    'SPAM_PARALLEL_MODELS': '0',
+}
+# 리포트에 남기는 불일치 예시 수 (필드별)
+MAX_MISMATCH_EXAMPLES = 20
+
+
+def parse_overrides(spec):
+    """'KEY=VALUE KEY=VALUE' (공백 또는 쉼표 구분) → dict"""
+    overrides = {}
+    for item in re.split(r'[\s,]+', (spec or '').strip()):
+        if not item:
+            continue
+        key, sep, value = item.partition('=')
+        if not sep or not key:
+            raise ValueError(f'설정은 KEY=VALUE 형식이어야 합니다: {item}')
+        overrides[key] = value
+    return overrides
+
+
+def read_golden_set(path=None):
+    """골든 세트 읽기 (결과: {"model_type", "text", "label"} 목록, label이 없으면 None)"""
+    if path:
+        stream = open(path, encoding='utf-8', errors='replace')
+    else:
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+    samples = []
+    with stream:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            label = row.get('label')
+            samples.append({
+                'model_type': row.get('model_type') or 'title',
+                'text': row.get('text'),
+                'label': None if label is None else int(label),
+            })
+    return samples
+
+
+def run_worker_mode(samples_path):
+    """
+    --worker 모드: 현재 환경 설정으로 골든 세트를 판정하고 결과를 stdout 마지막 줄에 JSON으로 출력
+    필드별로 텍스트 하나씩(predict_logits, 지연 시간 측정)과 배치(batch_logits) 두 경로의 logits를 기록
+    """
+    import spam_check_single as spam
+
+    samples = json.loads(Path(samples_path).read_text(encoding='utf-8'))
+    fields = [model_type for model_type in ('title', 'describe') if any(s['model_type'] == model_type for s in samples)]
+
+    start = time.perf_counter()
+    spam.load_tokenizer()
+    for model_type in fields:
+        spam.warm_up_model(spam.load_model(model_type), model_type)
+    load_seconds = time.perf_counter() - start
+
+    results = {}
+    for model_type in fields:
+        indexes = [i for i, s in enumerate(samples) if s['model_type'] == model_type]
+        texts = [spam.normalize_text(samples[i]['text']) for i in indexes]
+        scored = [(i, text) for i, text in zip(indexes, texts) if text]
+        if not scored:
+            continue
+        spam.predict_logits(scored[0][1], model_type)  # 워밍업
+
+        single_logits = []
+        timings = []
+        for _, text in scored:
+            start = time.perf_counter()
+            logits = spam.logits_to_numpy(spam.predict_logits(text, model_type))
+            timings.append((time.perf_counter() - start) * 1000)
+            single_logits.append(logits.reshape(-1).tolist())
+
+        start = time.perf_counter()
+        batch_logits = [spam.logits_to_numpy(row).reshape(-1).tolist() for row in spam.batch_logits([text for _, text in scored], model_type)]
+        batch_seconds = time.perf_counter() - start
+
+        results[model_type] = {
+            'indexes': [i for i, _ in scored],
+            'single_logits': single_logits,
+            'single_ms': timings,
+            'batch_logits': batch_logits,
+            'batch_per_text_ms': batch_seconds * 1000 / len(scored),
+        }
+
+    config = {
+        'backend': spam.BACKEND,
+        'precision': spam.PRECISION,
+        'compile': spam.COMPILE_MODE,
+        'padding': spam.PADDING,
+        'title_max_len': spam.TITLE_MAX_LEN,
+        'describe_max_len': spam.DESCRIBE_MAX_LEN,
+        'describe_chunks': spam.DESCRIBE_CHUNKS,
+        'model_ids': {model_type: spam.model_id(model_type) for model_type in fields},
+    }
+    print(json.dumps({'config': config, 'load_seconds': load_seconds, 'fields': results}), flush=True)
+
+
+def run_worker(name, env, samples_path):
+    """새 프로세스에서 설정 하나로 골든 세트 판정 (결과 JSON)"""
+    completed = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--worker', str(samples_path)],
+        cwd=str(SCRIPT_DIR), env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'{name} 설정 판정 실패: {completed.stderr.decode("utf-8", "replace")[-2000:]}')
+    return json.loads(completed.stdout.decode('utf-8').strip().splitlines()[-1])
+
+
+def classification_metrics(predictions, labels):
+    """라벨 대비 accuracy/precision/recall/f1 (스팸 = 1, 라벨이 없는 샘플은 제외, 라벨이 하나도 없으면 None)"""
+    pairs = [(p, l) for p, l in zip(predictions, labels) if l is not None]
+    if not pairs:
+        return None
+    tp = sum(1 for p, l in pairs if p == 1 and l == 1)
+    fp = sum(1 for p, l in pairs if p == 1 and l == 0)
+    fn = sum(1 for p, l in pairs if p == 0 and l == 1)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        'labeled': len(pairs),
+        'accuracy': sum(1 for p, l in pairs if p == l) / len(pairs),
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+    }
+
+
+def latency_stats(timings):
+    return {
+        'p50_ms': percentile(timings, 50),
+        'p90_ms': percentile(timings, 90),
+        'mean_ms': sum(timings) / len(timings),
+    }
+
+
+def compare_field(samples, reference, candidate):
+    """필드 하나의 기준/후보 판정 결과 비교"""
+    candidate_rows = dict(zip(candidate['indexes'], range(len(candidate['indexes']))))
+    pairs = [(i, row, candidate_rows[i]) for row, i in enumerate(reference['indexes']) if i in candidate_rows]
+    labels = [samples[i]['label'] for i, _, _ in pairs]
+    stats = {'total': len(pairs)}
+
+    for path in ('single', 'batch'):
+        ref_logits = np.array([reference[f'{path}_logits'][row] for _, row, _ in pairs], dtype=np.float64)
+        cand_logits = np.array([candidate[f'{path}_logits'][row] for _, _, row in pairs], dtype=np.float64)
+        ref_predictions = ref_logits.argmax(axis=1)
+        cand_predictions = cand_logits.argmax(axis=1)
+        drift = np.abs(ref_logits - cand_logits).max(axis=1)
+        mismatches = np.flatnonzero(ref_predictions != cand_predictions)
+        ref_probabilities = spam_probabilities(ref_logits)
+        cand_probabilities = spam_probabilities(cand_logits)
+        stats[path] = {
+            'agreement': float(np.mean(ref_predictions == cand_predictions)),
+            'max_logit_diff': float(drift.max()),
+            'mean_logit_diff': float(drift.mean()),
+            'max_probability_diff': float(np.abs(ref_probabilities - cand_probabilities).max()),
+            'reference': classification_metrics(ref_predictions.tolist(), labels),
+            'candidate': classification_metrics(cand_predictions.tolist(), labels),
+            'mismatches': [
+                {
+                    'index': pairs[k][0],
+                    'text': (samples[pairs[k][0]]['text'] or '')[:80],
+                    'label': labels[k],
+                    'reference_probability': round(float(ref_probabilities[k]), 4),
+                    'candidate_probability': round(float(cand_probabilities[k]), 4),
+                }
+                for k in mismatches[:MAX_MISMATCH_EXAMPLES]
+            ],
+        }
+
+    stats['latency'] = {
+        'reference': latency_stats(reference['single_ms']),
+        'candidate': latency_stats(candidate['single_ms']),
+        'reference_batch_per_text_ms': reference['batch_per_text_ms'],
+        'candidate_batch_per_text_ms': candidate['batch_per_text_ms'],
+    }
+    stats['latency']['ratio'] = stats['latency']['candidate']['mean_ms'] / stats['latency']['reference']['mean_ms']
+    stats['latency']['batch_ratio'] = candidate['batch_per_text_ms'] / reference['batch_per_text_ms']
+    return stats
+
+
+def check_thresholds(fields, min_agreement, max_logit_diff=None, max_latency_ratio=None):
+    """기준을 벗어난 항목 목록 (비어 있으면 통과)"""
+    failures = []
+    for model_type, stats in fields.items():
+        for path in ('single', 'batch'):
+            agreement = stats[path]['agreement']
+            if agreement < min_agreement:
+                failures.append({'field': model_type, 'path': path, 'metric': 'agreement', 'value': agreement, 'limit': min_agreement})
+            drift = stats[path]['max_logit_diff']
+            if max_logit_diff is not None and drift > max_logit_diff:
+                failures.append({'field': model_type, 'path': path, 'metric': 'max_logit_diff', 'value': drift, 'limit': max_logit_diff})
+        for metric in ('ratio', 'batch_ratio'):
+            ratio = stats['latency'][metric]
+            if max_latency_ratio is not None and ratio > max_latency_ratio:
+                failures.append({'field': model_type, 'metric': f'latency_{metric}', 'value': ratio, 'limit': max_latency_ratio})
+    return failures
+
+
+def run_parity(samples, candidate_overrides, reference_overrides=None, stand_in=False,
+               min_agreement=0.99, max_logit_diff=None, max_latency_ratio=None):
+    """기준/후보 설정으로 골든 세트를 판정해 비교 (결과: 리포트 dict, 'passed'가 False면 기준 미달)"""
+    workdir = Path(tempfile.mkdtemp(prefix='spam-parity-'))
+    try:
+        if stand_in:
+            build_stand_in(workdir)
+            base_env = worker_env(workdir)
+        else:
+            base_env = dict(os.environ)
+        base_env.update(ISOLATION_ENV)
+
+        reference_env = dict(base_env, **REFERENCE_ENV, **(reference_overrides or {}))
+        candidate_env = dict(base_env, **candidate_overrides)
+        samples_path = workdir / 'golden.json'
+        samples_path.write_text(json.dumps(samples, ensure_ascii=False), encoding='utf-8')
+
+        reference = run_worker('기준', reference_env, samples_path)
+        candidate = run_worker('후보', candidate_env, samples_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    fields = {
+        model_type: compare_field(samples, reference['fields'][model_type], candidate['fields'][model_type])
+        for model_type in reference['fields'] if model_type in candidate['fields']
+    }
+    failures = check_thresholds(fields, min_agreement, max_logit_diff, max_latency_ratio)
+    return {
+        'reference': dict(reference['config'], load_seconds=reference['load_seconds']),
+        'candidate': dict(candidate['config'], load_seconds=candidate['load_seconds']),
+        'thresholds': {'min_agreement': min_agreement, 'max_logit_diff': max_logit_diff, 'max_latency_ratio': max_latency_ratio},
+        'fields': fields,
+        'failures': failures,
+        'passed': not failures,
+    }
+
+
+def optional_float(value):
+    return float(value) if value not in (None, '') else None
+
+
+def main():
+    worker = get_option('--worker', 'SPAM_PARITY_WORKER')
+    if worker:
+        run_worker_mode(worker)
+        return
+
+    samples = read_golden_set(get_option('--golden', 'SPAM_PARITY_GOLDEN'))
+    if not samples:
+        log('error', '골든 세트가 비어 있습니다')
+        sys.exit(2)
+    report = run_parity(
+        samples,
+        parse_overrides(get_option('--candidate', 'SPAM_PARITY_CANDIDATE', '')),
+        parse_overrides(get_option('--reference', 'SPAM_PARITY_REFERENCE', '')),
+        stand_in=has_flag('--stand-in', 'SPAM_PARITY_STAND_IN'),
+        min_agreement=float(get_option('--min-agreement', 'SPAM_PARITY_MIN_AGREEMENT', '0.99')),
+        max_logit_diff=optional_float(get_option('--max-logit-diff', 'SPAM_PARITY_MAX_LOGIT_DIFF')),
+        max_latency_ratio=optional_float(get_option('--max-latency-ratio', 'SPAM_PARITY_MAX_LATENCY_RATIO')),
+    )
+
+    output = get_option('--output', 'SPAM_PARITY_OUTPUT')
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    for failure in report['failures']:
+        where = ' '.join(filter(None, (failure['field'], failure.get('path'), failure['metric'])))
+        log('error', f"기준 미달: {where} = {failure['value']:.4f} (기준 {failure['limit']})", **failure)
+    if not report['passed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
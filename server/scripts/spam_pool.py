@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+pre-fork 워커 풀 (serve 모드 다중 프로세스)
+부모 프로세스가 모델을 한 번만 로드한 뒤 fork로 워커를 만들어, 가중치 메모리를 copy-on-write로 공유합니다
+(추론은 가중치를 읽기만 하므로 워커 수와 관계없이 가중치는 한 벌만 메모리에 올라감).
+부모는 stdin의 JSON 요청을 우선순위 대기열(spam_schedule)에 넣었다가 쉬고 있는 워커에 높은 등급부터 나눠 주고
+응답을 stdout으로 그대로 전달하며(응답 순서는 완료 순), 워커에 넘기기 전에 마감 시각이 지난 요청은 판정하지 않고 응답합니다.
+죽은 워커는 처리 중이던 요청을 오류로 응답한 뒤 새로 fork해서 교체합니다.
+부모의 모델이 바뀌면(recycle) 워커를 처리 중인 요청이 끝나는 대로 하나씩 새로 fork해 요청을 버리지 않고 교체합니다.
+부모는 fork를 안전하게 하도록 스레드 없이 selectors 이벤트 루프 하나로 동작합니다.
+fork를 지원하지 않는 플랫폼(Windows)에서는 사용할 수 없습니다.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import selectors
+import multiprocessing
+from spam_metrics import log
+from spam_schedule import ScheduledQueue, request_schedule, expired_error
+
+
+def fork_available():
+    """fork 기반 워커 풀을 쓸 수 있는지 여부"""
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def worker_main(conn, index, handle, initializer, inherited):
+    """워커 프로세스: 부모가 보낸 요청을 하나씩 처리해 응답을 돌려줌 (연결이 끊기면 종료)"""
+    # fork로 물려받은 부모 쪽 연결(자신과 다른 워커)을 닫음 (열어 두면 부모가 연결을 닫아도 워커가 종료를 알 수 없음)
+    for other in inherited:
+        other.close()
+    if initializer is not None:
+        initializer(index)
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        conn.send(handle(request))
+
+
+class WorkerSlot:
+    """워커 하나의 프로세스/연결과 처리 중인 요청"""
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.request = None
+        self.started = 0.0
+        self.retiring = False
+
+
+class WorkerPool:
+    """
+    pre-fork 워커 풀
+    handle(request) -> 응답 dict 는 워커 안에서 실행되고, initializer(index)는 워커 시작 시 한 번 실행됨
+    """
+
+    def __init__(self, size, handle, initializer=None):
+        self.size = size
+        self.handle = handle
+        self.initializer = initializer
+        self.context = multiprocessing.get_context('fork')
+        self.selector = selectors.DefaultSelector()
+        self.slots = [WorkerSlot(i) for i in range(size)]
+        self.pending = ScheduledQueue()
+        self.restarts = 0
+        self.recycled = 0
+        self.closing = False
+
+    def start(self):
+        # 지금까지 만든 객체(모델 포함)는 GC 대상에서 제외해, GC가 객체 헤더를 건드려 공유 페이지가 복사되지 않도록 함
+        gc.collect()
+        gc.freeze()
+        for slot in self.slots:
+            self.spawn(slot)
+
+    def spawn(self, slot):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=worker_main,
+            args=(child_conn, slot.index, self.handle, self.initializer, [parent_conn] + [other.conn for other in self.slots if other.conn is not None]),
+            name=f'spam-worker-{slot.index}', daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        slot.process, slot.conn, slot.request, slot.started = process, parent_conn, None, time.monotonic()
+        self.selector.register(parent_conn.fileno(), selectors.EVENT_READ, ('conn', slot))
+        self.selector.register(process.sentinel, selectors.EVENT_READ, ('exit', slot))
+        log('info', '스팸 체크 워커 {} 시작', slot.index, pid=process.pid)
+
+    def submit(self, request, priority, deadline=None):
+        self.pending.push(request, priority, deadline)
+        self.dispatch()
+
+    def expire(self, entry):
+        print(json.dumps({'id': entry.item.get('id'), 'error': expired_error(entry.priority, entry.deadline), 'expired': True}), flush=True)
+
+    def dispatch(self):
+        """대기 중인 요청을 높은 등급부터 쉬고 있는 워커에 전달 (마감이 지난 요청은 버리고 응답)"""
+        for slot in self.slots:
+            if not len(self.pending):
+                return
+            if slot.request is not None or not slot.process.is_alive():
+                continue
+            entry = self.pending.pop(on_expired=self.expire)
+            if entry is None:
+                return
+            slot.request = entry.item
+            try:
+                slot.conn.send(entry.item)
+            except OSError:
+                # 워커가 이미 종료됨: 요청은 되돌리고 교체는 sentinel 이벤트에서
+                self.pending.push_front(entry)
+                slot.request = None
+
+    def on_response(self, slot):
+        try:
+            response = slot.conn.recv()
+        except (EOFError, OSError):
+            self.replace(slot)
+            return
+        slot.request = None
+        print(json.dumps(response), flush=True)
+        self.retire_idle()
+        self.dispatch()
+
+    def stop(self, slot, timeout=None):
+        """워커 연결을 닫고 프로세스 종료를 기다림 (결과: 종료 코드)"""
+        for fileobj in (slot.process.sentinel, slot.conn.fileno() if slot.conn is not None else None):
+            if fileobj is not None and fileobj in self.selector.get_map():
+                self.selector.unregister(fileobj)
+        if slot.conn is not None:
+            slot.conn.close()
+            slot.conn = None
+        slot.process.join(timeout)
+        if slot.process.is_alive():
+            slot.process.kill()
+            slot.process.join()
+        exitcode = slot.process.exitcode
+        slot.process.close()
+        return exitcode
+
+    def recycle(self):
+        """모든 워커를 새로 fork (부모의 모델이 바뀐 뒤 호출, 처리 중인 워커는 요청이 끝나는 대로)"""
+        # 이전 모델은 freeze된 영역에 있으므로 풀어서 회수한 뒤 새 모델을 다시 freeze
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        for slot in self.slots:
+            slot.retiring = True
+        self.retire_idle()
+
+    def retire_idle(self):
+        """교체 대상 중 쉬고 있는 워커를 종료하고 새로 fork"""
+        for slot in self.slots:
+            if not slot.retiring or slot.request is not None or self.closing:
+                continue
+            slot.retiring = False
+            exitcode = self.stop(slot, timeout=10)
+            self.recycled += 1
+            log('info', '스팸 체크 워커 {} 교체 (모델 변경)', slot.index, exitcode=exitcode, recycled=self.recycled)
+            self.spawn(slot)
+
+    def replace(self, slot):
+        """죽은 워커 정리: 처리 중이던 요청은 오류로 응답하고 새 워커로 교체"""
+        exitcode = self.stop(slot)
+        slot.retiring = False
+        if slot.request is not None:
+            print(json.dumps({'id': slot.request.get('id'), 'error': f'스팸 체크 워커가 종료되었습니다 (종료 코드 {exitcode})', 'worker_exited': True}), flush=True)
+            slot.request = None
+        if self.closing:
+            return
+        self.restarts += 1
+        log('warning', '스팸 체크 워커 {} 종료 (종료 코드 {}), 새 워커로 교체합니다', slot.index, exitcode, restarts=self.restarts)
+        # 시작하자마자 죽는 경우 fork를 반복하지 않도록 잠시 대기
+        if time.monotonic() - slot.started < 1.0:
+            time.sleep(1.0)
+        self.spawn(slot)
+        self.dispatch()
+
+    def busy(self):
+        return bool(len(self.pending)) or any(slot.request is not None for slot in self.slots)
+
+    def handle_events(self, events):
+        """selector 이벤트 처리 (응답 전달, 종료 감지, 워커가 아닌 이벤트는 무시)"""
+        for key, _ in events:
+            if key.data is None:
+                continue
+            kind, slot = key.data
+            # 같은 이벤트 묶음 안에서 이미 교체된 워커의 이벤트는 건너뜀
+            if kind == 'conn' and slot.request is not None and slot.conn is not None and slot.conn.fileno() == key.fd:
+                self.on_response(slot)
+            elif kind == 'exit' and slot.process.sentinel == key.fd and not slot.process.is_alive():
+                self.replace(slot)
+
+    def close(self):
+        """남은 요청을 마저 처리한 뒤 워커 종료"""
+        while self.busy():
+            self.handle_events(self.selector.select())
+        self.closing = True
+        for slot in self.slots:
+            if slot.conn is not None:
+                slot.conn.close()
+                slot.conn = None
+        for slot in self.slots:
+            if slot.process is not None:
+                slot.process.join(timeout=10)
+                if slot.process.is_alive():
+                    slot.process.kill()
+
+
+def serve_pool(size, handle, initializer=None, control=None, tick=None, tick_interval=None):
+    """
+    stdin에서 JSON 요청을 한 줄씩 읽어 워커 풀로 처리하고 stdout으로 응답 출력 (serve 모드와 같은 형식)
+    control(request) -> 응답 dict 또는 None: 부모가 직접 처리할 요청 (None이면 워커로 전달)
+    tick() -> bool: 이벤트마다(최소 tick_interval초마다) 부모에서 실행, True면 워커를 새로 fork (모델 교체 등)
+    """
+    pool = WorkerPool(size, handle, initializer)
+    pool.start()
+    print(json.dumps({'ready': True}), flush=True)
+    log('info', '스팸 체크 워커 풀 준비 완료 (serve 모드, 워커 {}개)', size)
+
+    stdin_fd = sys.stdin.fileno()
+    pool.selector.register(stdin_fd, selectors.EVENT_READ, None)
+    buffer = b''
+    while True:
+        # stdin과 워커 이벤트를 같은 selector에서 처리
+        if tick is not None and tick():
+            pool.recycle()
+        events = pool.selector.select(tick_interval if tick is not None else None)
+        pool.handle_events(events)
+        if not any(key.fd == stdin_fd for key, _ in events):
+            continue
+        chunk = os.read(stdin_fd, 1 << 16)
+        if not chunk:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            line = line.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('요청은 JSON 객체여야 합니다')
+            except ValueError as e:
+                print(json.dumps({'id': None, 'error': f'잘못된 요청: {str(e)}'}), flush=True)
+                continue
+            response = control(request) if control is not None else None
+            if response is not None:
+                print(json.dumps(response), flush=True)
+                continue
+            try:
+                priority, deadline = request_schedule(request)
+            except ValueError as e:
+                print(json.dumps({'id': request.get('id'), 'error': str(e)}), flush=True)
+                continue
+            pool.submit(request, priority, deadline)
+
+    pool.selector.unregister(stdin_fd)
+    pool.close()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+스팸 분류 모델 저정밀도(CPU) 추론 설정
+- fp32: 기존 방식
+- int8: Linear 레이어 동적 양자화 (가중치 int8, 모델 크기 약 1/4)
+- bf16: bfloat16 가중치 (CPU가 AVX512-BF16/AMX를 지원할 때만)
+변환된 모델은 원본 체크포인트 옆에 state_dict와 config로 저장되어 다음 실행부터 변환 없이 로드됩니다.
+(모듈 전체를 pickle하지 않으므로 weights_only로 읽고, 골격은 config로 만든 뒤 정밀도에 맞게 바꿔서 가중치를 연결)
+torch는 ONNX 백엔드에서 import하지 않도록 함수 안에서만 import합니다.
+"""
+import json
+from spam_runtime import checkpoint_hash, unique_temp_path
+from spam_metrics import log
+from spam_checkpoint import empty_model, assign_weights
+
+PRECISIONS = ('fp32', 'int8', 'bf16')
+
+# 동적 양자화 Linear의 state_dict 항목 (값: (양자화 가중치, bias))
+PACKED_SUFFIX = '_packed_params._packed_params'
+
+
+def bf16_supported():
+    """CPU에서 bf16 연산을 빠르게 처리할 수 있는지 확인"""
+    import torch
+
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        pass
+    try:
+        with open('/proc/cpuinfo', encoding='utf-8') as f:
+            flags = f.read()
+        return 'avx512_bf16' in flags or 'amx_bf16' in flags
+    except OSError:
+        return False
+
+
+def resolve_precision(precision):
+    """정밀도 설정 검증 (bf16 미지원 CPU면 fp32로 대체)"""
+    precision = (precision or 'fp32').strip().lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f'알 수 없는 precision: {precision} (가능: {", ".join(PRECISIONS)})')
+    if precision == 'bf16' and not bf16_supported():
+        log('warning', '이 CPU는 bf16을 지원하지 않아 fp32로 실행합니다')
+        return 'fp32'
+    return precision
+
+
+def converted_model_path(cache_path, precision):
+    """변환된 모델 저장 경로 (예: spam_model_title.int8.pt)"""
+    return cache_path.with_name(f'{cache_path.stem}.{precision}.pt')
+
+
+def load_converted_model(cache_path, precision):
+    """
+    저장된 변환 모델 로드
+    원본 체크포인트 해시 또는 torch 버전이 다르면 None (다시 변환 필요)
+    """
+    import torch
+
+    converted_path = converted_model_path(cache_path, precision)
+    if not cache_path.exists() or not converted_path.exists():
+        return None
+
+    try:
+        saved = torch.load(converted_path, map_location='cpu', weights_only=True)
+        if saved.get('source_hash') != checkpoint_hash(cache_path) or saved.get('torch_version') != torch.__version__:
+            return None
+        model = assign_weights(converted_skeleton(json.loads(saved['config']), precision), unpack_state_dict(saved['state_dict']))
+        model.eval()
+        return model
+    except Exception as e:
+        log('warning', f'변환된 모델 로드 실패, 다시 변환합니다: {str(e)}')
+        return None
+
+
+def converted_skeleton(config, precision):
+    """변환된 state_dict를 받을 빈 골격 (int8은 Linear를 동적 양자화 Linear로 교체, bf16은 dtype만 변경)"""
+    import torch
+
+    model = empty_model(config)
+    if precision == 'int8':
+        for module in list(model.modules()):
+            for name, child in list(module.named_children()):
+                if type(child) is torch.nn.Linear:
+                    setattr(module, name, torch.ao.nn.quantized.dynamic.Linear(
+                        child.in_features, child.out_features, bias_=child.bias is not None, dtype=torch.qint8))
+    elif precision == 'bf16':
+        model = model.to(torch.bfloat16)
+    return model
+
+
+def pack_state_dict(state_dict):
+    """
+    저장용 state_dict: 동적 양자화 Linear의 (양자화 가중치, bias)를 일반 텐서(int8 값, scale, zero_point, bias)로 풀어서 저장
+    양자화 텐서를 그대로 pickle하면 qscheme 객체의 모듈을 찾으려고 sys.modules를 뒤지다가
+    transformers의 지연 import(선택 의존성)가 실행되어 저장이 실패할 수 있음
+    """
+    import torch
+
+    # 모듈별 버전 정보(_metadata)가 있어야 양자화 Linear가 현재 형식으로 읽으므로 OrderedDict 그대로 유지
+    packed = type(state_dict)()
+    packed._metadata = getattr(state_dict, '_metadata', None)
+    for key, value in state_dict.items():
+        if not key.endswith(PACKED_SUFFIX):
+            packed[key] = value
+            continue
+        weight, bias = value
+        if weight.qscheme() != torch.per_tensor_affine:
+            raise ValueError(f'지원하지 않는 양자화 방식: {weight.qscheme()}')
+        prefix = key[:-len(PACKED_SUFFIX)]
+        packed[prefix + 'weight_int8'] = weight.int_repr()
+        packed[prefix + 'weight_scale'] = torch.tensor(weight.q_scale(), dtype=torch.float64)
+        packed[prefix + 'weight_zero_point'] = torch.tensor(weight.q_zero_point())
+        packed[prefix + 'bias'] = bias
+    return packed
+
+
+def unpack_state_dict(state_dict):
+    """pack_state_dict로 저장한 state_dict를 모델에 넣을 수 있는 형식으로 복원"""
+    import torch
+
+    unpacked = type(state_dict)()
+    unpacked._metadata = getattr(state_dict, '_metadata', None)
+    for key, value in state_dict.items():
+        if key.endswith('weight_int8'):
+            prefix = key[:-len('weight_int8')]
+            weight = torch._make_per_tensor_quantized_tensor(
+                value, state_dict[prefix + 'weight_scale'].item(), state_dict[prefix + 'weight_zero_point'].item())
+            unpacked[prefix + PACKED_SUFFIX] = (weight, state_dict[prefix + 'bias'])
+        elif not key.endswith(('weight_scale', 'weight_zero_point')) and not (
+                key.endswith('bias') and key[:-len('bias')] + 'weight_int8' in state_dict):
+            unpacked[key] = value
+    return unpacked
+
+
+def convert_model(model, precision):
+    """fp32 모델을 지정한 정밀도로 변환"""
+    import torch
+
+    if precision == 'int8':
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if precision == 'bf16':
+        return model.to(torch.bfloat16)
+    return model
+
+
+def convert_and_cache_model(model, cache_path, precision):
+    """
+    fp32 모델을 변환하고 다음 실행을 위해 저장
+    HF 모델이 아니면(config 없음) 골격을 다시 만들 수 없으므로 저장하지 않음
+    """
+    import torch
+
+    model = convert_model(model, precision)
+    model.eval()
+    if not hasattr(getattr(model, 'config', None), 'to_dict'):
+        return model
+
+    converted_path = converted_model_path(cache_path, precision)
+    tmp_path = None
+    try:
+        # 이 프로세스 전용 임시 파일 (동시에 변환하는 다른 프로세스의 임시 파일을 덮어쓰거나 지우지 않도록)
+        tmp_path = unique_temp_path(converted_path)
+        torch.save({
+            'source_hash': checkpoint_hash(cache_path),
+            'torch_version': str(torch.__version__),
+            'precision': precision,
+            'config': json.dumps(model.config.to_dict()),
+            'state_dict': pack_state_dict(model.state_dict()),
+        }, tmp_path)
+        tmp_path.replace(converted_path)
+    except Exception as e:
+        log('warning', f'변환된 모델 저장 실패: {str(e)}')
+    finally:
+        # 저장 도중 실패하면 반쯤 쓴 임시 파일이 남지 않도록 (교체에 성공했으면 이미 없음)
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+    return model
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+트랜스포머 앞단의 가벼운 스팸 사전 필터
+- 특징: 문자 n-gram(기본 1~4)을 해시 버킷으로 모은 값 + 규칙 특징(URL, 전화번호, 메신저 ID, 스팸 키워드 등)
+- 모델: 라벨이 있는 과거 데이터로 학습한 로지스틱 회귀 (numpy만 사용, 모두 벡터 연산)
+- 판정: 스팸 확률이 low 이하면 정상, high 이상이면 스팸으로 바로 결정하고 그 사이만 트랜스포머로 보냄
+학습된 모델은 필드 종류(title/describe)별 `.npz` 파일로 저장합니다.
+"""
+import re
+import time
+import unicodedata
+import numpy as np
+
+# n-gram 해시 버킷 수 (2^18, 가중치 약 2MB)
+DEFAULT_BUCKETS = 1 << 18
+DEFAULT_NGRAM_RANGE = (1, 4)
+
+# 규칙 특징에 쓰는 기본 스팸 키워드 (학습 시 모델 파일에 함께 저장되어 추론 때도 같은 목록을 사용)
+DEFAULT_KEYWORDS = (
+    '대출', '카지노', '바카라', '토토', '슬롯', '도박', '배팅', '베팅', '먹튀', '성인', '출장', '조건만남',
+    '텔레그램', '텔레', '카톡', '오픈채팅', '부업', '재택', '고수익', '수익보장', '무료상담', '코인', '리딩방',
+    '당일지급', '입금', '가입코드', '추천인', '할인코드', '홍보', '광고',
+)
+
+_URL = re.compile(r'(https?://|www\.|[a-z0-9-]+\.(com|net|kr|co|io|me|ly|xyz|top|shop|site|link)\b)', re.IGNORECASE)
+_PHONE = re.compile(r'(01[016789]|0[2-6][0-9]?|070|080|1[5-9]\d{2})[\s.\-)]*\d{3,4}[\s.\-]*\d{4}')
+_MESSENGER_ID = re.compile(r'(카톡|카카오톡|텔레|텔레그램|라인|kakao|telegram|line)\s*(id|아이디)?\s*[:：@]\s*\S+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+# 64비트 롤링 해시 상수 (uint64 연산은 자연스럽게 2^64로 나머지 처리됨)
+_HASH_PRIME = np.uint64(1099511628211)
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+RULE_NAMES = ('url', 'url_count', 'phone', 'messenger_id', 'keyword', 'keyword_count', 'digit_ratio', 'length')
+
+
+def normalize_for_prefilter(text):
+    """n-gram 추출용 정규화 (NFKC, 소문자, 연속 공백 하나로)"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text)).strip().lower()
+
+
+def ngram_hashes(text, n_buckets, ngram_range=DEFAULT_NGRAM_RANGE):
+    """문자 n-gram의 해시 버킷 번호 배열 (코드포인트 배열에 대한 벡터 연산 롤링 해시)"""
+    codes = np.frombuffer((' ' + text + ' ').encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    hashes = []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        count = len(codes) - n + 1
+        if count <= 0:
+            break
+        h = np.full(count, n, dtype=np.uint64)
+        for k in range(n):
+            h = h * _HASH_PRIME + codes[k:k + count]
+        hashes.append(h)
+    if not hashes:
+        return np.zeros(0, dtype=np.int64)
+    h = np.concatenate(hashes)
+    # 하위 비트가 고르게 섞이도록 혼합 후 버킷 번호로 변환
+    h ^= h >> np.uint64(29)
+    h *= _HASH_MIX
+    h ^= h >> np.uint64(32)
+    return (h % np.uint64(n_buckets)).astype(np.int64)
+
+
+def rule_features(text, keywords):
+    """규칙 특징 값 (RULE_NAMES 순서, 0~1 근처 값으로 스케일)"""
+    url_count = len(_URL.findall(text))
+    keyword_count = sum(text.count(keyword) for keyword in keywords)
+    digits = sum(ch.isdigit() for ch in text)
+    return [
+        1.0 if url_count else 0.0,
+        np.log1p(url_count) / 2,
+        1.0 if _PHONE.search(text) else 0.0,
+        1.0 if _MESSENGER_ID.search(text) else 0.0,
+        1.0 if keyword_count else 0.0,
+        np.log1p(keyword_count) / 2,
+        digits / max(len(text), 1),
+        np.log1p(len(text)) / 8,
+    ]
+
+
+class Prefilter:
+    """해시 n-gram + 규칙 특징 로지스틱 회귀 (가중치 벡터 하나와 bias)"""
+
+    def __init__(self, weights=None, bias=0.0, n_buckets=DEFAULT_BUCKETS, ngram_range=DEFAULT_NGRAM_RANGE, keywords=DEFAULT_KEYWORDS):
+        self.n_buckets = int(n_buckets)
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        self.keywords = tuple(keywords)
+        self.n_features = self.n_buckets + len(RULE_NAMES)
+        self.weights = np.zeros(self.n_features, dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+
+    def featurize(self, texts):
+        """
+        텍스트 목록을 희소 특징으로 변환
+        결과: (행 번호, 열 번호, 값) 배열 (COO 형식, 행 = 텍스트 순서)
+        """
+        rows, cols, values = [], [], []
+        rule_cols = np.arange(self.n_buckets, self.n_features, dtype=np.int64)
+        for i, text in enumerate(texts):
+            text = normalize_for_prefilter(text)
+            buckets = ngram_hashes(text, self.n_buckets, self.ngram_range)
+            # n-gram 수가 많은 긴 글이 점수를 독점하지 않도록 1/sqrt(개수)로 정규화
+            scale = 1.0 / np.sqrt(max(len(buckets), 1))
+            rows.append(np.full(len(buckets) + len(rule_cols), i, dtype=np.int64))
+            cols.append(buckets)
+            cols.append(rule_cols)
+            values.append(np.full(len(buckets), scale, dtype=np.float32))
+            values.append(np.asarray(rule_features(text, self.keywords), dtype=np.float32))
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+
+    def decision(self, features, n_rows):
+        """희소 특징의 logit (bias + 가중치 합)"""
+        rows, cols, values = features
+        return self.bias + np.bincount(rows, weights=self.weights[cols] * values, minlength=n_rows)
+
+    def predict_proba(self, texts):
+        """스팸 확률 배열"""
+        if not texts:
+            return np.zeros(0)
+        logits = self.decision(self.featurize(texts), len(texts))
+        return 1.0 / (1.0 + np.exp(-np.clip(logits, -30, 30)))
+
+    def decide(self, texts, low, high):
+        """
+        확실한 텍스트만 판정
+        결과: texts와 같은 순서의 목록 (0 = 정상, 1 = 스팸, None = 트랜스포머로 판정 필요)
+        """
+        proba = self.predict_proba(texts)
+        return [0 if p <= low else 1 if p >= high else None for p in proba]
+
+    def fit(self, texts, labels, epochs=5, batch_size=256, learning_rate=0.5, l2=1e-6, seed=0):
+        """미니배치 Adagrad로 로지스틱 회귀 학습 (labels: 0 = 정상, 1 = 스팸)"""
+        labels = np.asarray(labels, dtype=np.float64)
+        features = self.featurize(texts)
+        rows, cols, values = features
+        # 텍스트별 특징 범위 (rows는 텍스트 순서로 정렬되어 있음)
+        offsets = np.searchsorted(rows, np.arange(len(texts) + 1))
+
+        rng = np.random.default_rng(seed)
+        accum = np.zeros(self.n_features, dtype=np.float64)
+        bias_accum = 0.0
+        weights = self.weights.astype(np.float64)
+        for _ in range(epochs):
+            order = rng.permutation(len(texts))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                index = np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in batch])
+                local_rows = np.repeat(np.arange(len(batch)), offsets[batch + 1] - offsets[batch])
+                batch_cols, batch_values = cols[index], values[index]
+
+                logits = self.bias + np.bincount(local_rows, weights=weights[batch_cols] * batch_values, minlength=len(batch))
+                error = 1.0 / (1.0 + np.exp(-np.clip(logits, -30, 30))) - labels[batch]
+
+                grad = np.bincount(batch_cols, weights=batch_values * error[local_rows], minlength=self.n_features) / len(batch)
+                touched = np.unique(batch_cols)
+                grad[touched] += l2 * weights[touched]
+                accum[touched] += grad[touched] ** 2
+                weights[touched] -= learning_rate * grad[touched] / (np.sqrt(accum[touched]) + 1e-8)
+
+                bias_grad = float(error.mean())
+                bias_accum += bias_grad ** 2
+                self.bias -= learning_rate * bias_grad / (np.sqrt(bias_accum) + 1e-8)
+        self.weights = weights.astype(np.float32)
+        return self
+
+    def save(self, path):
+        """`.npz` 파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+        tmp_path = path.with_name(path.name + '.tmp.npz')
+        np.savez_compressed(
+            tmp_path,
+            weights=self.weights,
+            bias=np.float64(self.bias),
+            n_buckets=np.int64(self.n_buckets),
+            ngram_range=np.asarray(self.ngram_range, dtype=np.int64),
+            keywords=np.asarray(self.keywords, dtype=str),
+            trained_at=np.float64(time.time()),
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as saved:
+            return cls(
+                weights=saved['weights'],
+                bias=float(saved['bias']),
+                n_buckets=int(saved['n_buckets']),
+                ngram_range=tuple(saved['ngram_range'].tolist()),
+                keywords=tuple(saved['keywords'].tolist()),
+            )
+
+
+def train_prefilter(texts, labels, **kwargs):
+    """라벨이 있는 텍스트로 사전 필터 학습 (kwargs는 Prefilter.fit 인자)"""
+    return Prefilter().fit(texts, labels, **kwargs)
+
+
+def cascade_report(proba, full_verdicts, low, high, labels=None):
+    """
+    사전 필터 확률과 전체 모델 판정으로 캐스케이드 효과 계산
+    - offload_rate: 사전 필터가 바로 판정한 비율 (트랜스포머 호출 절감)
+    - disagreement_rate: 사전 필터가 판정한 것 중 전체 모델과 다른 비율
+    labels가 있으면 전체 모델 단독과 캐스케이드의 정확도도 계산
+    """
+    proba = np.asarray(proba)
+    full = np.asarray(full_verdicts)
+    settled_normal = proba <= low
+    settled_spam = proba >= high
+    settled = settled_normal | settled_spam
+    cascade = np.where(settled_spam, 1, np.where(settled_normal, 0, full))
+
+    total = len(full)
+    report = {
+        'total': total,
+        'low': low,
+        'high': high,
+        'offloaded': int(settled.sum()),
+        'offload_rate': float(settled.mean()) if total else 0.0,
+        'settled_normal': int(settled_normal.sum()),
+        'settled_spam': int(settled_spam.sum()),
+        'disagreements': int((cascade[settled] != full[settled]).sum()),
+        'disagreement_rate': float((cascade[settled] != full[settled]).mean()) if settled.any() else 0.0,
+        'false_normal': int((settled_normal & (full == 1)).sum()),
+        'false_spam': int((settled_spam & (full == 0)).sum()),
+    }
+    if labels is not None:
+        labels = np.asarray(labels)
+        report['full_accuracy'] = float((full == labels).mean()) if total else 0.0
+        report['cascade_accuracy'] = float((cascade == labels).mean()) if total else 0.0
+    return report
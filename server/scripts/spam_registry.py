@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+모델 레지스트리 (버전별 체크포인트 목록, 무중단 교체, 섀도 판정 설정)
+manifest(JSON)에 모델 버전별 체크포인트 위치/해시/백엔드를 적어 두고, active로 서비스할 모델을,
+shadow로 트래픽 일부를 함께 판정해 볼 후보 모델을 지정합니다.
+
+{
+  "active": "2025-06",
+  "shadow": {"model": "2025-07", "sample_rate": 0.1},
+  "models": {
+    "2025-06": {
+      "title": {"url": "https://...", "path": "spam_model_title.2025-06.pth", "sha256": "..."},
+      "describe": {"url": "https://...", "sha256": "..."},
+      "backend": "onnx",
+      "precision": "int8"
+    }
+  }
+}
+
+- path는 생략하면 캐시 디렉토리의 spam_model_<필드>.<버전>.pth, 상대 경로면 manifest 기준
+- backend/precision은 생략하면 프로세스 설정(--backend, --precision) 사용
+상주 모드는 manifest 변경을 감시하다가 새 모델을 백그라운드에서 로드한 뒤, 요청과 요청 사이에 한 번에 교체합니다
+(로드 중에도 기존 모델로 계속 응답하고, 로드에 실패하면 기존 모델을 유지).
+"""
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+from spam_metrics import log, span, increment
+
+FIELDS = ('title', 'describe')
+
+
+def read_manifest(path):
+    """manifest 읽기 및 검증 (파일이 없으면 None, 형식이 잘못되었으면 ValueError)"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict):
+        raise ValueError(f'레지스트리 manifest는 JSON 객체여야 합니다: {path}')
+
+    models = manifest.get('models')
+    if not isinstance(models, dict) or not models:
+        raise ValueError(f'레지스트리 manifest에 models가 없습니다: {path}')
+    for version, entry in models.items():
+        for field in FIELDS:
+            source = entry.get(field) if isinstance(entry, dict) else None
+            if not isinstance(source, dict) or not (source.get('url') or source.get('path')):
+                raise ValueError(f'모델 {version}의 {field}에 url 또는 path가 필요합니다')
+    if manifest.get('active') not in models:
+        raise ValueError(f'active 모델 {manifest.get("active")}이(가) models에 없습니다')
+
+    shadow = manifest.get('shadow')
+    if shadow:
+        if not isinstance(shadow, dict) or shadow.get('model') not in models:
+            raise ValueError(f'shadow 모델이 models에 없습니다: {shadow}')
+        if not 0.0 <= float(shadow.get('sample_rate', 0.1)) <= 1.0:
+            raise ValueError(f'shadow sample_rate는 0~1이어야 합니다: {shadow.get("sample_rate")}')
+    return manifest
+
+
+def model_entry(manifest, version, manifest_path, cache_dir):
+    """
+    manifest의 모델 버전 하나를 체크포인트 위치가 확정된 dict로 변환
+    결과: {"id", "backend", "precision", "title": {"url", "path", "sha256"}, "describe": {...}}
+    backend/precision은 manifest 값 그대로 (생략 시 None)
+    """
+    raw = manifest['models'][version]
+    entry = {'id': version, 'backend': raw.get('backend'), 'precision': raw.get('precision')}
+    for field in FIELDS:
+        source = raw[field]
+        if source.get('path'):
+            path = Path(source['path']).expanduser()
+            if not path.is_absolute():
+                path = Path(manifest_path).resolve().parent / path
+        else:
+            path = Path(cache_dir) / f'spam_model_{field}.{version}.pth'
+        entry[field] = {'url': source.get('url'), 'path': str(path), 'sha256': source.get('sha256')}
+    return entry
+
+
+class ModelRegistry:
+    """
+    manifest 변경 감시와 모델 교체
+    prepare(manifest) -> 준비된 모델 묶음(dict, "active"/"shadow" 키에 모델 버전) 은 감시 스레드(watch) 또는 check()를 부른 스레드에서,
+    install(준비된 모델 묶음)은 poll()/check()를 부른 스레드(요청 처리 스레드)에서 실행되므로
+    요청 처리 도중에 모델이 바뀌지 않습니다.
+    """
+
+    def __init__(self, path, interval, prepare, install, active=None, shadow=None):
+        self.path = Path(path)
+        self.interval = interval
+        self.prepare = prepare
+        self.install = install
+        self.active = active
+        self.shadow = shadow
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.mtime = self.stat()
+        self.checked = time.monotonic()
+        self.forced = False
+        self.preparing = False
+        self.prepared = None
+        self.thread = None
+        self.swaps = 0
+        self.swapped_at = None
+        self.error = None
+
+    def stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def changed(self):
+        """manifest가 바뀌었거나 reload가 요청되었는지 확인 (interval마다 한 번만 stat)"""
+        if self.forced:
+            return True
+        if self.interval <= 0 or time.monotonic() - self.checked < self.interval:
+            return False
+        self.checked = time.monotonic()
+        return self.stat() != self.mtime
+
+    def run_prepare(self):
+        """manifest를 읽어 새 모델 묶음 준비 (실패하면 현재 모델 유지)"""
+        self.forced = False
+        self.mtime = self.stat()
+        self.preparing = True
+        try:
+            manifest = read_manifest(self.path)
+            if manifest is None:
+                raise ValueError(f'레지스트리 manifest가 없습니다: {self.path}')
+            log('info', '모델 레지스트리 변경 감지, 새 모델 준비 중: {}', manifest['active'])
+            with span('registry_prepare'):
+                prepared = self.prepare(manifest)
+            with self.lock:
+                self.prepared = prepared
+            self.error = None
+        except Exception as e:
+            # 모델 로드에 실패해도 상주 프로세스는 기존 모델로 계속 동작
+            self.error = str(e) or type(e).__name__
+            increment('registry_errors')
+            log('error', f'모델 레지스트리 준비 실패, 현재 모델을 유지합니다: {self.error}')
+        finally:
+            self.preparing = False
+
+    def watch(self):
+        """감시 스레드 시작 (interval마다 manifest 확인, 바뀌면 이 스레드에서 새 모델 로드)"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.watch_loop, name='spam-registry', daemon=True)
+        self.thread.start()
+
+    def watch_loop(self):
+        while True:
+            self.wake.wait(self.interval if self.interval > 0 else None)
+            self.wake.clear()
+            if self.forced or self.stat() != self.mtime:
+                self.run_prepare()
+
+    def reload(self):
+        """manifest를 다시 읽도록 요청 (감시 스레드가 있으면 바로 깨움, 없으면 다음 check()에서 처리)"""
+        self.forced = True
+        self.wake.set()
+
+    def poll(self):
+        """요청 사이에 호출: 준비가 끝난 모델 묶음이 있으면 교체 (결과: 교체 여부)"""
+        with self.lock:
+            prepared, self.prepared = self.prepared, None
+        if prepared is None:
+            return False
+        with span('registry_swap'):
+            self.install(prepared)
+        self.active = prepared.get('active')
+        self.shadow = prepared.get('shadow')
+        self.swaps += 1
+        self.swapped_at = time.time()
+        increment('registry_swaps')
+        return True
+
+    def check(self):
+        """감시 스레드 없이 사용: 바뀌었으면 이 스레드에서 바로 준비 후 교체 (결과: 교체 여부)"""
+        if self.changed():
+            self.run_prepare()
+        return self.poll()
+
+    def status(self):
+        return {
+            'path': str(self.path),
+            'exists': self.mtime is not None,
+            'active': self.active,
+            'shadow': self.shadow,
+            'preparing': self.preparing or self.forced,
+            'swaps': self.swaps,
+            'swapped_at': self.swapped_at,
+            'error': self.error,
+        }
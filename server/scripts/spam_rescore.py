@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+행사 일괄 재판정 (모델 교체 후 백필용)
+JSONL 또는 CSV로 내보낸 행사 목록(`id`, `title`, `description`)을 스트리밍으로 읽어
+`spam_check_single.py --serve` 워커 풀(SPAM_SERVE_WORKERS, 모델은 부모가 한 번 로드하고 워커가 공유)에
+배치로 나눠 판정하고, 입력 순서대로 결과를 바로 씁니다.
+- 메모리: 입력 전체를 읽지 않고 처리 중인 배치(워커 수 x 2)만 유지
+- 체크포인트: 배치를 쓸 때마다 `<출력>.checkpoint.json`에 처리한 행 수, 그 행들의 내용 해시, 출력 파일 크기를 저장하고,
+  같은 명령을 다시 실행하면 앞부분 내용이 같은지 확인한 뒤 그 위치부터 이어서 처리 (--restart로 처음부터)
+- 진행 상황: 주기적으로 stderr에 처리 건수와 초당 처리량(items/sec) 출력, 끝나면 요약을 stdout에 출력
+
+사용법:
+    python3 spam_rescore.py --input events.jsonl --output verdicts.jsonl
+    python3 spam_rescore.py --input events.csv --output verdicts.csv --processes 4 --batch-size 256
+출력 형식은 출력 파일 확장자로 결정합니다 (.csv면 CSV, 그 외 JSONL: {"id", "result"} 또는 {"id", "error"}).
+워커는 환경 변수를 그대로 물려받으므로 SPAM_BACKEND, SPAM_PRECISION, SPAM_PREFILTER 등이 적용됩니다.
+"""
+import io
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import threading
+import subprocess
+from pathlib import Path
+from collections import deque
+from concurrent.futures import Future
+
+from spam_runtime import get_option, has_flag
+from spam_metrics import log
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+INPUT_PATH = get_option('--input', 'SPAM_RESCORE_INPUT', '-')
+OUTPUT_PATH = get_option('--output', 'SPAM_RESCORE_OUTPUT')
+# 워커 풀의 워커 수 (serve 프로세스 하나가 모델을 로드하고 워커를 fork하므로 가중치는 한 벌)
+PROCESSES = int(get_option('--processes', 'SPAM_RESCORE_PROCESSES', str(min(4, os.cpu_count() or 1))))
+# 워커에 한 번에 보내는 행사 수 (워커 안에서는 SPAM_BATCH_SIZE 단위로 forward)
+BATCH_SIZE = int(get_option('--batch-size', 'SPAM_RESCORE_BATCH_SIZE', '256'))
+PROGRESS_INTERVAL = float(get_option('--progress-interval', 'SPAM_RESCORE_PROGRESS_INTERVAL', '10'))
+RESTART = has_flag('--restart', 'SPAM_RESCORE_RESTART')
+# 워커 프로세스의 CPU 우선순위 (nice 값, 0이면 그대로): 같은 머신의 서비스 판정(새 행사)이 CPU를 먼저 쓰도록
+NICE = int(get_option('--nice', 'SPAM_RESCORE_NICE', '10'))
+
+CSV_FIELDS = ('id', 'result', 'error')
+
+
+def read_events(path):
+    """
+    입력 행사를 한 건씩 읽기 (JSONL 또는 .csv, '-'면 stdin의 JSONL)
+    결과: (행 번호, 행사 dict 또는 None, 오류 메시지 또는 None) 제너레이터
+    """
+    if path == '-':
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+    else:
+        stream = open(path, 'r', encoding='utf-8', errors='replace', newline='')
+    with stream:
+        if path != '-' and path.lower().endswith('.csv'):
+            for number, row in enumerate(csv.DictReader(stream)):
+                yield number, row, None
+            return
+        number = 0
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError('행사는 JSON 객체여야 합니다')
+                yield number, row, None
+            except ValueError as e:
+                yield number, None, f'잘못된 행: {str(e)}'
+            number += 1
+
+
+def row_digest(digest, number, row, error):
+    """앞 행들의 해시(hex)에 행 하나를 이어 붙인 해시 (입력 앞부분이 체크포인트 때와 같은지 확인용)"""
+    # CSV의 남는 열은 None 키로 들어오므로 키를 문자열로 바꿔 정렬
+    fields = None if row is None else sorted((str(key), value) for key, value in row.items())
+    content = json.dumps([number, fields, error], ensure_ascii=False)
+    return hashlib.sha256((digest + content).encode('utf-8')).hexdigest()
+
+
+def read_batches(path, skip, batch_size, skip_digest=None):
+    """
+    skip개 행을 건너뛰고 batch_size개씩 묶은 행 목록
+    결과: (배치, 배치 마지막 행까지의 입력 해시) 제너레이터 (배치 항목: (id, 행사 또는 None, 오류))
+    skip_digest가 있으면 건너뛴 행들의 해시가 같은지 확인 (다르면 RuntimeError: 체크포인트와 다른 입력)
+    """
+    digest = ''
+    skipped = 0
+    batch = []
+    for number, row, error in read_events(path):
+        digest = row_digest(digest, number, row, error)
+        if skipped < skip:
+            skipped += 1
+            if skipped == skip:
+                check_skipped(digest, skip_digest)
+            continue
+        if row is None:
+            batch.append((number, None, error))
+        else:
+            event_id = row.get('id')
+            batch.append((number if event_id in (None, '') else event_id, {
+                'title': str(row.get('title') or ''),
+                'description': str(row.get('description') or ''),
+            }, None))
+        if len(batch) >= batch_size:
+            yield batch, digest
+            batch = []
+    if skipped < skip:
+        # 입력이 체크포인트에 기록된 행 수보다 짧음
+        check_skipped(None, skip_digest)
+    if batch:
+        yield batch, digest
+
+
+def check_skipped(digest, skip_digest):
+    """이어서 처리할 때 건너뛴 앞부분이 체크포인트의 입력과 같은지 확인"""
+    if skip_digest is not None and digest != skip_digest:
+        raise RuntimeError('입력 내용이 체크포인트와 다릅니다 (다른 입력으로 이어서 처리할 수 없습니다, 처음부터 다시 하려면 --restart)')
+
+
+class WorkerExited(RuntimeError):
+    """판정 도중 serve 프로세스(또는 워커 풀의 워커)가 종료됨 (같은 배치를 다시 보내면 됨)"""
+
+
+class ServeProcess:
+    """
+    `spam_check_single.py --serve` 프로세스 하나 (workers ≥ 2이면 SPAM_SERVE_WORKERS 워커 풀)
+    모델은 이 프로세스가 한 번만 로드하고 워커는 fork로 가중치를 공유하므로, 워커 수가 늘어도 가중치는 한 벌
+    요청은 여러 개를 이어서 보내고(워커 풀이 나눠 처리), 응답은 읽기 스레드가 id로 찾아 Future에 전달
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.process = None
+        self.pending = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        env = dict(os.environ, SPAM_SERVE_WORKERS=str(self.workers))
+        self.process = subprocess.Popen(
+            [sys.executable, str(SCRIPT_DIR / 'spam_check_single.py'), '--serve'],
+            cwd=str(SCRIPT_DIR), env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        if NICE and hasattr(os, 'setpriority'):
+            # fork된 워커도 같은 우선순위를 물려받음
+            try:
+                os.setpriority(os.PRIO_PROCESS, self.process.pid, os.getpriority(os.PRIO_PROCESS, 0) + NICE)
+            except OSError as e:
+                log('warning', f'재판정 워커 우선순위 변경 실패: {str(e)}')
+        line = self.process.stdout.readline()
+        try:
+            ready = bool(line) and json.loads(line).get('ready')
+        except ValueError:
+            ready = False
+        if not ready:
+            self.process.kill()
+            exitcode, self.process = self.process.wait(), None
+            raise RuntimeError(f'재판정 워커 시작 실패 (종료 코드 {exitcode})')
+        self.pending = {}
+        threading.Thread(target=self.read_loop, args=(self.process, self.pending), name='spam-rescore-reader', daemon=True).start()
+        log('info', '재판정 워커 준비 완료', pid=self.process.pid, workers=self.workers)
+
+    def read_loop(self, process, pending):
+        """응답을 id로 요청에 전달, 프로세스가 끝나면 남은 요청을 WorkerExited로 실패 처리"""
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+            with self.lock:
+                future = pending.pop(response.get('id'), None)
+            if future is not None:
+                future.set_result(response)
+        exitcode = process.wait()
+        with self.lock:
+            if self.process is process:
+                self.process = None
+            futures = list(pending.values())
+            pending.clear()
+        for future in futures:
+            future.set_exception(WorkerExited(f'재판정 워커가 종료되었습니다 (종료 코드 {exitcode})'))
+
+    def submit(self, events):
+        """행사 목록 판정 요청 (결과: 응답 dict의 Future), 프로세스가 없으면(처음 또는 종료 후) 새로 시작"""
+        future = Future()
+        with self.lock:
+            if self.process is None:
+                self.start()
+            self.next_id += 1
+            self.pending[self.next_id] = future
+            request = json.dumps({'id': self.next_id, 'items': events, 'priority': 'bulk'}, ensure_ascii=False) + '\n'
+            try:
+                self.process.stdin.write(request.encode('utf-8'))
+                self.process.stdin.flush()
+            except OSError:
+                # 프로세스가 이미 종료됨: 읽기 스레드가 이 요청도 실패 처리
+                pass
+        return future
+
+    def stop(self):
+        with self.lock:
+            process = self.process
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+
+
+class Checkpoint:
+    """
+    진행 상황 파일 (<출력>.checkpoint.json)
+    done: 결과를 쓴 입력 행 수, output_bytes: 그 시점의 출력 파일 크기 (재시작 시 이 크기로 잘라내고 이어 씀)
+    input_digest: 앞 done개 행 내용의 해시 (재시작 시 다시 읽은 앞부분과 비교, stdin처럼 파일 정보로 구분할 수 없는 입력도 확인)
+    """
+
+    def __init__(self, output_path, input_path):
+        self.path = Path(f'{output_path}.checkpoint.json')
+        self.input = self.fingerprint(input_path)
+        self.state = {'input': self.input, 'done': 0, 'input_digest': '', 'output_bytes': 0, 'scored': 0, 'spam': 0, 'errors': 0, 'completed': False}
+
+    @staticmethod
+    def fingerprint(input_path):
+        """입력 파일 식별 정보 (재시작 시 같은 입력인지 확인, stdin은 경로만이므로 내용은 input_digest로 확인)"""
+        if input_path == '-':
+            return {'path': '-'}
+        stat = os.stat(input_path)
+        return {'path': str(Path(input_path).resolve()), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def load(self):
+        """저장된 진행 상황 읽기 (입력이 바뀌었으면 오류)"""
+        if not self.path.exists():
+            return False
+        state = json.loads(self.path.read_text(encoding='utf-8'))
+        if state.get('input') != self.input:
+            raise RuntimeError(f'체크포인트의 입력 파일이 다릅니다: {self.path} (처음부터 다시 하려면 --restart)')
+        if state.get('done') and 'input_digest' not in state and self.input['path'] == '-':
+            raise RuntimeError(f'체크포인트에 입력 내용 해시가 없어 stdin 입력을 이어서 처리할 수 없습니다: {self.path} (처음부터 다시 하려면 --restart)')
+        self.state.update(state)
+        return True
+
+    def save(self, **state):
+        self.state.update(state)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(json.dumps(self.state, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+
+
+def format_rows(batch, results, as_csv):
+    """배치 결과를 출력 형식의 문자열로 변환"""
+    rows = []
+    results = iter(results)
+    for event_id, event, error in batch:
+        if event is None:
+            rows.append({'id': event_id, 'error': error})
+        else:
+            rows.append({'id': event_id, 'result': next(results)})
+    if not as_csv:
+        return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, lineterminator='\n')
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def rescore(input_path, output_path, processes=PROCESSES, batch_size=BATCH_SIZE, restart=RESTART):
+    """
+    input_path의 행사를 재판정해 output_path에 쓰기 (체크포인트가 있으면 이어서 처리)
+    결과: 요약 dict (처리 건수, 스팸 건수, 초당 처리량 등)
+    """
+    as_csv = output_path.lower().endswith('.csv')
+    checkpoint = Checkpoint(output_path, input_path)
+    resumed = not restart and checkpoint.load()
+    if resumed and checkpoint.state['completed']:
+        log('info', '이미 완료된 재판정입니다: {}', output_path)
+        return dict(checkpoint.state, resumed=True, items=0, seconds=0.0, items_per_second=0.0)
+    if not resumed:
+        checkpoint.save()
+    elif not os.path.exists(output_path):
+        raise RuntimeError(f'체크포인트는 있지만 출력 파일이 없습니다: {output_path} (처음부터 다시 하려면 --restart)')
+    skip = checkpoint.state['done']
+    # 해시가 없는 이전 형식 체크포인트(파일 입력)는 파일 정보로만 확인
+    skip_digest = checkpoint.state.get('input_digest') if skip else None
+    if skip:
+        log('info', '체크포인트에서 이어서 처리합니다 ({}행 완료)', skip)
+
+    # 마지막 체크포인트 이후에 쓴 부분은 버리고 그 위치부터 이어 씀
+    output = open(output_path, 'r+b' if resumed else 'wb')
+    output.truncate(checkpoint.state['output_bytes'])
+    output.seek(checkpoint.state['output_bytes'])
+    if as_csv and checkpoint.state['output_bytes'] == 0:
+        output.write((','.join(CSV_FIELDS) + '\n').encode('utf-8'))
+
+    serve = ServeProcess(processes)
+
+    def submit(batch):
+        events = [event for _, event, _ in batch if event is not None]
+        if not events:
+            done = Future()
+            done.set_result({'results': []})
+            return events, done
+        return events, serve.submit(events)
+
+    def results(events, future):
+        """배치 판정 결과 (프로세스나 워커가 죽었으면 한 번 더 시도, 판정 오류는 RuntimeError)"""
+        try:
+            response = future.result()
+        except WorkerExited as e:
+            log('warning', f'재판정 워커 재시작 후 다시 시도: {str(e)}')
+            response = serve.submit(events).result()
+        if response.get('worker_exited'):
+            # 워커 풀에서 워커 하나만 죽음 (풀이 새 워커로 교체함)
+            log('warning', f'재판정 워커 교체 후 다시 시도: {response["error"]}')
+            response = serve.submit(events).result()
+        if 'error' in response:
+            raise RuntimeError(f'재판정 판정 오류: {response["error"]}')
+        return response['results']
+
+    state = checkpoint.state
+    start = time.perf_counter()
+    reported = start
+    items = 0
+
+    def write(batch, results, digest):
+        nonlocal items, reported
+        output.write(format_rows(batch, results, as_csv).encode('utf-8'))
+        output.flush()
+        os.fsync(output.fileno())
+        items += len(batch)
+        checkpoint.save(
+            done=state['done'] + len(batch),
+            input_digest=digest,
+            output_bytes=output.tell(),
+            scored=state['scored'] + len(results),
+            spam=state['spam'] + sum(results),
+            errors=state['errors'] + len(batch) - len(results),
+        )
+        now = time.perf_counter()
+        if now - reported >= PROGRESS_INTERVAL:
+            log('info', '재판정 진행 중', done=state['done'], items_per_second=round(items / (now - start), 1))
+            reported = now
+
+    try:
+        # 처리 중인 배치는 워커 수의 2배까지만 유지 (입력을 미리 다 읽지 않음), 결과는 입력 순서대로 씀
+        pending = deque()
+        for batch, digest in read_batches(input_path, skip, batch_size, skip_digest):
+            pending.append((batch, digest, *submit(batch)))
+            while len(pending) >= processes * 2:
+                batch, digest, events, future = pending.popleft()
+                write(batch, results(events, future), digest)
+        while pending:
+            batch, digest, events, future = pending.popleft()
+            write(batch, results(events, future), digest)
+        checkpoint.save(completed=True)
+    finally:
+        output.close()
+        serve.stop()
+
+    seconds = time.perf_counter() - start
+    return dict(state, resumed=resumed, items=items, seconds=seconds, items_per_second=items / seconds if seconds else 0.0)
+
+
+if __name__ == '__main__':
+    if not OUTPUT_PATH:
+        log('error', '--output 경로가 필요합니다')
+        sys.exit(2)
+    try:
+        summary = rescore(INPUT_PATH, OUTPUT_PATH)
+    except KeyboardInterrupt:
+        log('warning', '재판정 중단 (같은 명령을 다시 실행하면 체크포인트부터 이어서 처리합니다)')
+        sys.exit(130)
+    except (RuntimeError, OSError) as e:
+        log('error', f'재판정 중단: {str(e)}')
+        sys.exit(1)
+    print(json.dumps(summary, ensure_ascii=False), flush=True)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+모델 상주 관리 (유휴 시간 / 메모리 예산)
+상주 프로세스에서 한동안 쓰지 않은 모델과 토크나이저를 내리고, 다음 요청에서 다시 로드합니다.
+- ttl: 마지막 사용 후 ttl초가 지나면 내림 (0이면 사용 안 함)
+- budget: 상주 모델 크기 합이 budget 바이트를 넘으면 가장 오래 쓰지 않은 모델부터 내림 (0이면 사용 안 함)
+다시 로드할 때 fp32 torch 모델은 메모리 매핑 체크포인트를 쓰므로 페이지 캐시에 남아 있으면 디스크 I/O 없이 빠르게 올라옵니다.
+내린 모델을 처리 중인 요청은 참조를 쥐고 있으므로 그대로 끝까지 처리되고, 메모리는 요청이 끝난 뒤 반환됩니다.
+"""
+import gc
+import os
+import sys
+import time
+import ctypes
+import threading
+
+from spam_metrics import log, increment, gauge, add_collector
+
+
+def current_rss():
+    """현재 프로세스 RSS(바이트), 알 수 없으면 None (/proc가 없으면 최대 RSS로 대체)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS는 바이트, Linux는 KB 단위
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def object_bytes(obj):
+    """
+    모델이 차지하는 메모리 추정치 (바이트)
+    torch 모듈: 파라미터/버퍼 크기 합, 파일 경로(path)가 있는 모델(ONNX 세션): 파일 크기, 그 외 0
+    """
+    if hasattr(obj, 'parameters') and hasattr(obj, 'buffers'):
+        tensors = list(obj.parameters()) + list(obj.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    path = getattr(obj, 'path', None)
+    if path is not None:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    return 0
+
+
+def release_memory():
+    """내린 객체를 회수하고 해제된 힙을 OS에 반환 (glibc malloc_trim, 없으면 무시)"""
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class Residency:
+    """
+    상주 객체(모델/토크나이저)별 마지막 사용 시각과 크기 기록, 유휴/예산 초과 시 unload(name) 호출
+    loaded/touch는 요청 처리 스레드에서, 유휴 확인은 감시 스레드(start)에서 실행됨
+    """
+
+    def __init__(self, ttl, budget, unload):
+        self.ttl = ttl
+        self.budget = budget
+        self.unload = unload
+        self.enabled = ttl > 0 or budget > 0
+        self.lock = threading.Lock()
+        self.resident = {}
+        self.known = set()
+        self.loads = 0
+        self.evictions = 0
+        self.thread = None
+        add_collector(self.collect)
+
+    def loaded(self, name, obj=None):
+        """name을 로드함 (크기 기록 후 예산을 넘으면 다른 객체부터 내림)"""
+        size = object_bytes(obj) if obj is not None else 0
+        with self.lock:
+            self.resident[name] = {'bytes': size, 'last_used': time.monotonic()}
+            self.known.add(name)
+            self.loads += 1
+        increment('residency_loads')
+        log('debug', '{} 로드 (상주 {}개)', name, len(self.resident), bytes=size, rss=current_rss())
+        if self.budget > 0:
+            self.enforce_budget(keep=name)
+
+    def disable(self):
+        """유휴/예산 기준 내림 중지 (크기/로드 횟수 기록은 유지)"""
+        self.ttl = self.budget = 0
+        self.enabled = False
+
+    def touch(self, name):
+        # 감시 스레드가 같은 dict를 잠금 안에서 순회하므로 갱신도 잠금 안에서
+        with self.lock:
+            entry = self.resident.get(name)
+            if entry is not None:
+                entry['last_used'] = time.monotonic()
+
+    def evict(self, name, reason):
+        """name을 내림 (이미 내려갔으면 무시)"""
+        with self.lock:
+            entry = self.resident.pop(name, None)
+            if entry is None:
+                return
+            self.unload(name)
+            self.evictions += 1
+        increment('residency_evictions')
+        release_memory()
+        log('info', '{} 내림 ({})', name, reason, bytes=entry['bytes'], rss=current_rss())
+
+    def enforce_budget(self, keep=None):
+        """상주 크기 합이 예산 이하가 될 때까지 가장 오래 쓰지 않은 것부터 내림 (keep은 제외)"""
+        while True:
+            with self.lock:
+                total = sum(entry['bytes'] for entry in self.resident.values())
+                candidates = sorted((entry['last_used'], name) for name, entry in self.resident.items() if name != keep and entry['bytes'] > 0)
+            if total <= self.budget or not candidates:
+                if total > self.budget:
+                    log('warning', '메모리 예산을 넘었지만 더 내릴 모델이 없습니다', total=total, budget=self.budget)
+                return
+            self.evict(candidates[0][1], '메모리 예산 초과')
+
+    def evict_idle(self):
+        """ttl초 넘게 쓰지 않은 객체를 내림"""
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self.lock:
+            idle = [name for name, entry in self.resident.items() if now - entry['last_used'] >= self.ttl]
+        for name in idle:
+            self.evict(name, f'{self.ttl:g}초 동안 사용하지 않음')
+
+    def start(self):
+        """유휴 확인 스레드 시작 (ttl이 있을 때만)"""
+        if self.ttl <= 0 or self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.watch_loop, name='spam-residency', daemon=True)
+        self.thread.start()
+
+    def watch_loop(self):
+        interval = min(max(self.ttl / 4, 1.0), 30.0)
+        while True:
+            time.sleep(interval)
+            self.evict_idle()
+
+    def collect(self):
+        """측정값 출력 직전에 현재 RSS와 상주 크기 갱신"""
+        rss = current_rss()
+        if rss is not None:
+            gauge('rss_bytes', rss)
+        with self.lock:
+            for name in self.known:
+                gauge('resident_bytes', self.resident[name]['bytes'] if name in self.resident else 0, model=name)
+            gauge('resident_models', len(self.resident))
+
+    def status(self):
+        """상주 설정, 현재 상주 객체별 크기/유휴 시간, 로드/내림 횟수 (serve `{"residency": "status"}`, `--listen` `GET /readyz`)"""
+        now = time.monotonic()
+        with self.lock:
+            resident = {name: {'bytes': entry['bytes'], 'idle_seconds': now - entry['last_used']} for name, entry in self.resident.items()}
+        return {
+            'enabled': self.enabled,
+            'ttl_seconds': self.ttl,
+            'budget_bytes': self.budget,
+            'rss_bytes': current_rss(),
+            'resident': resident,
+            'loads': self.loads,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+스팸 필터링 스크립트 공통 실행 설정
+CLI 옵션/환경 변수 읽기, CPU 스레드 수 설정(자동 튜닝 포함), 체크포인트 해시 계산, 변환 파일용 임시 경로를 담당합니다.
+torch는 ONNX 백엔드에서 import하지 않도록 필요한 함수 안에서만 import합니다.
+"""
+import sys
+import json
+import os
+import time
+import platform
+import hashlib
+import tempfile
+from pathlib import Path
+
+
+def get_option(flag, env_name, default=None):
+    """
+    설정 값 읽기 (우선순위: CLI `--flag=값` / `--flag 값` > 환경 변수 > 기본값)
+    """
+    args = sys.argv[1:]
+    for i, arg in enumerate(args):
+        if arg.startswith(flag + '='):
+            return arg[len(flag) + 1:]
+        if arg == flag and i + 1 < len(args) and not args[i + 1].startswith('--'):
+            return args[i + 1]
+    return os.environ.get(env_name, default)
+
+
+def has_flag(flag, env_name=None):
+    """on/off 설정 읽기 (CLI 플래그가 있거나 환경 변수가 1/true/yes이면 True)"""
+    if flag in sys.argv[1:]:
+        return True
+    if env_name:
+        return os.environ.get(env_name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+    return False
+
+
+def parse_thread_count(value, default=1):
+    """스레드 수 설정 해석: 정수, 'auto'(CPU 코어 수), 'tune'(자동 튜닝)"""
+    if value is None or str(value).strip() == '':
+        return default
+    value = str(value).strip().lower()
+    if value == 'auto':
+        return os.cpu_count() or 1
+    if value == 'tune':
+        return 'tune'
+    return max(1, int(value))
+
+
+def configure_threads(use_torch=True):
+    """
+    intra-op / inter-op 스레드 수 설정
+    --num-threads / SPAM_NUM_THREADS: 정수, auto, tune (기본 1, 메모리 절약)
+    --num-interop-threads / SPAM_NUM_INTEROP_THREADS: 정수, auto (기본 1)
+    use_torch가 False면 값만 계산 (ONNX Runtime 세션 옵션에 사용, tune은 코어 수로 대체)
+    결과: (intra-op 스레드 수 또는 'tune', inter-op 스레드 수)
+    """
+    # spam_metrics가 이 모듈을 import하므로 로그 함수는 호출 시점에 import
+    from spam_metrics import log
+
+    num_threads = parse_thread_count(get_option('--num-threads', 'SPAM_NUM_THREADS'))
+    num_interop_threads = parse_thread_count(get_option('--num-interop-threads', 'SPAM_NUM_INTEROP_THREADS'))
+    if num_interop_threads == 'tune':
+        num_interop_threads = 1
+
+    if not use_torch:
+        if num_threads == 'tune':
+            log('warning', '스레드 자동 튜닝은 torch 백엔드에서만 지원합니다. 코어 수를 사용합니다')
+            num_threads = os.cpu_count() or 1
+        return num_threads, num_interop_threads
+
+    import torch
+
+    # tune이면 튜닝 전까지 단일 스레드로 시작
+    torch.set_num_threads(1 if num_threads == 'tune' else num_threads)
+    # inter-op 스레드 수는 병렬 작업 시작 전에 한 번만 설정 가능
+    if hasattr(torch, 'set_num_interop_threads'):
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError:
+            pass
+
+    return num_threads, num_interop_threads
+
+
+def thread_candidates():
+    """자동 튜닝 후보 스레드 수 (1, 2, 4, ... , CPU 코어 수)"""
+    cpu_count = os.cpu_count() or 1
+    candidates = {cpu_count}
+    n = 1
+    while n < cpu_count:
+        candidates.add(n)
+        n *= 2
+    return sorted(candidates)
+
+
+def autotune_threads(run_once, cache_path, repeats=5, force=False):
+    """
+    후보 스레드 수마다 run_once(대표 추론 1회)의 평균 시간을 재서 가장 빠른 값으로 설정
+    결과는 cache_path에 저장되어 같은 머신에서는 다음 실행부터 측정 없이 재사용됩니다.
+    결과: {'num_threads': 선택된 값, 'timings': {스레드 수: 평균 초}}
+    """
+    import torch
+    from spam_metrics import log
+
+    machine_key = f'{platform.node()}:{os.cpu_count()}:{torch.__version__}'
+
+    if not force and cache_path.exists():
+        try:
+            cached = json.loads(cache_path.read_text(encoding='utf-8'))
+            if cached.get('machine') == machine_key:
+                torch.set_num_threads(cached['num_threads'])
+                return cached
+        except (ValueError, KeyError, OSError):
+            pass
+
+    timings = {}
+    for num_threads in thread_candidates():
+        torch.set_num_threads(num_threads)
+        run_once()  # 워밍업
+        start = time.perf_counter()
+        for _ in range(repeats):
+            run_once()
+        timings[num_threads] = (time.perf_counter() - start) / repeats
+
+    best = min(timings, key=timings.get)
+    torch.set_num_threads(best)
+
+    result = {'machine': machine_key, 'num_threads': best, 'timings': timings}
+    try:
+        cache_path.write_text(json.dumps(result), encoding='utf-8')
+    except OSError as e:
+        log('warning', f'스레드 튜닝 결과 저장 실패: {str(e)}')
+
+    log('info', f'스레드 자동 튜닝 완료: {best}개 스레드 선택', timings=timings)
+    return result
+
+
+def checkpoint_hash(path):
+    """
+    체크포인트 파일의 SHA-256 해시
+    파일 크기/수정 시각이 같으면 `<파일>.sha256`에 저장된 값을 재사용합니다 (대용량 파일 재해시 방지)
+    """
+    stat = path.stat()
+    stamp = f'{stat.st_size}:{stat.st_mtime_ns}'
+    sidecar = path.with_name(path.name + '.sha256')
+
+    try:
+        cached_stamp, cached_hash = sidecar.read_text(encoding='utf-8').split()
+        if cached_stamp == stamp:
+            return cached_hash
+    except (OSError, ValueError):
+        pass
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    file_hash = digest.hexdigest()
+    remember_checkpoint_hash(path, file_hash)
+    return file_hash
+
+
+def remember_checkpoint_hash(path, file_hash):
+    """이미 계산한 해시(예: 다운로드 중 계산)를 `<파일>.sha256`에 기록"""
+    stat = path.stat()
+    sidecar = path.with_name(path.name + '.sha256')
+    try:
+        sidecar.write_text(f'{stat.st_size}:{stat.st_mtime_ns} {file_hash}', encoding='utf-8')
+    except OSError:
+        pass
+
+
+def unique_temp_path(path):
+    """
+    path와 같은 디렉토리의 이 프로세스 전용 임시 파일 (빈 파일로 생성, 결과: Path)
+    여러 프로세스가 같은 파일을 동시에 변환해도 서로의 임시 파일을 덮어쓰거나 지우지 않고,
+    각자 완성한 파일을 rename으로 교체하므로 최종 파일은 항상 한 프로세스가 쓴 온전한 파일입니다.
+    """
+    fd, name = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + '.', suffix='.tmp')
+    os.close(fd)
+    return Path(name)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+판정 요청 우선순위/마감 시각 스케줄링
+요청마다 우선순위 등급("priority")과 절대 마감 시각("deadline", Unix 시각 초)을 받아
+- 등급이 높은 요청을 먼저 처리 (interactive > normal > bulk, 같은 등급 안에서는 도착 순)
+- 처리를 시작하기 전에 마감 시각이 지난 요청은 모델을 실행하지 않고 버림 (호출자가 이미 포기한 요청)
+- 등급별 대기열 길이(gauge queue_depth_<등급>)와 대기 시간(단계 queue_<등급>), 마감 초과 수(카운터 expired_<등급>)를 기록
+serve 모드(단일 프로세스/워커 풀)와 --listen 서버의 대기열이 함께 사용하며, queue_status로 등급별 상태를 조회합니다.
+"""
+import time
+import threading
+from collections import deque
+
+from spam_metrics import observe, increment, gauge, snapshot
+
+# 높은 등급부터 (새로 등록된 행사 > 수정 재판정 > 일괄 재판정)
+PRIORITIES = ('interactive', 'normal', 'bulk')
+DEFAULT_PRIORITY = 'normal'
+
+
+class Expired(Exception):
+    """처리를 시작하기 전에 마감 시각이 지남"""
+
+
+def request_schedule(request):
+    """
+    요청의 (우선순위 등급, 마감 시각)
+    priority 생략 시 DEFAULT_PRIORITY, deadline(Unix 시각 초) 생략 시 None, 잘못된 값이면 ValueError
+    """
+    priority = request.get('priority') or DEFAULT_PRIORITY
+    if priority not in PRIORITIES:
+        raise ValueError(f'알 수 없는 priority: {priority} (가능: {", ".join(PRIORITIES)})')
+    deadline = request.get('deadline')
+    if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))):
+        raise ValueError(f'deadline은 Unix 시각(초)이어야 합니다: {deadline!r}')
+    return priority, None if deadline is None else float(deadline)
+
+
+def expired_error(priority, deadline):
+    """마감 초과 응답 메시지"""
+    return f'마감 시각이 지나 판정하지 않았습니다 (priority={priority}, {time.time() - deadline:.1f}초 초과)'
+
+
+def queue_status():
+    """등급별 현재 대기 수, 대기 시간 요약(ms), 마감 초과 수 (이 프로세스의 측정값)"""
+    metrics = snapshot()
+    return {
+        priority: {
+            'depth': metrics['gauges'].get(f'queue_depth_{priority}', 0),
+            'wait': metrics['stages'].get(f'queue_{priority}'),
+            'expired': metrics['counters'].get(f'expired_{priority}', 0),
+        }
+        for priority in PRIORITIES
+    }
+
+
+class Entry:
+    """대기 중인 요청 하나"""
+
+    __slots__ = ('item', 'priority', 'deadline', 'queued')
+
+    def __init__(self, item, priority, deadline):
+        self.item = item
+        self.priority = priority
+        self.deadline = deadline
+        self.queued = time.perf_counter()
+
+    def expired(self, now=None):
+        return self.deadline is not None and (now or time.time()) >= self.deadline
+
+
+class ScheduledQueue:
+    """
+    우선순위 등급별 FIFO 대기열 (스레드 안전, 기다리는 기능은 없음: 호출자가 Condition/asyncio 이벤트로 처리)
+    pop은 가장 높은 등급의 가장 오래된 요청을 꺼내고, 그 전에 마감이 지난 요청은 on_expired로 넘김
+    """
+
+    def __init__(self):
+        self.queues = {priority: deque() for priority in PRIORITIES}
+        self.lock = threading.Lock()
+        self.update_gauges()
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def lower_count(self, priority):
+        """priority보다 낮은 등급의 대기 수 (shed로 비울 수 있는 자리)"""
+        return sum(len(self.queues[lower]) for lower in PRIORITIES[PRIORITIES.index(priority) + 1:])
+
+    def update_gauges(self):
+        for priority, queue in self.queues.items():
+            gauge(f'queue_depth_{priority}', len(queue))
+
+    def push(self, item, priority=DEFAULT_PRIORITY, deadline=None):
+        entry = Entry(item, priority, deadline)
+        with self.lock:
+            self.queues[priority].append(entry)
+            self.update_gauges()
+        return entry
+
+    def push_front(self, entry):
+        """꺼냈던 요청을 처리하지 못해 다시 맨 앞에 넣음 (대기 시간은 처음 넣은 시각부터)"""
+        with self.lock:
+            self.queues[entry.priority].appendleft(entry)
+            self.update_gauges()
+
+    def pop(self, on_expired=None):
+        """
+        처리할 요청 하나 꺼내기 (없으면 None)
+        마감이 지난 요청은 버리고 on_expired(entry)로 알림 (응답은 호출자가)
+        """
+        now = time.time()
+        while True:
+            with self.lock:
+                entry = next((queue.popleft() for queue in self.queues.values() if queue), None)
+                self.update_gauges()
+            if entry is None:
+                return None
+            observe(f'queue_{entry.priority}', time.perf_counter() - entry.queued)
+            if not entry.expired(now):
+                return entry
+            increment(f'expired_{entry.priority}')
+            if on_expired is not None:
+                on_expired(entry)
+
+    def shed(self, priority, count):
+        """
+        priority보다 낮은 등급의 요청을 낮은 등급, 최근 도착 순으로 최대 count개 꺼냄
+        (대기열이 가득 찼을 때 높은 등급 요청에 자리를 내주는 용도, 꺼낸 요청의 응답은 호출자가)
+        """
+        shed = []
+        with self.lock:
+            for lower in reversed(PRIORITIES[PRIORITIES.index(priority) + 1:]):
+                queue = self.queues[lower]
+                while queue and len(shed) < count:
+                    shed.append(queue.pop())
+            self.update_gauges()
+        if shed:
+            increment('shed', len(shed))
+        return shed
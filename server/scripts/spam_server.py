@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+asyncio 스팸 필터링 서버 (동적 배치)
+localhost HTTP 또는 Unix 소켓으로 여러 호출자의 판정 요청을 동시에 받아 큐에 넣고,
+최대 배치 크기(max_batch)나 최대 대기 시간(max_wait_ms) 중 먼저 도달하는 시점에 모아서 한 번의 배치 예측으로 처리합니다.
+요청 도착 간격(지수 이동 평균)이 남은 대기 시간보다 길면 기다리지 않으므로, 한가할 때는 지연 시간이 늘지 않습니다.
+- 요청의 "priority"(interactive > normal > bulk) 순으로 배치를 구성하고, "deadline"(Unix 시각 초)이 지난 요청은 판정하지 않고 504 (spam_schedule)
+- 큐가 가득 차면 바로 503(busy)으로 거절 (backpressure), 단 더 낮은 등급 요청이 있으면 그 요청을 503으로 밀어내고 받음
+- GET /healthz: 프로세스 상태와 큐 길이(우선순위 등급별 대기 수/대기 시간 포함), GET /readyz: 모델 로드가 끝났으면 200 (아니면 503), GET /metrics: Prometheus 텍스트
+- POST /check: serve 모드와 같은 JSON 요청 ({"text", "model_type"}, {"title", "description"}, {"items": [...]})
+- GET /registry: 모델 레지스트리 상태, POST /registry: manifest 다시 읽기 (control이 있을 때만)
+모델 추론은 스레드 하나에서 순서대로 실행하고, 이벤트 루프는 요청 수신/배치 구성만 담당합니다.
+외부 패키지 없이 표준 라이브러리 asyncio로 HTTP/1.1(keep-alive, Content-Length 본문)만 처리합니다.
+"""
+import os
+import json
+import time
+import signal
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from spam_metrics import log, observe, increment, snapshot, prometheus_text
+from spam_schedule import DEFAULT_PRIORITY, Expired, ScheduledQueue, request_schedule, expired_error, queue_status
+
+# 요청 본문 최대 크기 (바이트)
+MAX_BODY_BYTES = 1 << 20
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+class Busy(Exception):
+    """큐가 가득 차서 요청을 받을 수 없음"""
+
+
+class Batcher:
+    """
+    요청 큐와 동적 배치 구성
+    run_batch(texts, model_type) -> 판정 목록 은 추론 스레드에서 실행됨
+    """
+
+    def __init__(self, run_batch, max_batch, max_wait, max_queue):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.queue = ScheduledQueue()
+        # 큐에 요청이 들어오면 set (collect가 기다리는 동안)
+        self.arrived = asyncio.Event()
+        # 요청 도착 간격의 지수 이동 평균 (초)
+        self.arrival_gap = max_wait
+        self.last_arrival = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spam-inference')
+
+    def depth(self):
+        return len(self.queue)
+
+    def submit(self, items, priority=DEFAULT_PRIORITY, deadline=None):
+        """
+        (model_type, text) 목록을 priority 등급으로 큐에 넣고 각 판정의 future 목록 반환
+        큐에 모두 들어갈 자리가 없으면 더 낮은 등급 요청을 밀어내고(Busy로 끝냄), 그래도 모자라면 하나도 넣지 않고 Busy
+        """
+        overflow = len(self.queue) + len(items) - self.max_queue
+        if overflow > 0:
+            if self.queue.lower_count(priority) < overflow:
+                increment('rejected')
+                raise Busy(f'대기 중인 요청이 너무 많습니다 (큐 {len(self.queue)}/{self.max_queue})')
+            for entry in self.queue.shed(priority, overflow):
+                future = entry.item[2]
+                if not future.done():
+                    future.set_exception(Busy(f'더 높은 우선순위 요청에 밀려났습니다 (priority={entry.priority})'))
+        now = time.perf_counter()
+        if self.last_arrival is not None:
+            self.arrival_gap = 0.8 * self.arrival_gap + 0.2 * (now - self.last_arrival)
+        self.last_arrival = now
+        loop = asyncio.get_running_loop()
+        futures = []
+        for model_type, text in items:
+            future = loop.create_future()
+            self.queue.push((model_type, text, future), priority, deadline)
+            futures.append(future)
+        self.arrived.set()
+        return futures
+
+    def expire(self, entry):
+        future = entry.item[2]
+        if not future.done():
+            future.set_exception(Expired(expired_error(entry.priority, entry.deadline)))
+
+    async def next_entry(self, timeout=None):
+        """
+        큐에서 가장 높은 등급의 요청 하나 (마감이 지난 요청은 Expired로 끝내고 건너뜀)
+        timeout초 안에 요청이 없으면 None
+        """
+        until = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            entry = self.queue.pop(on_expired=self.expire)
+            if entry is not None:
+                return entry
+            self.arrived.clear()
+            if until is None:
+                await self.arrived.wait()
+                continue
+            remaining = until - time.perf_counter()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self.arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    async def collect(self):
+        """
+        첫 요청을 기다린 뒤 max_batch개가 차거나 max_wait가 지날 때까지 높은 등급부터 모음
+        남은 시간 안에 다음 요청이 올 것 같지 않으면(평균 도착 간격 > 남은 시간) 바로 처리
+        """
+        batch = [await self.next_entry()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            entry = self.queue.pop(on_expired=self.expire)
+            if entry is not None:
+                batch.append(entry)
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0 or self.arrival_gap > timeout:
+                break
+            entry = await self.next_entry(timeout)
+            if entry is None:
+                break
+            batch.append(entry)
+        return batch
+
+    async def run(self):
+        """배치 처리 루프 (배치를 추론 스레드에서 실행하는 동안 다음 요청은 큐에 쌓임)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.collect()
+            now = time.perf_counter()
+            groups = {}
+            for entry in batch:
+                model_type, text, future = entry.item
+                observe('queue', now - entry.queued)
+                groups.setdefault(model_type, []).append((text, future))
+            increment('batches')
+            increment('batched_texts', len(batch))
+            for model_type, entries in groups.items():
+                texts = [text for text, _ in entries]
+                try:
+                    results = await loop.run_in_executor(self.executor, self.run_batch, texts, model_type)
+                except Exception as e:
+                    for _, future in entries:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), result in zip(entries, results):
+                    if not future.done():
+                        future.set_result(result)
+
+
+async def predict(batcher, model_type, text, priority=DEFAULT_PRIORITY, deadline=None):
+    """텍스트 하나 판정 (배치 큐 경유)"""
+    future, = batcher.submit([(model_type, text)], priority, deadline)
+    return await future
+
+
+async def check_event(batcher, title, description, parallel=False, priority=DEFAULT_PRIORITY, deadline=None):
+    """
+    title/description 판정 (title이 스팸이면 description 판정 생략, parallel이면 동시에 큐에 넣음)
+    결과: 0 = 정상, 1 = 스팸
+    """
+    if parallel and title and description:
+        results = await asyncio.gather(*batcher.submit([('title', title), ('describe', description)], priority, deadline))
+        return 1 if 1 in results else 0
+    if title and await predict(batcher, 'title', title, priority, deadline) == 1:
+        return 1
+    if description and await predict(batcher, 'describe', description, priority, deadline) == 1:
+        return 1
+    return 0
+
+
+async def check_request(batcher, request, parallel=False):
+    """
+    POST /check 본문 처리 (serve 모드와 같은 형식, 응답 dict)
+      {"text": "...", "model_type": "title"} / {"title": "...", "description": "..."} / {"items": [...], "model_type": "title"}
+    "priority"/"deadline"은 요청의 모든 텍스트에 적용
+    """
+    request_id = request.get('id')
+    model_type = request.get('model_type') or 'title'
+    if model_type not in ('title', 'describe'):
+        raise ValueError(f'알 수 없는 model_type: {model_type}')
+    priority, deadline = request_schedule(request)
+
+    if 'items' in request:
+        items = request['items']
+        if not isinstance(items, list):
+            raise ValueError('items는 배열이어야 합니다')
+        results = await asyncio.gather(*[
+            check_event(batcher, str(item.get('title') or '').strip(), str(item.get('description') or '').strip(), parallel, priority, deadline)
+            if isinstance(item, dict) else predict(batcher, model_type, item, priority, deadline)
+            for item in items
+        ])
+        return {'id': request_id, 'results': list(results)}
+    if 'text' in request:
+        return {'id': request_id, 'result': await predict(batcher, model_type, request.get('text'), priority, deadline)}
+    title = str(request.get('title') or '').strip()
+    description = str(request.get('description') or '').strip()
+    return {'id': request_id, 'result': await check_event(batcher, title, description, parallel, priority, deadline)}
+
+
+def content_length(value):
+    """Content-Length 헤더 값 (없으면 0), 숫자가 아니거나 MAX_BODY_BYTES를 넘으면 ValueError"""
+    value = (value or '0').strip()
+    if not (value.isascii() and value.isdigit()):
+        raise ValueError(f'잘못된 Content-Length: {value!r}')
+    length = int(value)
+    if length > MAX_BODY_BYTES:
+        raise ValueError(f'요청 본문이 너무 큽니다 (최대 {MAX_BODY_BYTES}바이트)')
+    return length
+
+
+class SpamServer:
+    """HTTP 라우팅과 모델 로드 상태"""
+
+    def __init__(self, batcher, load, parallel=False, control=None, residency=None):
+        self.batcher = batcher
+        self.load = load
+        self.parallel = parallel
+        self.control = control
+        self.residency = residency
+        self.ready = False
+        self.load_error = None
+        self.started = time.time()
+
+    async def load_models(self):
+        """모델 로드 (추론 스레드에서 실행, 끝나면 readiness 200)"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.batcher.executor, self.load)
+            self.ready = True
+            log('info', '스팸 체크 서버 준비 완료')
+        except Exception as e:
+            # 로드에 실패해도 서버는 남아 healthz로 실패를 알림
+            self.load_error = str(e) or type(e).__name__
+            log('error', f'모델 로드 실패: {self.load_error}')
+
+    def health(self):
+        return {
+            'status': 'ok' if self.load_error is None else 'error',
+            'ready': self.ready,
+            'error': self.load_error,
+            'queue': self.batcher.depth(),
+            'queues': queue_status(),
+            'max_queue': self.batcher.max_queue,
+            'uptime_seconds': time.time() - self.started,
+        }
+
+    async def route(self, method, path, body):
+        """결과: (상태 코드, 응답 본문(dict 또는 str))"""
+        if path == '/healthz':
+            return (200 if self.load_error is None else 500), self.health()
+        if path == '/readyz':
+            payload = {'ready': self.ready, 'error': self.load_error}
+            if self.residency is not None:
+                payload['residency'] = self.residency()
+            return (200 if self.ready else 503), payload
+        if path == '/metrics':
+            return 200, prometheus_text()
+        if path == '/metrics.json':
+            return 200, snapshot()
+        if path == '/registry' and self.control is not None:
+            # 모델 교체와 같은 추론 스레드에서 실행 (배치 처리 중에는 대기)
+            command = 'reload' if method == 'POST' else 'status'
+            return 200, await asyncio.get_running_loop().run_in_executor(self.batcher.executor, self.control, command)
+        if path != '/check':
+            return 404, {'error': f'알 수 없는 경로: {path}'}
+        if method != 'POST':
+            return 405, {'error': 'POST만 지원합니다'}
+        if not self.ready:
+            return 503, {'error': '모델 로드 중입니다' if self.load_error is None else f'모델 로드 실패: {self.load_error}'}
+
+        try:
+            request = json.loads(body.decode('utf-8', errors='replace'))
+            if not isinstance(request, dict):
+                raise ValueError('요청은 JSON 객체여야 합니다')
+        except ValueError as e:
+            return 400, {'error': f'잘못된 요청: {str(e)}'}
+
+        increment('requests')
+        start = time.perf_counter()
+        try:
+            return 200, await check_request(self.batcher, request, self.parallel)
+        except Busy as e:
+            return 503, {'id': request.get('id'), 'error': str(e)}
+        except Expired as e:
+            return 504, {'id': request.get('id'), 'error': str(e), 'expired': True}
+        except ValueError as e:
+            increment('errors')
+            return 400, {'id': request.get('id'), 'error': str(e)}
+        except Exception as e:
+            increment('errors')
+            return 500, {'id': request.get('id'), 'error': str(e)}
+        finally:
+            observe('request', time.perf_counter() - start)
+
+    async def handle_connection(self, reader, writer):
+        """HTTP/1.1 연결 하나 처리 (keep-alive)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, 400, {'error': '잘못된 요청 줄'}, close=True)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = content_length(headers.get('content-length'))
+                except ValueError as e:
+                    # 본문 경계를 알 수 없으므로 응답 후 연결을 닫음
+                    await self.respond(writer, 400, {'error': str(e)}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0'
+                status, payload = await self.route(method.upper(), target.split('?', 1)[0], body)
+                await self.respond(writer, status, payload, close=close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, close=False):
+        if isinstance(payload, str):
+            data, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            data, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+        head = [
+            f'HTTP/1.1 {status} {HTTP_REASONS.get(status, "")}',
+            f'Content-Type: {content_type}',
+            f'Content-Length: {len(data)}',
+            f'Connection: {"close" if close else "keep-alive"}',
+        ]
+        if status == 503:
+            head.append('Retry-After: 1')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+
+async def maintain_loop(batcher, maintain, interval):
+    """interval초마다 maintain()을 추론 스레드에서 실행 (배치와 배치 사이, 예: 모델 교체)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(batcher.executor, maintain)
+        except Exception as e:
+            log('error', f'서버 유지 작업 실패: {str(e)}')
+
+
+async def run_server(address, run_batch, load, max_batch=32, max_wait_ms=5.0, max_queue=1024, parallel=False,
+                     maintain=None, maintain_interval=1.0, control=None, residency=None):
+    """
+    서버 실행 (SIGTERM/SIGINT까지)
+    address: 'host:port' (TCP) 또는 'unix:/경로' (Unix 소켓)
+    maintain: maintain_interval초마다 추론 스레드에서 실행할 함수, control(command): /registry 요청 처리
+    residency(): /readyz 응답에 붙일 모델 상주 상태
+    """
+    batcher = Batcher(run_batch, max_batch, max_wait_ms / 1000, max_queue)
+    server = SpamServer(batcher, load, parallel, control, residency)
+
+    if address.startswith('unix:'):
+        path = address[len('unix:'):]
+        if os.path.exists(path):
+            os.unlink(path)
+        listener = await asyncio.start_unix_server(server.handle_connection, path=path)
+    else:
+        host, _, port = address.rpartition(':')
+        listener = await asyncio.start_server(server.handle_connection, host=host or '127.0.0.1', port=int(port))
+    log('info', '스팸 체크 서버 시작: {}', address, max_batch=max_batch, max_wait_ms=max_wait_ms, max_queue=max_queue)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    # 모델 로드 전에도 healthz/readyz에 응답할 수 있도록 리스너를 먼저 열고 로드
+    tasks = [asyncio.create_task(batcher.run()), asyncio.create_task(server.load_models())]
+    if maintain is not None:
+        tasks.append(asyncio.create_task(maintain_loop(batcher, maintain, maintain_interval)))
+    async with listener:
+        await stop.wait()
+    for task in tasks:
+        task.cancel()
+    batcher.executor.shutdown(wait=False, cancel_futures=True)
+    if address.startswith('unix:') and os.path.exists(address[len('unix:'):]):
+        os.unlink(address[len('unix:'):])
+    log('info', '스팸 체크 서버 종료')
+
+
+def serve_http(address, run_batch, load, **options):
+    """run_server 동기 진입점"""
+    asyncio.run(run_server(address, run_batch, load, **options))
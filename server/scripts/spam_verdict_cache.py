@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+스팸 판정 캐시 (SQLite, 여러 프로세스 공유)
+키: 모델 식별자(체크포인트 해시 + 추론 설정) + 필드 종류(title/describe) + 정규화된 텍스트
+같은 텍스트가 다시 들어오면 토크나이징/추론 없이 저장된 판정을 반환합니다.
+항목 수가 max_entries를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다 (LRU).
+조회는 읽기만 하고, 적중 항목의 사용 시각(last_used)과 적중/미적중 수는 메모리에 모았다가
+flush_entries개가 쌓이거나 flush_seconds가 지나면(또는 저장할 때) 한 번의 쓰기 트랜잭션으로 반영합니다.
+크기 제한 검사(COUNT)도 저장할 때마다 하지 않고 evict_every개를 저장할 때마다 합니다 (그 사이에는 최대 evict_every개까지 초과 가능).
+"""
+import re
+import time
+import sqlite3
+import threading
+import hashlib
+import unicodedata
+
+_WHITESPACE = re.compile(r'\s+')
+
+# last_used가 이보다 최근이면 다시 기록하지 않음 (LRU 순서에는 이 정도 정밀도로 충분)
+TOUCH_RESOLUTION = 60.0
+
+
+def normalize_for_cache(text):
+    """캐시 키용 텍스트 정규화 (NFKC, 연속 공백 하나로, 앞뒤 공백 제거)"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+def verdict_key(model_id, model_type, text):
+    """캐시 키 (SHA-256, 원문은 저장하지 않음)"""
+    raw = f'{model_id}\0{model_type}\0{normalize_for_cache(text)}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class VerdictCache:
+    """SQLite 기반 판정 캐시 (크기 제한 LRU, 적중/미적중 카운터)"""
+
+    def __init__(self, path, max_entries=100000, flush_entries=256, flush_seconds=30.0, evict_every=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_entries = flush_entries
+        self.flush_seconds = flush_seconds
+        self.evict_every = evict_every or max(1, min(1000, max_entries // 100))
+        # 이번 프로세스의 적중/미적중 수 (누적 값은 counters 테이블)
+        self.hits = 0
+        self.misses = 0
+        # 아직 DB에 반영하지 않은 사용 시각({키: 시각})과 적중/미적중 수
+        self.touched = {}
+        self.pending_hits = 0
+        self.pending_misses = 0
+        self.flushed = time.monotonic()
+        # 마지막 크기 제한 검사 이후 저장한 항목 수
+        self.unchecked = 0
+        # 연결 하나를 여러 스레드(병렬 모델 모드)가 함께 쓰므로 직렬화
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS verdicts ('
+            ' key TEXT PRIMARY KEY,'
+            ' verdict INTEGER NOT NULL,'
+            ' last_used REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts (last_used)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self.conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+
+    def get_many(self, model_id, model_type, texts):
+        """여러 텍스트의 저장된 판정 조회 (결과: {텍스트: 판정}, 없는 텍스트는 제외)"""
+        with self.lock:
+            return self._get_many(model_id, model_type, texts)
+
+    def _get_many(self, model_id, model_type, texts):
+        keys = {verdict_key(model_id, model_type, text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        now = time.time()
+        # SQLite 변수 개수 제한을 넘지 않도록 나누어 조회
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(f'SELECT key, verdict, last_used FROM verdicts WHERE key IN ({placeholders})', chunk).fetchall()
+            for key, verdict, last_used in rows:
+                found[keys[key]] = verdict
+                if now - last_used >= TOUCH_RESOLUTION:
+                    self.touched[key] = now
+
+        hits = len(found)
+        misses = len(texts) - hits
+        self.hits += hits
+        self.misses += misses
+        self.pending_hits += hits
+        self.pending_misses += misses
+
+        if len(self.touched) >= self.flush_entries or time.monotonic() - self.flushed >= self.flush_seconds:
+            with self.conn:
+                self.conn.execute('BEGIN')
+                self.write_pending()
+        return found
+
+    def get(self, model_id, model_type, text):
+        """텍스트 하나의 저장된 판정 (없으면 None)"""
+        return self.get_many(model_id, model_type, [text]).get(text)
+
+    def put_many(self, model_id, model_type, verdicts):
+        """판정 저장 (verdicts: {텍스트: 판정}) 후 크기 제한 초과분 삭제"""
+        if not verdicts:
+            return
+        now = time.time()
+        rows = [(verdict_key(model_id, model_type, text), int(verdict), now) for text, verdict in verdicts.items()]
+        with self.lock, self.conn:
+            self.conn.execute('BEGIN')
+            self.conn.executemany('INSERT OR REPLACE INTO verdicts (key, verdict, last_used) VALUES (?, ?, ?)', rows)
+            # 쓰기 트랜잭션을 연 김에 모아 둔 사용 시각도 반영
+            self.write_pending()
+            self.unchecked += len(rows)
+            if self.unchecked >= self.evict_every:
+                self.evict()
+
+    def put(self, model_id, model_type, text, verdict):
+        """텍스트 하나의 판정 저장"""
+        self.put_many(model_id, model_type, {text: verdict})
+
+    def write_pending(self):
+        """모아 둔 사용 시각과 적중/미적중 수를 반영 (호출자가 쓰기 트랜잭션 안에서)"""
+        if self.touched:
+            # 다른 프로세스가 더 최근 시각을 기록했으면 그대로 둠
+            self.conn.executemany('UPDATE verdicts SET last_used = MAX(last_used, ?) WHERE key = ?',
+                                  [(used, key) for key, used in self.touched.items()])
+            self.touched = {}
+        if self.pending_hits or self.pending_misses:
+            self.conn.execute("UPDATE counters SET value = value + ? WHERE name = 'hits'", (self.pending_hits,))
+            self.conn.execute("UPDATE counters SET value = value + ? WHERE name = 'misses'", (self.pending_misses,))
+            self.pending_hits = self.pending_misses = 0
+        self.flushed = time.monotonic()
+
+    def flush(self):
+        """모아 둔 사용 시각과 적중/미적중 수를 바로 반영 (통계 조회, 종료 전)"""
+        with self.lock:
+            if not self.touched and not self.pending_hits and not self.pending_misses:
+                return
+            with self.conn:
+                self.conn.execute('BEGIN')
+                self.write_pending()
+
+    def evict(self):
+        """max_entries를 넘는 만큼 가장 오래 사용하지 않은 항목 삭제 (호출자가 쓰기 트랜잭션 안에서)"""
+        self.unchecked = 0
+        count = self.conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                'DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY last_used LIMIT ?)',
+                (excess,),
+            )
+        return max(excess, 0)
+
+    def stats(self):
+        """항목 수와 적중/미적중 수 (이번 프로세스, 누적)"""
+        self.flush()
+        with self.lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+            totals = dict(self.conn.execute('SELECT name, value FROM counters').fetchall())
+        lookups = totals.get('hits', 0) + totals.get('misses', 0)
+        return {
+            'path': str(self.path),
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'total_hits': totals.get('hits', 0),
+            'total_misses': totals.get('misses', 0),
+            'hit_rate': totals.get('hits', 0) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,48 @@
+"""
+server/scripts 테스트 공통 설정
+스크립트는 패키지가 아니라 같은 디렉토리의 spam_*.py를 import하므로 scripts 디렉토리를 경로에 추가합니다.
+"""
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import json
+import subprocess
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def stand_in(tmp_path_factory):
+    """
+    spam_benchmark의 작은 랜덤 RoBERTa 대체 모델 (네트워크 없이 생성)
+    결과: 작업 디렉토리 (model/: 토크나이저/config 스냅샷, tmp/sport-contest-models/: title/describe 체크포인트)
+    """
+    from spam_benchmark import build_stand_in
+
+    workdir = tmp_path_factory.mktemp('stand-in')
+    build_stand_in(workdir)
+    return workdir
+
+
+@pytest.fixture
+def stand_in_checkpoint(stand_in, tmp_path):
+    """대체 title 체크포인트를 테스트마다 새 디렉토리에 복사 (변환 파일이 테스트 사이에 섞이지 않도록)
+    결과: (체크포인트 경로, config dict)"""
+    cache_path = tmp_path / 'spam_model_title.pth'
+    cache_path.write_bytes((stand_in / 'tmp' / 'sport-contest-models' / 'spam_model_title.pth').read_bytes())
+    config = json.loads((stand_in / 'model' / 'config.json').read_text())
+    return cache_path, config
+
+
+def run_script(stand_in, args, stdin, **env):
+    """대체 모델 환경에서 spam_check_single.py를 새 프로세스로 실행 (레지스트리/판정 캐시/다운로드 없음)"""
+    from spam_benchmark import worker_env
+
+    return subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / 'spam_check_single.py'), *args],
+        cwd=str(SCRIPTS_DIR), env=dict(worker_env(stand_in), SPAM_MODEL_REGISTRY=str(stand_in / 'no-registry.json'), **env),
+        input=stdin.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=300,
+    )
@@ -0,0 +1,31 @@
+"""serve 모드의 배치 판정({"items"})이 텍스트 하나씩 판정한 결과와 같은지 확인 (대체 모델, 새 프로세스)"""
+import json
+
+from conftest import run_script
+
+TEXTS = [
+    '2025 전국 생활체육 배드민턴 대회 참가자 모집 안내',
+    '바카라 카지노 당일지급 고수익 보장 텔레그램 문의',
+    '짧은 글',
+    '주말 풋살 리그 팀원 모집합니다. 매주 토요일 오전 10시, 장소는 잠실 보조경기장이며 초보도 환영합니다. ' * 3,
+    '배드민턴',
+    '동호회 정기 모임 공지: 이번 달은 둘째 주 일요일에 진행합니다',
+]
+
+
+def test_batch_matches_single(stand_in):
+    single = [
+        {'id': index, 'text': text, 'model_type': model_type}
+        for index, (model_type, text) in enumerate((model_type, text) for model_type in ('title', 'describe') for text in TEXTS)
+    ]
+    batched = [
+        {'id': 'title', 'items': TEXTS, 'model_type': 'title'},
+        {'id': 'describe', 'items': TEXTS, 'model_type': 'describe'},
+    ]
+    stdin = ''.join(json.dumps(request, ensure_ascii=False) + '\n' for request in single + batched)
+    completed = run_script(stand_in, ['--serve'], stdin)
+    assert completed.returncode == 0, completed.stderr.decode('utf-8', 'replace')[-2000:]
+    responses = {response['id']: response for response in map(json.loads, completed.stdout.decode('utf-8').splitlines()) if 'id' in response}
+    for model_type in ('title', 'describe'):
+        expected = [responses[request['id']]['result'] for request in single if request['model_type'] == model_type]
+        assert responses[model_type]['results'] == expected
@@ -0,0 +1,88 @@
+"""spam_checkpoint: meta 골격 생성이 스레드에 한정되고, 골격 + assign 로드가 일반 로드와 같은 결과를 내는지, 변환 파일 저장이 동시 실행/실패에 안전한지 확인"""
+import threading
+
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification
+
+from spam_checkpoint import (
+    empty_model, empty_parameters, load_mmap_checkpoint, mmap_checkpoint_path, model_from_checkpoint, save_mmap_checkpoint,
+)
+
+INPUT_IDS = torch.tensor([[0, 10, 11, 12, 13, 2], [0, 20, 21, 2, 1, 1]])
+ATTENTION_MASK = (INPUT_IDS != 1).long()
+
+
+def test_empty_parameters_is_scoped():
+    with empty_parameters():
+        inside = torch.nn.Linear(4, 4)
+        buffer = torch.arange(4)
+    assert inside.weight.is_meta and inside.bias.is_meta
+    assert not buffer.is_meta
+    assert not torch.nn.Linear(4, 4).weight.is_meta
+
+
+def test_empty_parameters_does_not_leak_to_other_threads():
+    started, built, other = threading.Event(), threading.Event(), {}
+
+    def build():
+        started.wait()
+        other['linear'] = torch.nn.Linear(4, 4)
+        built.set()
+
+    thread = threading.Thread(target=build)
+    thread.start()
+    with empty_parameters():
+        started.set()
+        built.wait(timeout=10)
+        own = torch.nn.Linear(4, 4)
+    thread.join()
+    assert own.weight.is_meta
+    assert not other['linear'].weight.is_meta
+
+
+def test_skeleton_matches_regular_load(stand_in_checkpoint):
+    cache_path, config = stand_in_checkpoint
+    state_dict = torch.load(cache_path, map_location='cpu', weights_only=True)
+
+    skeleton = empty_model(config)
+    assert all(param.is_meta for param in skeleton.parameters())
+    assert not any(buffer.is_meta for buffer in skeleton.buffers())
+
+    reference = AutoModelForSequenceClassification.from_config(AutoConfig.for_model(**config))
+    reference.load_state_dict(state_dict)
+    loaded = model_from_checkpoint(state_dict, config)
+    with torch.no_grad():
+        expected = reference.eval()(input_ids=INPUT_IDS, attention_mask=ATTENTION_MASK).logits
+        actual = loaded.eval()(input_ids=INPUT_IDS, attention_mask=ATTENTION_MASK).logits
+    assert torch.equal(actual, expected)
+
+
+def test_concurrent_saves_leave_a_complete_file(stand_in_checkpoint):
+    cache_path, config = stand_in_checkpoint
+    state_dict = torch.load(cache_path, map_location='cpu', weights_only=True)
+    threads = [threading.Thread(target=save_mmap_checkpoint, args=(state_dict, cache_path, config)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    loaded, loaded_config = load_mmap_checkpoint(cache_path)
+    assert loaded_config == config
+    assert all(torch.equal(loaded[key], value) for key, value in state_dict.items())
+    assert sorted(path.name for path in cache_path.parent.iterdir()) == sorted([
+        cache_path.name, cache_path.name + '.sha256', mmap_checkpoint_path(cache_path).name,
+    ])
+
+
+def test_failed_save_removes_temporary_file(stand_in_checkpoint, monkeypatch):
+    cache_path, config = stand_in_checkpoint
+    state_dict = torch.load(cache_path, map_location='cpu', weights_only=True)
+
+    def broken_save(obj, path):
+        path.write_bytes(b'partial')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(torch, 'save', broken_save)
+    assert save_mmap_checkpoint(state_dict, cache_path, config) is not None
+    assert not mmap_checkpoint_path(cache_path).exists()
+    assert not list(cache_path.parent.glob('*.tmp'))
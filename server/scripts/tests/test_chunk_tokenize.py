@@ -0,0 +1,37 @@
+"""조각 판정을 켠 단건 판정(predict_logits): 한 조각에 들어가는 텍스트는 한 번만 토큰화하고 결과는 조각 판정을 끈 경우와 같음"""
+import sys
+import json
+import subprocess
+
+from conftest import SCRIPTS_DIR
+from spam_benchmark import worker_env
+
+# 대체 모델 환경에서 실행 (모듈 전역 설정이 import 시점의 환경 변수를 읽으므로 새 프로세스)
+SCRIPT = r'''
+import json
+import spam_check_single as single
+from spam_check_single import logits_to_numpy, predict_logits
+
+text = single.normalize_text('2025 전국 생활체육 배드민턴 대회 참가자 모집 안내')
+tokenizer = single.load_tokenizer()
+calls = []
+original = type(tokenizer).__call__
+type(tokenizer).__call__ = lambda self, *args, **kwargs: calls.append(1) or original(self, *args, **kwargs)
+chunked = logits_to_numpy(predict_logits(text, 'describe')).tolist()
+tokenize_calls = len(calls)
+single.DESCRIBE_CHUNKS = False
+plain = logits_to_numpy(predict_logits(text, 'describe')).tolist()
+print(json.dumps({'tokenize_calls': tokenize_calls, 'chunked': chunked, 'plain': plain}))
+'''
+
+
+def test_short_text_is_tokenized_once(stand_in):
+    env = dict(worker_env(stand_in), SPAM_MODEL_REGISTRY=str(stand_in / 'no-registry.json'),
+               SPAM_DESCRIBE_CHUNKS='1', SPAM_CHUNK_SIZE='64', SPAM_PADDING='max_length', SPAM_DESCRIBE_MAX_LEN='128')
+    completed = subprocess.run([sys.executable, '-c', SCRIPT], cwd=str(SCRIPTS_DIR), env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=300)
+    assert completed.returncode == 0, completed.stderr.decode('utf-8', 'replace')[-2000:]
+    result = json.loads(completed.stdout.decode('utf-8').strip().splitlines()[-1])
+    assert result['tokenize_calls'] == 1
+    for chunked, plain in zip(result['chunked'][0], result['plain'][0]):
+        assert abs(chunked - plain) < 1e-5
@@ -0,0 +1,58 @@
+"""spam_chunks: 슬라이딩 윈도우 분할 (크기/겹침/조각 수 상한)과 설정 검증"""
+import numpy as np
+import pytest
+
+from spam_chunks import spam_probabilities, split_chunks, token_limit, validate_chunking
+
+CLS, SEP = 0, 2
+
+
+def encoded(length):
+    """[CLS] 내용 length개 [SEP]"""
+    return [CLS] + list(range(100, 100 + length)) + [SEP]
+
+
+def test_short_text_is_one_chunk():
+    assert split_chunks(encoded(5), size=16, stride=8, max_chunks=4) == [encoded(5)]
+
+
+@pytest.mark.parametrize('length', [14, 15, 30, 37, 100])
+def test_chunks_cover_content_with_overlap(length):
+    size, stride = 16, 10
+    chunks = split_chunks(encoded(length), size, stride, max_chunks=100)
+    content = encoded(length)[1:-1]
+    for index, chunk in enumerate(chunks):
+        assert len(chunk) <= size
+        assert chunk[0] == CLS and chunk[-1] == SEP
+        assert chunk[1:-1] == content[index * stride:index * stride + size - 2]
+    # 마지막 조각이 내용 끝에 닿고, 그 전 조각들은 닿지 않음
+    assert chunks[-1][-2] == content[-1]
+    assert all(chunk[-2] != content[-1] for chunk in chunks[:-1])
+
+
+def test_max_chunks_limits_covered_tokens():
+    size, stride, max_chunks = 16, 12, 3
+    chunks = split_chunks(encoded(1000), size, stride, max_chunks)
+    assert len(chunks) == max_chunks
+    covered = {token for chunk in chunks for token in chunk[1:-1]}
+    assert len(covered) + 2 == token_limit(size, stride, max_chunks)
+
+
+@pytest.mark.parametrize('size, stride, max_chunks, per_pass, threshold', [
+    (4, 2, 4, 1, 0.9),
+    (16, 0, 4, 1, 0.9),
+    (16, 15, 4, 1, 0.9),
+    (16, 8, 0, 1, 0.9),
+    (16, 8, 4, 0, 0.9),
+    (16, 8, 4, 1, 0.4),
+])
+def test_invalid_chunking(size, stride, max_chunks, per_pass, threshold):
+    with pytest.raises(ValueError):
+        validate_chunking(size, stride, max_chunks, per_pass, threshold)
+
+
+def test_spam_probabilities():
+    proba = spam_probabilities(np.array([[0.0, 0.0], [0.0, 1000.0], [5.0, -5.0]]))
+    assert proba[0] == pytest.approx(0.5)
+    assert proba[1] == pytest.approx(1.0)
+    assert proba[2] < 1e-4
@@ -0,0 +1,42 @@
+"""spam_compile: 대체 모델 trace 저장/로드 (임시 파일 정리, 실패 시 부분 파일 없음)"""
+import pytest
+import torch
+
+from spam_checkpoint import model_from_checkpoint
+from spam_compile import load_traced_classifier, trace_classifier, traced_model_path
+
+INPUT_IDS = torch.tensor([[0, 10, 11, 12, 13, 2], [0, 20, 21, 2, 1, 1]])
+ATTENTION_MASK = (INPUT_IDS != 1).long()
+
+
+def fp32_model(cache_path, config):
+    state_dict = torch.load(cache_path, map_location='cpu', weights_only=True)
+    return model_from_checkpoint(state_dict, config).eval()
+
+
+def test_trace_roundtrip(stand_in_checkpoint):
+    cache_path, config = stand_in_checkpoint
+    model = fp32_model(cache_path, config)
+    traced = trace_classifier(model, cache_path, 'fp32', max_len=64)
+    assert traced.path == traced_model_path(cache_path, 'fp32') and traced.path.exists()
+    assert not list(cache_path.parent.glob('*.tmp'))
+
+    loaded = load_traced_classifier(cache_path, 'fp32', max_len=64)
+    with torch.no_grad():
+        expected = model(input_ids=INPUT_IDS, attention_mask=ATTENTION_MASK).logits
+    assert torch.allclose(loaded(INPUT_IDS, ATTENTION_MASK), expected, atol=1e-4)
+
+
+def test_failed_save_removes_temporary_file(stand_in_checkpoint, monkeypatch):
+    cache_path, config = stand_in_checkpoint
+
+    def broken_save(module, path, **kwargs):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(torch.jit, 'save', broken_save)
+    with pytest.raises(OSError):
+        trace_classifier(fp32_model(cache_path, config), cache_path, 'fp32', max_len=64)
+    assert not traced_model_path(cache_path, 'fp32').exists()
+    assert not list(cache_path.parent.glob('*.tmp'))
@@ -0,0 +1,159 @@
+"""spam_download: 로컬 Range 지원 HTTP 서버로 이어받기/416/원격 파일 변경 처리 확인"""
+import json
+import hashlib
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import spam_download
+from spam_download import download_file
+
+
+class RangeServer:
+    """바이트 내용 하나를 Range/If-Range와 강한 ETag로 제공하는 테스트 서버"""
+
+    def __init__(self, content):
+        self.set_content(content)
+        self.requests = []
+        # 앞의 요청부터 차례로 이 상태 코드로 실패 응답
+        self.failures = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if server.failures:
+                    self.send_error(server.failures.pop(0))
+                    return
+                content, etag = server.content, server.etag
+                range_header = self.headers.get('Range')
+                if_range = self.headers.get('If-Range')
+                if range_header and (if_range is None or if_range == etag):
+                    start = int(range_header.split('=')[1].rstrip('-'))
+                    if start >= len(content):
+                        self.send_response(416)
+                        self.send_header('Content-Range', f'bytes */{len(content)}')
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    body = content[start:]
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{len(content) - 1}/{len(content)}')
+                else:
+                    body = content
+                    self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/model.pth'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def set_content(self, content):
+        self.content = content
+        self.etag = '"' + hashlib.md5(content).hexdigest() + '"'
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = RangeServer(bytes(range(256)) * 1000)
+    yield server
+    server.close()
+
+
+def write_part(dest, data, etag):
+    part = dest.with_name(dest.name + '.part')
+    part.write_bytes(data)
+    part.with_name(part.name + '.json').write_text(json.dumps({'etag': etag, 'last_modified': None}))
+    return part
+
+
+def test_fresh_download(server, tmp_path):
+    dest = tmp_path / 'model.pth'
+    download_file(server.url, dest, 'Test')
+    assert dest.read_bytes() == server.content
+    assert not dest.with_name('model.pth.part').exists()
+    assert not dest.with_name('model.pth.part.json').exists()
+
+
+def test_resume_from_partial(server, tmp_path):
+    dest = tmp_path / 'model.pth'
+    write_part(dest, server.content[:1000], server.etag)
+    download_file(server.url, dest, 'Test')
+    assert dest.read_bytes() == server.content
+    assert server.requests[0]['Range'] == 'bytes=1000-'
+    assert server.requests[0]['If-Range'] == server.etag
+
+
+def test_complete_part_is_finalized_after_416(server, tmp_path):
+    dest = tmp_path / 'model.pth'
+    write_part(dest, server.content, server.etag)
+    download_file(server.url, dest, 'Test')
+    assert dest.read_bytes() == server.content
+    assert len(server.requests) == 1
+
+
+def test_oversized_part_restarts(server, tmp_path):
+    dest = tmp_path / 'model.pth'
+    write_part(dest, server.content + b'extra', server.etag)
+    download_file(server.url, dest, 'Test')
+    assert dest.read_bytes() == server.content
+    assert 'Range' not in server.requests[-1]
+
+
+def test_changed_remote_file_is_not_stitched(server, tmp_path):
+    dest = tmp_path / 'model.pth'
+    old_etag = server.etag
+    write_part(dest, server.content[:1000], old_etag)
+    server.set_content(b'new checkpoint ' * 5000)
+    download_file(server.url, dest, 'Test')
+    assert dest.read_bytes() == server.content
+
+
+def test_part_without_validator_restarts(server, tmp_path):
+    dest = tmp_path / 'model.pth'
+    dest.with_name('model.pth.part').write_bytes(b'unknown origin')
+    download_file(server.url, dest, 'Test')
+    assert dest.read_bytes() == server.content
+    assert 'Range' not in server.requests[0]
+
+
+def test_checksum_mismatch_discards_part(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(spam_download.time, 'sleep', lambda seconds: None)
+    dest = tmp_path / 'model.pth'
+    with pytest.raises(IOError):
+        download_file(server.url, dest, 'Test', expected_sha256='0' * 64)
+    assert not dest.exists()
+    assert not dest.with_name('model.pth.part').exists()
+
+
+@pytest.mark.parametrize('status', [401, 403, 404])
+def test_client_error_is_not_retried(server, tmp_path, monkeypatch, status):
+    sleeps = []
+    monkeypatch.setattr(spam_download.time, 'sleep', sleeps.append)
+    server.failures = [status]
+    with pytest.raises(urllib.error.HTTPError):
+        download_file(server.url, tmp_path / 'model.pth', 'Test')
+    assert len(server.requests) == 1
+    assert sleeps == []
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_server_error_is_retried(server, tmp_path, monkeypatch, status):
+    monkeypatch.setattr(spam_download.time, 'sleep', lambda seconds: None)
+    server.failures = [status, status]
+    dest = tmp_path / 'model.pth'
+    download_file(server.url, dest, 'Test')
+    assert dest.read_bytes() == server.content
+    assert len(server.requests) == 3
@@ -0,0 +1,71 @@
+"""spam_fingerprint: 조금 고친 스팸 적중, 무관한 글/다른 scope/짧은 글 제외, 크기/나이 제한 정리"""
+import time
+
+import pytest
+
+from spam_fingerprint import FingerprintIndex, band_layout
+
+SPAM = '바카라 카지노 당일지급 고수익 보장, 텔레그램 아이디 vip777 로 문의 주세요. 가입코드 입력 시 첫충 30% 추가 지급!'
+EDITED = '바카라 카지노 당일지급 고수익 보장,  텔레그램 아이디 vip777 로 문의 주세요. 가입코드 입력 시 첫충 40% 추가 지급!!'
+UNRELATED = '2025 서울시 생활체육 배드민턴 대회 참가자 모집 안내입니다. 복식 경기로 진행되며 참가비는 팀당 2만원입니다.'
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FingerprintIndex(tmp_path / 'fingerprints.sqlite3', threshold=0.8)
+    yield index
+    index.close()
+
+
+def test_band_layout_recall():
+    bands, rows = band_layout(64, 0.8)
+    assert bands * rows <= 64
+    assert 1 - (1 - 0.8 ** rows) ** bands >= 0.95
+
+
+def test_near_duplicate_matches(index):
+    assert index.add_many('model:title', [SPAM]) == 1
+    found = index.match_many('model:title', [EDITED, UNRELATED])
+    assert list(found) == [EDITED]
+    assert found[EDITED] >= 0.8
+    assert index.stats()['hits'] == 1 and index.stats()['misses'] == 1
+
+
+def test_scope_and_min_length(index):
+    index.add_many('model:title', [SPAM])
+    assert index.match_many('model:describe', [SPAM]) == {}
+    assert index.match_many('other-model:title', [SPAM]) == {}
+    assert index.add_many('model:title', ['짧은 글']) == 0
+    assert index.match_many('model:title', ['짧은 글']) == {}
+
+
+def test_evict_by_size_and_age(tmp_path):
+    index = FingerprintIndex(tmp_path / 'fingerprints.sqlite3', max_entries=2, max_age=3600)
+    texts = [f'{SPAM} 캠페인 {number}번째 변형 {number * 7919}' for number in range(4)]
+    for text in texts:
+        index.add_many('scope', [text])
+    index.conn.execute('UPDATE entries SET last_seen = ? WHERE id = 1', (time.time() - 7200,))
+    assert index.evict() == 2
+    assert index.stats()['entries'] == 2
+    # 가장 오래된(나이 초과) 항목과 그다음 오래된 항목이 지워지고 최근 두 개가 남음
+    remaining = {row[0] for row in index.conn.execute('SELECT id FROM entries')}
+    assert remaining == {3, 4}
+    assert index.conn.execute('SELECT COUNT(*) FROM bands WHERE entry_id NOT IN (3, 4)').fetchone()[0] == 0
+    index.close()
+
+
+def test_threshold_change_rebuilds_bands(tmp_path):
+    path = tmp_path / 'fingerprints.sqlite3'
+    index = FingerprintIndex(path, threshold=0.8)
+    index.add_many('scope', [SPAM])
+    index.close()
+
+    reopened = FingerprintIndex(path, threshold=0.5)
+    assert reopened.stats()['entries'] == 1
+    assert EDITED in reopened.match_many('scope', [EDITED])
+    reopened.close()
+
+    # 서명 설정이 바뀌면 비교할 수 없으므로 비움
+    changed = FingerprintIndex(path, threshold=0.5, num_perm=32)
+    assert changed.stats()['entries'] == 0
+    changed.close()
@@ -0,0 +1,47 @@
+"""spam_onnx: 대체 모델 내보내기 (fp32/int8 파일 생성, 임시 파일 정리, 실패 시 부분 파일 없음)"""
+import numpy as np
+import pytest
+import torch
+
+from spam_checkpoint import model_from_checkpoint
+from spam_onnx import export_onnx, load_onnx_classifier, onnx_model_path
+
+pytest.importorskip('onnxruntime')
+pytest.importorskip('onnx')
+
+INPUT_IDS = np.array([[0, 10, 11, 12, 13, 2], [0, 20, 21, 2, 1, 1]])
+ATTENTION_MASK = (INPUT_IDS != 1).astype(np.int64)
+
+
+def fp32_model(cache_path, config):
+    state_dict = torch.load(cache_path, map_location='cpu', weights_only=True)
+    return model_from_checkpoint(state_dict, config).eval()
+
+
+def test_export_fp32_and_int8(stand_in_checkpoint):
+    cache_path, config = stand_in_checkpoint
+    model = fp32_model(cache_path, config)
+    assert export_onnx(model, cache_path, 'int8') == onnx_model_path(cache_path, 'int8')
+    assert onnx_model_path(cache_path, 'fp32').exists()
+    assert not list(cache_path.parent.glob('*.tmp'))
+
+    with torch.no_grad():
+        expected = model(input_ids=torch.tensor(INPUT_IDS), attention_mask=torch.tensor(ATTENTION_MASK)).logits.numpy()
+    classifier = load_onnx_classifier(cache_path, 'fp32')
+    np.testing.assert_allclose(classifier(INPUT_IDS, ATTENTION_MASK), expected, atol=1e-4)
+    assert load_onnx_classifier(cache_path, 'int8')(INPUT_IDS, ATTENTION_MASK).shape == expected.shape
+
+
+def test_failed_export_removes_temporary_file(stand_in_checkpoint, monkeypatch):
+    cache_path, config = stand_in_checkpoint
+
+    def broken_export(model, args, path, **kwargs):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+        raise RuntimeError('export failed')
+
+    monkeypatch.setattr(torch.onnx, 'export', broken_export)
+    with pytest.raises(RuntimeError):
+        export_onnx(fp32_model(cache_path, config), cache_path, 'fp32')
+    assert not onnx_model_path(cache_path, 'fp32').exists()
+    assert not list(cache_path.parent.glob('*.tmp'))
@@ -0,0 +1,26 @@
+"""대체 모델로 필드별 최대 길이 + longest 패딩과 기존 방식(512 max_length 패딩)의 logits가 같은지 확인 (새 프로세스, 네트워크 없음)"""
+import json
+
+import pytest
+
+from conftest import run_script
+
+TEXTS = [
+    '2025 전국 생활체육 배드민턴 대회 참가자 모집 안내',
+    '바카라 카지노 당일지급 고수익 보장 텔레그램 문의',
+    '짧은 글',
+    '주말 풋살 리그 팀원 모집합니다. 매주 토요일 오전 10시, 장소는 잠실 보조경기장이며 초보도 환영합니다. ' * 3,
+]
+
+
+@pytest.mark.parametrize('padding, max_len', [('longest', '512'), ('longest', '128'), ('max_length', '64')])
+def test_padding_matches_reference(stand_in, padding, max_len):
+    stdin = ''.join(json.dumps({'title': text, 'description': text}, ensure_ascii=False) + '\n' for text in TEXTS)
+    completed = run_script(stand_in, ['--parity-check'], stdin,
+                           SPAM_PADDING=padding, SPAM_TITLE_MAX_LEN=max_len, SPAM_DESCRIBE_MAX_LEN='512')
+    assert completed.returncode == 0, completed.stderr.decode('utf-8', 'replace')[-2000:]
+    report = json.loads(completed.stdout.decode('utf-8').strip().splitlines()[-1])['report']
+    for model_type in ('title', 'describe'):
+        assert report[model_type]['total'] == len(TEXTS)
+        assert report[model_type]['agree'] == len(TEXTS)
+        assert report[model_type]['max_logit_diff'] < 1e-4
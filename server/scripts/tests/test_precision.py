@@ -0,0 +1,82 @@
+"""spam_precision: 변환 모델을 state_dict로 저장/로드, 저장 실패 시 임시 파일 정리, 동시 변환"""
+import threading
+
+import pytest
+import torch
+
+import spam_precision
+from spam_checkpoint import model_from_checkpoint
+from spam_precision import convert_and_cache_model, converted_model_path, load_converted_model
+
+INPUT_IDS = torch.tensor([[0, 10, 11, 12, 13, 2], [0, 20, 21, 2, 1, 1]])
+ATTENTION_MASK = (INPUT_IDS != 1).long()
+
+
+def fp32_model(cache_path, config):
+    state_dict = torch.load(cache_path, map_location='cpu', weights_only=True)
+    return model_from_checkpoint(state_dict, config).eval()
+
+
+def logits(model):
+    with torch.no_grad():
+        return model(input_ids=INPUT_IDS, attention_mask=ATTENTION_MASK).logits.float()
+
+
+@pytest.mark.parametrize('precision', ['int8', 'bf16'])
+def test_converted_model_roundtrip(stand_in_checkpoint, precision):
+    cache_path, config = stand_in_checkpoint
+    converted = convert_and_cache_model(fp32_model(cache_path, config), cache_path, precision)
+
+    # 모듈 pickle 없이 텐서만 저장되므로 weights_only로 읽힘
+    saved = torch.load(converted_model_path(cache_path, precision), weights_only=True)
+    assert 'model' not in saved and 'state_dict' in saved
+
+    loaded = load_converted_model(cache_path, precision)
+    assert loaded is not None
+    assert torch.equal(logits(loaded), logits(converted))
+
+
+def test_changed_source_needs_reconversion(stand_in_checkpoint):
+    cache_path, config = stand_in_checkpoint
+    convert_and_cache_model(fp32_model(cache_path, config), cache_path, 'int8')
+    cache_path.write_bytes(cache_path.read_bytes() + b'\0')
+    assert load_converted_model(cache_path, 'int8') is None
+
+
+def test_failed_save_removes_temporary_file(stand_in_checkpoint, monkeypatch):
+    cache_path, config = stand_in_checkpoint
+    model = fp32_model(cache_path, config)
+
+    def broken_save(obj, path):
+        path.write_bytes(b'partial')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(torch, 'save', broken_save)
+    converted = convert_and_cache_model(model, cache_path, 'int8')
+    assert converted is not None
+    converted_path = converted_model_path(cache_path, 'int8')
+    assert not converted_path.exists()
+    assert not list(cache_path.parent.glob('*.tmp'))
+
+
+def test_concurrent_conversions_keep_own_temporary_files(stand_in_checkpoint):
+    cache_path, config = stand_in_checkpoint
+    models = [fp32_model(cache_path, config) for _ in range(3)]
+    threads = [threading.Thread(target=convert_and_cache_model, args=(model, cache_path, 'int8')) for model in models]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    loaded = load_converted_model(cache_path, 'int8')
+    assert loaded is not None
+    assert torch.equal(logits(loaded), logits(spam_precision.convert_model(fp32_model(cache_path, config), 'int8').eval()))
+    assert not list(cache_path.parent.glob('*.tmp'))
+
+
+def test_legacy_pickled_file_is_reconverted(stand_in_checkpoint):
+    cache_path, config = stand_in_checkpoint
+    model = spam_precision.convert_model(fp32_model(cache_path, config), 'int8')
+    torch.save({'source_hash': 'x', 'torch_version': torch.__version__, 'model': model},
+               converted_model_path(cache_path, 'int8'))
+    assert load_converted_model(cache_path, 'int8') is None
@@ -0,0 +1,65 @@
+"""spam_prefilter: 학습한 로지스틱 회귀가 명확한 스팸/정상을 가르고, 저장/로드 후 같은 확률을 내는지 확인"""
+import numpy as np
+import pytest
+
+from spam_prefilter import Prefilter, cascade_report, normalize_for_prefilter, rule_features, train_prefilter, DEFAULT_KEYWORDS
+
+NORMAL = [
+    f'{year} {region} 생활체육 {sport} 대회 참가자 모집 안내'
+    for year in (2023, 2024, 2025)
+    for region in ('서울', '부산', '대구', '광주')
+    for sport in ('배드민턴', '탁구', '테니스', '축구', '농구')
+]
+SPAM = [
+    f'{word} 당일지급 고수익 보장 텔레그램 @{handle} 문의 {phone}'
+    for word in ('카지노', '바카라', '토토', '슬롯', '대출')
+    for handle in ('win77', 'vip_88', 'bet365', 'money')
+    for phone in ('010-1234-5678', 'www.bet-win.xyz', '1588 1234 5678')
+]
+
+
+@pytest.fixture(scope='module')
+def prefilter():
+    texts = NORMAL + SPAM
+    labels = [0] * len(NORMAL) + [1] * len(SPAM)
+    return train_prefilter(texts, labels, epochs=20, batch_size=16)
+
+
+def test_rule_features():
+    text = normalize_for_prefilter('카지노  문의 010-1234-5678 www.win.xyz 텔레그램: @vip')
+    features = dict(zip(('url', 'url_count', 'phone', 'messenger_id', 'keyword'), rule_features(text, DEFAULT_KEYWORDS)))
+    assert features['url'] == 1.0 and features['phone'] == 1.0 and features['messenger_id'] == 1.0 and features['keyword'] == 1.0
+    assert rule_features('배드민턴 대회', DEFAULT_KEYWORDS)[:6] == [0.0] * 6
+
+
+def test_trained_prefilter_separates(prefilter):
+    normal = prefilter.predict_proba(['2025 인천 생활체육 배구 대회 참가자 모집 안내'])[0]
+    spam = prefilter.predict_proba(['바카라 고수익 당일지급 텔레그램 @lucky 문의 010-9876-5432'])[0]
+    assert normal < 0.2 < 0.8 < spam
+    assert prefilter.decide([NORMAL[0], SPAM[0]], low=0.2, high=0.8) == [0, 1]
+    # 애매한 구간은 트랜스포머로 넘김
+    assert prefilter.decide([NORMAL[0], SPAM[0]], low=0.0, high=1.0) == [None, None]
+
+
+def test_empty_input(prefilter):
+    assert len(prefilter.predict_proba([])) == 0
+    assert prefilter.decide([], 0.05, 0.95) == []
+
+
+def test_save_load_roundtrip(prefilter, tmp_path):
+    path = tmp_path / 'prefilter_title.npz'
+    prefilter.save(path)
+    loaded = Prefilter.load(path)
+    assert loaded.keywords == prefilter.keywords and loaded.ngram_range == prefilter.ngram_range
+    texts = NORMAL[:3] + SPAM[:3]
+    np.testing.assert_allclose(loaded.predict_proba(texts), prefilter.predict_proba(texts))
+    assert not path.with_name(path.name + '.tmp.npz').exists()
+
+
+def test_cascade_report():
+    report = cascade_report(proba=[0.01, 0.5, 0.99, 0.02], full_verdicts=[0, 1, 1, 1], low=0.05, high=0.95, labels=[0, 1, 1, 1])
+    assert report['offloaded'] == 3
+    assert report['settled_normal'] == 2 and report['settled_spam'] == 1
+    assert report['false_normal'] == 1 and report['disagreements'] == 1
+    assert report['full_accuracy'] == 1.0
+    assert report['cascade_accuracy'] == 0.75
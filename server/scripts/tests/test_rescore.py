@@ -0,0 +1,160 @@
+"""spam_rescore: 중단 후 체크포인트에서 이어서 처리해도 한 번에 처리한 결과와 같은지, 다른 입력으로는 이어서 처리하지 않는지 확인"""
+import io
+import json
+from concurrent.futures import Future
+
+import pytest
+
+import spam_rescore
+from spam_rescore import rescore
+
+
+class FakeServe:
+    """제목에 '스팸'이 있으면 1로 판정하는 serve 프로세스 (interrupt_after번째 요청에서 중단을 흉내 냄)"""
+
+    calls = 0
+    interrupt_after = None
+    # 앞의 요청부터 차례로 실패시킬 방식 ('exited': 프로세스 종료, 'worker': 워커 풀의 워커 종료 응답)
+    failures = []
+
+    def __init__(self, workers):
+        self.workers = workers
+
+    def submit(self, events):
+        FakeServe.calls += 1
+        if FakeServe.interrupt_after is not None and FakeServe.calls > FakeServe.interrupt_after:
+            raise KeyboardInterrupt
+        future = Future()
+        failure = FakeServe.failures.pop(0) if FakeServe.failures else None
+        if failure == 'exited':
+            future.set_exception(spam_rescore.WorkerExited('재판정 워커가 종료되었습니다'))
+        elif failure == 'worker':
+            future.set_result({'error': '스팸 체크 워커가 종료되었습니다', 'worker_exited': True})
+        else:
+            future.set_result({'results': [int('스팸' in event['title']) for event in events]})
+        return future
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def fake_serve(monkeypatch):
+    monkeypatch.setattr(spam_rescore, 'ServeProcess', FakeServe)
+    FakeServe.calls = 0
+    FakeServe.interrupt_after = None
+    FakeServe.failures = []
+    return FakeServe
+
+
+def write_events(path, count):
+    lines = []
+    for number in range(count):
+        if number == 7:
+            lines.append('not json')
+            continue
+        title = f'스팸 홍보 {number}' if number % 3 == 0 else f'배드민턴 대회 {number}'
+        lines.append(json.dumps({'id': f'event-{number}', 'title': title, 'description': ''}, ensure_ascii=False))
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+@pytest.mark.parametrize('suffix', ['jsonl', 'csv'])
+def test_resume_matches_single_run(tmp_path, fake_serve, suffix):
+    events = tmp_path / 'events.jsonl'
+    write_events(events, 50)
+    expected_path = str(tmp_path / f'expected.{suffix}')
+    rescore(str(events), expected_path, processes=1, batch_size=4, restart=True)
+
+    output_path = str(tmp_path / f'verdicts.{suffix}')
+    fake_serve.calls = 0
+    fake_serve.interrupt_after = 5
+    with pytest.raises(KeyboardInterrupt):
+        rescore(str(events), output_path, processes=1, batch_size=4, restart=False)
+    checkpoint = json.loads((tmp_path / f'verdicts.{suffix}.checkpoint.json').read_text())
+    assert 0 < checkpoint['done'] < 50 and not checkpoint['completed']
+    # 체크포인트 이후에 쓰다 만 부분은 이어서 처리할 때 잘라냄
+    with open(output_path, 'ab') as output:
+        output.write(b'{"id": "partial')
+
+    fake_serve.interrupt_after = None
+    summary = rescore(str(events), output_path, processes=1, batch_size=4, restart=False)
+    assert summary['resumed'] and summary['completed']
+    assert summary['items'] == 50 - checkpoint['done']
+    assert summary['done'] == 50 and summary['errors'] == 1 and summary['spam'] == 17
+    with open(expected_path, 'rb') as expected, open(output_path, 'rb') as actual:
+        assert actual.read() == expected.read()
+
+    # 완료된 재판정은 다시 실행해도 아무것도 하지 않음
+    assert rescore(str(events), output_path, processes=1, batch_size=4, restart=False)['items'] == 0
+
+
+def test_changed_input_needs_restart(tmp_path, fake_serve):
+    events = tmp_path / 'events.jsonl'
+    write_events(events, 10)
+    output_path = str(tmp_path / 'verdicts.jsonl')
+    rescore(str(events), output_path, processes=1, batch_size=4, restart=True)
+    write_events(events, 12)
+    with pytest.raises(RuntimeError):
+        rescore(str(events), output_path, processes=1, batch_size=4, restart=False)
+    assert rescore(str(events), output_path, processes=1, batch_size=4, restart=True)['done'] == 12
+
+
+def test_changed_stdin_is_not_resumed(tmp_path, fake_serve, monkeypatch):
+    events = tmp_path / 'events.jsonl'
+    write_events(events, 20)
+    output_path = str(tmp_path / 'verdicts.jsonl')
+
+    def stdin(path):
+        monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(path.read_bytes())))
+
+    stdin(events)
+    fake_serve.interrupt_after = 2
+    with pytest.raises(KeyboardInterrupt):
+        rescore('-', output_path, processes=1, batch_size=4, restart=False)
+
+    # 앞부분이 다른 stream으로는 이어서 처리하지 않음
+    changed = tmp_path / 'changed.jsonl'
+    write_events(changed, 20)
+    changed.write_text(changed.read_text(encoding='utf-8').replace('배드민턴 대회 1', '탁구 대회 1', 1), encoding='utf-8')
+    stdin(changed)
+    fake_serve.interrupt_after = None
+    with pytest.raises(RuntimeError):
+        rescore('-', output_path, processes=1, batch_size=4, restart=False)
+
+    # 체크포인트보다 짧은 stream도 거절
+    short = tmp_path / 'short.jsonl'
+    write_events(short, 3)
+    stdin(short)
+    with pytest.raises(RuntimeError):
+        rescore('-', output_path, processes=1, batch_size=4, restart=False)
+
+    # 같은 stream이면 이어서 처리
+    stdin(events)
+    summary = rescore('-', output_path, processes=1, batch_size=4, restart=False)
+    assert summary['resumed'] and summary['done'] == 20
+
+
+def test_batch_is_retried_after_worker_exit(tmp_path, fake_serve):
+    events = tmp_path / 'events.jsonl'
+    write_events(events, 12)
+    fake_serve.failures = ['exited', None, 'worker']
+    summary = rescore(str(events), str(tmp_path / 'verdicts.jsonl'), processes=2, batch_size=4, restart=True)
+    assert summary['done'] == 12 and summary['scored'] == 11
+    assert fake_serve.calls == 5
+
+
+def test_real_workers_with_stand_in(stand_in, tmp_path, monkeypatch):
+    """실제 --serve 워커 풀(대체 모델, 워커 2개)로 처음부터 끝까지"""
+    from spam_benchmark import worker_env
+
+    for name, value in worker_env(stand_in).items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv('SPAM_MODEL_REGISTRY', str(stand_in / 'no-registry.json'))
+    events = tmp_path / 'events.jsonl'
+    write_events(events, 12)
+    output_path = tmp_path / 'verdicts.jsonl'
+    summary = rescore(str(events), str(output_path), processes=2, batch_size=3, restart=True)
+    rows = [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()]
+    assert summary['done'] == 12 and summary['scored'] == 11
+    assert [row['id'] for row in rows] == [f'event-{n}' if n != 7 else 7 for n in range(12)]
+    assert all(row['result'] in (0, 1) for row in rows if 'error' not in row)
@@ -0,0 +1,65 @@
+"""spam_residency: 유휴/예산 기준 내림, 상태 조회, 감시 스레드와 동시에 touch"""
+import threading
+
+from spam_residency import Residency
+
+
+class Model:
+    """object_bytes가 크기를 읽을 수 있는 ONNX 세션 흉내 (path 파일 크기)"""
+
+    def __init__(self, path, size):
+        path.write_bytes(b'\0' * size)
+        self.path = path
+
+
+def test_budget_evicts_least_recently_used(tmp_path):
+    unloaded = []
+    residency = Residency(ttl=0, budget=250, unload=unloaded.append)
+    residency.loaded('title', Model(tmp_path / 'title.onnx', 100))
+    residency.loaded('describe', Model(tmp_path / 'describe.onnx', 100))
+    residency.touch('title')
+    residency.loaded('extra', Model(tmp_path / 'extra.onnx', 100))
+    assert unloaded == ['describe']
+
+    status = residency.status()
+    assert sorted(status['resident']) == ['extra', 'title']
+    assert status['resident']['title']['bytes'] == 100
+    assert status['loads'] == 3 and status['evictions'] == 1
+
+
+def test_idle_eviction(tmp_path):
+    unloaded = []
+    residency = Residency(ttl=60, budget=0, unload=unloaded.append)
+    residency.loaded('title', Model(tmp_path / 'title.onnx', 10))
+    residency.loaded('tokenizer')
+    residency.resident['title']['last_used'] -= 120
+    residency.evict_idle()
+    assert unloaded == ['title']
+    assert list(residency.status()['resident']) == ['tokenizer']
+
+
+def test_touch_while_sweeping(tmp_path):
+    residency = Residency(ttl=3600, budget=0, unload=lambda name: None)
+    names = [f'model-{i}' for i in range(50)]
+    for name in names:
+        residency.loaded(name)
+    stop = threading.Event()
+    errors = []
+
+    def sweep():
+        try:
+            while not stop.is_set():
+                residency.evict_idle()
+                residency.status()
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=sweep)
+    thread.start()
+    for _ in range(200):
+        for name in names:
+            residency.touch(name)
+    stop.set()
+    thread.join()
+    assert errors == []
+    assert len(residency.status()['resident']) == len(names)
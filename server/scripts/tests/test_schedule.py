@@ -0,0 +1,64 @@
+"""spam_schedule: 등급 순서/같은 등급 도착 순, 마감 초과 버림, 가득 찼을 때 낮은 등급 양보"""
+import time
+
+import pytest
+
+from spam_schedule import ScheduledQueue, request_schedule
+
+
+def drain(queue, on_expired=None):
+    items = []
+    while (entry := queue.pop(on_expired)) is not None:
+        items.append(entry.item)
+    return items
+
+
+def test_higher_priority_first_then_arrival_order():
+    queue = ScheduledQueue()
+    queue.push('bulk-1', 'bulk')
+    queue.push('normal-1', 'normal')
+    queue.push('interactive-1', 'interactive')
+    queue.push('normal-2', 'normal')
+    queue.push('interactive-2', 'interactive')
+    assert len(queue) == 5
+    assert drain(queue) == ['interactive-1', 'interactive-2', 'normal-1', 'normal-2', 'bulk-1']
+    assert len(queue) == 0
+
+
+def test_expired_entries_are_dropped():
+    queue = ScheduledQueue()
+    queue.push('late', 'interactive', deadline=time.time() - 1)
+    queue.push('open', 'normal', deadline=time.time() + 60)
+    queue.push('no-deadline', 'bulk')
+    expired = []
+    assert drain(queue, on_expired=lambda entry: expired.append(entry.item)) == ['open', 'no-deadline']
+    assert expired == ['late']
+
+
+def test_push_front_keeps_entry_first():
+    queue = ScheduledQueue()
+    queue.push('a')
+    queue.push('b')
+    entry = queue.pop()
+    queue.push_front(entry)
+    assert drain(queue) == ['a', 'b']
+
+
+def test_shed_takes_lowest_and_newest_first():
+    queue = ScheduledQueue()
+    for item, priority in [('n1', 'normal'), ('b1', 'bulk'), ('n2', 'normal'), ('b2', 'bulk'), ('i1', 'interactive')]:
+        queue.push(item, priority)
+    assert queue.lower_count('interactive') == 4
+    assert queue.lower_count('bulk') == 0
+    assert [entry.item for entry in queue.shed('interactive', 3)] == ['b2', 'b1', 'n2']
+    # 같은 등급이나 높은 등급은 꺼내지 않음
+    assert queue.shed('normal', 5) == []
+    assert drain(queue) == ['i1', 'n1']
+
+
+def test_request_schedule_validation():
+    assert request_schedule({}) == ('normal', None)
+    assert request_schedule({'priority': 'bulk', 'deadline': 10}) == ('bulk', 10.0)
+    for request in ({'priority': 'urgent'}, {'deadline': '10'}, {'deadline': True}):
+        with pytest.raises(ValueError):
+            request_schedule(request)
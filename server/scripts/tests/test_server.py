@@ -0,0 +1,59 @@
+"""spam_server: HTTP 요청 파싱 (잘못된 Content-Length는 연결을 끊지 않고 400으로 응답), readyz 응답"""
+import json
+import asyncio
+
+import pytest
+
+from spam_server import MAX_BODY_BYTES, Batcher, SpamServer, content_length
+
+
+def test_content_length_values():
+    assert content_length(None) == 0
+    assert content_length(' 12 ') == 12
+    assert content_length(str(MAX_BODY_BYTES)) == MAX_BODY_BYTES
+    for value in ('abc', '-1', '+5', '1.5', '١٢', str(MAX_BODY_BYTES + 1)):
+        with pytest.raises(ValueError):
+            content_length(value)
+
+
+async def exchange(raw, **options):
+    """raw 요청을 보내고 (상태 코드, Connection 헤더, 본문 JSON)을 돌려받음 (options: SpamServer 인자)"""
+    batcher = Batcher(lambda texts, model_type: [0] * len(texts), max_batch=4, max_wait=0.001, max_queue=16)
+    server = SpamServer(batcher, load=lambda: None, **options)
+    listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+    try:
+        reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+        writer.write(raw)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+    finally:
+        listener.close()
+        await listener.wait_closed()
+        batcher.executor.shutdown()
+    head, _, body = response.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers['Connection'], json.loads(body)
+
+
+@pytest.mark.parametrize('value', ['abc', '-1', str(MAX_BODY_BYTES + 1)])
+def test_invalid_content_length_gets_400(value):
+    raw = f'POST /check HTTP/1.1\r\nContent-Length: {value}\r\n\r\n{{}}'.encode('latin-1')
+    status, connection, body = asyncio.run(exchange(raw))
+    assert status == 400
+    assert connection == 'close'
+    assert 'error' in body
+
+
+def test_valid_request_still_routed():
+    status, connection, body = asyncio.run(exchange(b'GET /healthz HTTP/1.1\r\nConnection: close\r\n\r\n'))
+    assert status == 200
+    assert body['status'] == 'ok'
+
+
+def test_readyz_includes_residency():
+    residency = {'enabled': True, 'resident': {'title': {'bytes': 1, 'idle_seconds': 0.0}}}
+    status, connection, body = asyncio.run(exchange(b'GET /readyz HTTP/1.1\r\nConnection: close\r\n\r\n', residency=lambda: residency))
+    assert status == 503
+    assert body['residency'] == residency
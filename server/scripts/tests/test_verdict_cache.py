@@ -0,0 +1,100 @@
+"""spam_verdict_cache: LRU 정리, 사용 시각/적중 수 일괄 반영, 크기 제한 검사 주기"""
+import sqlite3
+
+import pytest
+
+import spam_verdict_cache
+from spam_verdict_cache import VerdictCache, verdict_key
+
+MODEL = 'hash:torch:fp32:512'
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return tmp_path / 'verdicts.sqlite3'
+
+
+def stored_last_used(path, text):
+    with sqlite3.connect(str(path)) as conn:
+        row = conn.execute('SELECT last_used FROM verdicts WHERE key = ?', (verdict_key(MODEL, 'title', text),)).fetchone()
+    return row and row[0]
+
+
+def entries(path):
+    with sqlite3.connect(str(path)) as conn:
+        return conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+
+
+def test_roundtrip_normalizes_text(cache_path):
+    cache = VerdictCache(cache_path)
+    cache.put(MODEL, 'title', '무료  쿠폰 ', 1)
+    assert cache.get(MODEL, 'title', '무료 쿠폰') == 1
+    assert cache.get(MODEL, 'describe', '무료 쿠폰') is None
+    assert cache.get('other-model', 'title', '무료 쿠폰') is None
+
+
+def test_lookup_does_not_write_until_flush(cache_path, monkeypatch):
+    cache = VerdictCache(cache_path, flush_entries=100, flush_seconds=3600)
+    cache.put(MODEL, 'title', 'a', 0)
+    before = stored_last_used(cache_path, 'a')
+
+    monkeypatch.setattr(spam_verdict_cache.time, 'time', lambda: before + 2 * spam_verdict_cache.TOUCH_RESOLUTION)
+    assert cache.get(MODEL, 'title', 'a') == 0
+    assert stored_last_used(cache_path, 'a') == before
+    cache.flush()
+    assert stored_last_used(cache_path, 'a') == before + 2 * spam_verdict_cache.TOUCH_RESOLUTION
+    assert cache.stats()['total_hits'] == 1
+
+
+def test_recent_entries_are_not_touched_again(cache_path):
+    cache = VerdictCache(cache_path)
+    cache.put(MODEL, 'title', 'a', 0)
+    cache.get(MODEL, 'title', 'a')
+    assert cache.touched == {}
+    assert cache.pending_hits == 1
+
+
+def test_touches_flush_after_enough_lookups(cache_path, monkeypatch):
+    cache = VerdictCache(cache_path, flush_entries=2, flush_seconds=3600)
+    cache.put_many(MODEL, 'title', {'a': 0, 'b': 1})
+    later = stored_last_used(cache_path, 'a') + 2 * spam_verdict_cache.TOUCH_RESOLUTION
+    monkeypatch.setattr(spam_verdict_cache.time, 'time', lambda: later)
+    cache.get(MODEL, 'title', 'a')
+    assert stored_last_used(cache_path, 'a') < later
+    cache.get(MODEL, 'title', 'b')
+    assert stored_last_used(cache_path, 'a') == later
+    assert stored_last_used(cache_path, 'b') == later
+
+
+def test_evicts_least_recently_used(cache_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(spam_verdict_cache.time, 'time', lambda: clock[0])
+    cache = VerdictCache(cache_path, max_entries=3, evict_every=1)
+    for text in 'abc':
+        cache.put(MODEL, 'title', text, 0)
+        clock[0] += 100
+    # a를 다시 사용했으므로 가장 오래 사용하지 않은 항목은 b
+    cache.get(MODEL, 'title', 'a')
+    cache.put(MODEL, 'title', 'd', 1)
+    assert entries(cache_path) == 3
+    assert cache.get(MODEL, 'title', 'b') is None
+    assert cache.get(MODEL, 'title', 'a') == 0
+    assert cache.get(MODEL, 'title', 'd') == 1
+
+
+def test_size_check_runs_every_n_puts(cache_path):
+    cache = VerdictCache(cache_path, max_entries=4, evict_every=3)
+    for index in range(5):
+        cache.put(MODEL, 'title', str(index), 0)
+    # 세 번째 저장에서만 검사했으므로 아직 초과 상태 (최대 evict_every개)
+    assert entries(cache_path) == 5
+    cache.put(MODEL, 'title', '5', 0)
+    assert entries(cache_path) == 4
+
+
+def test_close_flushes_counters(cache_path):
+    cache = VerdictCache(cache_path, flush_seconds=3600)
+    cache.get(MODEL, 'title', 'missing')
+    cache.close()
+    reopened = VerdictCache(cache_path)
+    assert reopened.stats()['total_misses'] == 1
@@ -182,8 +182,8 @@ router.post('/', authenticateToken, async (req: AuthRequest, res) => {
       image: event.image
     })
 
-    // 비동기로 스팸 체크 수행 (사용자는 기다리지 않음)
-    checkSpamAsync(event.id, title, description).catch((error) => {
+    // 비동기로 스팸 체크 수행 (사용자는 기다리지 않음, 새 행사는 우선 처리)
+    checkSpamAsync(event.id, title, description, 'interactive').catch((error) => {
       console.error('비동기 스팸 체크 오류:', error)
     })
 
@@ -1,151 +1,240 @@
-import { spawn } from 'child_process'
+import { spawn, type ChildProcessWithoutNullStreams } from 'child_process'
+import readline from 'readline'
 import path from 'path'
 import { fileURLToPath } from 'url'
 
 const __filename = fileURLToPath(import.meta.url)
 const __dirname = path.dirname(__filename)
 
+interface PendingRequest {
+  resolve: (value: number) => void
+  reject: (error: Error) => void
+  timeoutId: NodeJS.Timeout
+  // 요청을 보낸 워커 (재시작된 이전 워커가 종료될 때 새 워커의 요청까지 실패 처리하지 않도록)
+  owner: ChildProcessWithoutNullStreams
+}
+
 /**
- * 단일 텍스트에 대한 스팸 체크 (Python 프로세스 실행) - 타임아웃 포함
+ * 판정 우선순위 (Python 워커가 높은 등급부터 처리)
+ * interactive: 새로 등록된 행사, normal: 수정 재판정, bulk: 일괄 재판정
  */
-async function checkSingleText(text: string, timeout: number = 600000): Promise<number> {
-  return new Promise((resolve, reject) => {
-    let isResolved = false
-    let timeoutId: NodeJS.Timeout
-
-    const safeResolve = (value: number) => {
-      if (!isResolved) {
-        isResolved = true
-        if (timeoutId) clearTimeout(timeoutId)
-        resolve(value)
+export type SpamCheckPriority = 'interactive' | 'normal' | 'bulk'
+
+// 상주 Python 워커 (모델을 한 번만 로드하고 요청을 줄 단위 JSON으로 처리)
+let worker: ChildProcessWithoutNullStreams | null = null
+let nextRequestId = 1
+const pendingRequests = new Map<number, PendingRequest>()
+
+// 요청 하나가 타임아웃됐다고 워커를 죽이면 다른 대기 중인 요청까지 모두 실패하므로,
+// 워커 재시작은 응답 없이 타임아웃이 연속으로 나거나 상태 확인(ping)에 응답하지 않을 때만
+const MAX_CONSECUTIVE_TIMEOUTS = 3
+const PING_TIMEOUT = Number(process.env.SPAM_WORKER_PING_TIMEOUT_MS) || 60000
+let consecutiveTimeouts = 0
+let pingInFlight = false
+
+// 워커의 마감 시각(deadline)은 Node 타임아웃보다 조금 앞서게 보내서,
+// 대기열에서 밀린 요청은 Node 타임아웃 전에 워커가 expired 응답으로 먼저 정리
+const DEADLINE_MARGIN = 5000
+
+/**
+ * Python stderr 로그 출력 (JSON info/error/warning 메시지 파싱)
+ */
+function logWorkerStderr(errorData: string): void {
+  const lines = errorData.split('\n').filter((line: string) => line.trim())
+  for (const line of lines) {
+    try {
+      // JSON 형식인지 확인
+      if (line.trim().startsWith('{') && line.trim().endsWith('}')) {
+        const jsonData = JSON.parse(line.trim())
+        if (jsonData.info) {
+          // info 메시지는 일반 로그로 출력
+          console.log(`[스팸 모델] ${jsonData.info}`)
+        } else if (jsonData.error) {
+          // error 메시지는 에러 로그로 출력
+          console.error(`[스팸 모델] ${jsonData.error}`)
+        } else if (jsonData.warning) {
+          // warning 메시지는 경고 로그로 출력
+          console.warn(`[스팸 모델] ${jsonData.warning}`)
+        }
+      } else {
+        // JSON 형식이 아니고 경고 메시지가 아니면 출력
+        if (!line.includes('Some weights') && !line.includes('You should probably TRAIN') && line.trim()) {
+          console.log(`[스팸 모델] ${line.trim()}`)
+        }
+      }
+    } catch (e) {
+      // JSON 파싱 실패 시 일반 메시지로 출력 (경고 메시지 제외)
+      if (!line.includes('Some weights') && !line.includes('You should probably TRAIN') && line.trim()) {
+        console.log(`[스팸 모델] ${line.trim()}`)
       }
     }
+  }
+}
 
-    const safeReject = (error: Error) => {
-      if (!isResolved) {
-        isResolved = true
-        if (timeoutId) clearTimeout(timeoutId)
-        reject(error)
-      }
+/**
+ * 워커 하나에 보낸 대기 중인 모든 요청을 실패 처리
+ */
+function rejectAllPending(owner: ChildProcessWithoutNullStreams, error: Error): void {
+  for (const [requestId, pending] of pendingRequests) {
+    if (pending.owner !== owner) continue
+    clearTimeout(pending.timeoutId)
+    pending.reject(error)
+    pendingRequests.delete(requestId)
+  }
+}
+
+/**
+ * 워커 stdout 한 줄(JSON 응답) 처리
+ */
+function handleWorkerLine(line: string): void {
+  if (!line.trim()) return
+
+  let response: { id?: number | null; result?: number; error?: string; expired?: boolean; ready?: boolean }
+  try {
+    response = JSON.parse(line)
+  } catch (parseError) {
+    console.error('[스팸 체크] 워커 응답 파싱 실패:', line.trim())
+    return
+  }
+
+  if (response.ready) {
+    console.log('[스팸 체크] Python 워커 준비 완료')
+    return
+  }
+
+  if (typeof response.id !== 'number') {
+    if (response.error) {
+      console.error(`[스팸 체크] 워커 오류: ${response.error}`)
     }
+    return
+  }
 
-    try {
-      const scriptPath = path.join(__dirname, '../../scripts/spam_check_single.py')
-      const pythonCmd = process.platform === 'win32' ? 'python' : 'python3'
-      
-      const pythonProcess = spawn(pythonCmd, ['-u', scriptPath], {
-        stdio: ['pipe', 'pipe', 'pipe'],
-        shell: false,
-      })
-
-      // 타임아웃 설정
-      timeoutId = setTimeout(() => {
-        if (!isResolved) {
-          console.error(`[스팸 체크] 타임아웃 (${timeout}ms 초과)`)
-          pythonProcess.kill('SIGTERM')
-          safeReject(new Error(`스팸 체크 타임아웃 (${timeout}ms 초과)`))
-        }
-      }, timeout)
+  // 응답이 왔으면 워커는 살아 있음 (앞선 타임아웃은 요청 자체가 오래 걸린 것)
+  consecutiveTimeouts = 0
 
-      let stdout = ''
-      let stderr = ''
-
-      pythonProcess.stdout.on('data', (data) => {
-        const output = data.toString()
-        stdout += output
-        console.log('[스팸 체크 stdout]:', output.trim())
-      })
-
-      pythonProcess.stderr.on('data', (data) => {
-        const errorData = data.toString()
-        stderr += errorData
-        
-        // JSON 형식의 info 메시지 파싱 및 표시
-        const lines = errorData.split('\n').filter((line: string) => line.trim())
-        for (const line of lines) {
-          try {
-            // JSON 형식인지 확인
-            if (line.trim().startsWith('{') && line.trim().endsWith('}')) {
-              const jsonData = JSON.parse(line.trim())
-              if (jsonData.info) {
-                // info 메시지는 일반 로그로 출력
-                console.log(`[스팸 모델] ${jsonData.info}`)
-              } else if (jsonData.error) {
-                // error 메시지는 에러 로그로 출력
-                console.error(`[스팸 모델] ${jsonData.error}`)
-              } else if (jsonData.warning) {
-                // warning 메시지는 경고 로그로 출력
-                console.warn(`[스팸 모델] ${jsonData.warning}`)
-              }
-            } else {
-              // JSON 형식이 아니고 경고 메시지가 아니면 출력
-              if (!line.includes('Some weights') && !line.includes('You should probably TRAIN') && line.trim()) {
-                console.log(`[스팸 모델] ${line.trim()}`)
-              }
-            }
-          } catch (e) {
-            // JSON 파싱 실패 시 일반 메시지로 출력 (경고 메시지 제외)
-            if (!line.includes('Some weights') && !line.includes('You should probably TRAIN') && line.trim()) {
-              console.log(`[스팸 모델] ${line.trim()}`)
-            }
-          }
-        }
-      })
+  const pending = pendingRequests.get(response.id)
+  if (!pending) return
+  pendingRequests.delete(response.id)
+  clearTimeout(pending.timeoutId)
 
-      // 텍스트 정규화 및 전송
-      const textToSend = (text && typeof text === 'string') ? text.trim() : ''
-      console.log('[스팸 체크] Python 프로세스에 텍스트 전송:', textToSend.substring(0, 100))
-      pythonProcess.stdin.write(textToSend, 'utf8')
-      pythonProcess.stdin.end()
-
-      pythonProcess.on('close', (code) => {
-        if (isResolved) return
-
-        console.log('[스팸 체크] Python 프로세스 종료, 코드:', code)
-
-        // stderr에서 JSON 에러 찾기
-        const jsonErrorMatch = stderr.match(/\{"error":\s*"[^"]+"\}/g)
-        if (jsonErrorMatch) {
-          try {
-            const lastErrorJson = jsonErrorMatch[jsonErrorMatch.length - 1]
-            const errorData = JSON.parse(lastErrorJson)
-            safeReject(new Error(`스팸 체크 오류: ${errorData.error}`))
-            return
-          } catch (e) {
-            // JSON 파싱 실패 시 계속 진행
-          }
-        }
+  if (response.expired) {
+    // 워커가 마감 시각까지 처리하지 못해 판정하지 않은 요청 (워커는 정상, 이 요청만 실패)
+    console.warn(`[스팸 체크] 마감 초과: ${response.error}`)
+    pending.reject(new Error(`스팸 체크 마감 초과: ${response.error}`))
+    return
+  }
+  if (response.error) {
+    pending.reject(new Error(`스팸 체크 오류: ${response.error}`))
+    return
+  }
+  // result는 0 (정상) 또는 1 (스팸)
+  pending.resolve(response.result === 1 ? 1 : 0)
+}
 
-        if (code !== 0) {
-          safeReject(new Error(`스팸 체크 스크립트 오류 (코드 ${code})`))
-          return
-        }
+/**
+ * 멈춘 것으로 판단한 워커 종료 (대기 중인 요청은 close 이벤트에서 실패 처리, 다음 요청 때 새로 실행)
+ */
+function restartWorker(pythonProcess: ChildProcessWithoutNullStreams, reason: string): void {
+  if (worker !== pythonProcess) return
+  console.error(`[스팸 체크] 워커 재시작: ${reason}`)
+  worker = null
+  consecutiveTimeouts = 0
+  pythonProcess.kill('SIGTERM')
+}
 
-        if (!stdout.trim()) {
-          safeReject(new Error('스팸 체크 결과가 비어있습니다'))
-          return
-        }
+/**
+ * 워커 상태 확인: ping도 판정 요청과 같은 대기열을 거치므로, PING_TIMEOUT 안에 pong이 없으면 판정 루프가 멈춘 것으로 보고 재시작
+ */
+function pingWorker(pythonProcess: ChildProcessWithoutNullStreams): void {
+  if (pingInFlight || worker !== pythonProcess) return
+  pingInFlight = true
+  const requestId = nextRequestId++
+  const done = () => { pingInFlight = false }
+  const timeoutId = setTimeout(() => {
+    if (pendingRequests.delete(requestId)) {
+      done()
+      restartWorker(pythonProcess, `상태 확인 응답 없음 (${PING_TIMEOUT}ms 초과)`)
+    }
+  }, PING_TIMEOUT)
+  pendingRequests.set(requestId, { resolve: done, reject: done, timeoutId, owner: pythonProcess })
+  pythonProcess.stdin.write(JSON.stringify({ id: requestId, ping: true, priority: 'interactive' }) + '\n', 'utf8')
+}
+
+/**
+ * 상주 Python 워커 반환 (없거나 종료되었으면 새로 실행)
+ */
+function getWorker(): ChildProcessWithoutNullStreams {
+  if (worker) return worker
 
-        try {
-          console.log('[스팸 체크] stdout 파싱 시도:', stdout.trim())
-          const result = JSON.parse(stdout.trim())
-          if (result.error) {
-            safeReject(new Error(`스팸 체크 오류: ${result.error}`))
-            return
+  const scriptPath = path.join(__dirname, '../../scripts/spam_check_single.py')
+  const pythonCmd = process.platform === 'win32' ? 'python' : 'python3'
+
+  console.log('[스팸 체크] Python 워커 시작 (serve 모드)')
+  const pythonProcess = spawn(pythonCmd, ['-u', scriptPath, '--serve'], {
+    stdio: ['pipe', 'pipe', 'pipe'],
+    shell: false,
+  })
+
+  const stdoutReader = readline.createInterface({ input: pythonProcess.stdout })
+  stdoutReader.on('line', handleWorkerLine)
+
+  pythonProcess.stderr.on('data', (data) => {
+    logWorkerStderr(data.toString())
+  })
+
+  pythonProcess.on('close', (code) => {
+    console.log('[스팸 체크] Python 워커 종료, 코드:', code)
+    if (worker === pythonProcess) worker = null
+    rejectAllPending(pythonProcess, new Error(`스팸 체크 워커 종료 (코드 ${code})`))
+  })
+
+  pythonProcess.on('error', (error) => {
+    if (worker === pythonProcess) worker = null
+    rejectAllPending(pythonProcess, new Error(`스팸 체크 프로세스 실행 실패: ${error.message}`))
+  })
+
+  // 워커가 죽은 상태에서 쓰기 시 발생하는 EPIPE는 close 이벤트에서 처리
+  pythonProcess.stdin.on('error', (error) => {
+    console.error('[스팸 체크] 워커 stdin 오류:', error.message)
+  })
+
+  worker = pythonProcess
+  return pythonProcess
+}
+
+/**
+ * 단일 텍스트에 대한 스팸 체크 (상주 Python 워커에 요청) - 타임아웃 포함
+ * 타임아웃보다 조금 앞선 시각을 deadline으로 함께 보내므로, 워커는 그때까지 처리하지 못한 요청을 판정하지 않고 expired로 응답
+ */
+async function checkSingleText(text: string, priority: SpamCheckPriority = 'normal', timeout: number = 600000): Promise<number> {
+  return new Promise((resolve, reject) => {
+    try {
+      const pythonProcess = getWorker()
+      const requestId = nextRequestId++
+
+      // 타임아웃 설정 (이 요청만 실패 처리, 워커는 연속 타임아웃이나 ping 무응답일 때만 재시작)
+      const timeoutId = setTimeout(() => {
+        if (pendingRequests.delete(requestId)) {
+          console.error(`[스팸 체크] 타임아웃 (${timeout}ms 초과)`)
+          reject(new Error(`스팸 체크 타임아웃 (${timeout}ms 초과)`))
+          consecutiveTimeouts++
+          if (consecutiveTimeouts >= MAX_CONSECUTIVE_TIMEOUTS) {
+            restartWorker(pythonProcess, `응답 없이 타임아웃 ${consecutiveTimeouts}회 연속`)
+          } else {
+            pingWorker(pythonProcess)
           }
-          // result는 0 (정상) 또는 1 (스팸)
-          console.log('[스팸 체크] 파싱 결과:', result)
-          safeResolve(result.result === 1 ? 1 : 0)
-        } catch (parseError) {
-          safeReject(new Error(`스팸 체크 결과 파싱 실패: ${parseError instanceof Error ? parseError.message : String(parseError)}`))
         }
-      })
+      }, timeout)
+
+      pendingRequests.set(requestId, { resolve, reject, timeoutId, owner: pythonProcess })
 
-      pythonProcess.on('error', (error) => {
-        safeReject(new Error(`스팸 체크 프로세스 실행 실패: ${error.message}`))
-      })
+      // 텍스트 정규화 및 전송
+      const textToSend = (text && typeof text === 'string') ? text.trim() : ''
+      console.log('[스팸 체크] Python 워커에 텍스트 전송:', textToSend.substring(0, 100))
+      const deadline = (Date.now() + timeout - Math.min(DEADLINE_MARGIN, timeout / 10)) / 1000
+      pythonProcess.stdin.write(JSON.stringify({ id: requestId, text: textToSend, priority, deadline }) + '\n', 'utf8')
     } catch (error) {
-      safeReject(new Error(`스팸 체크 초기화 실패: ${error instanceof Error ? error.message : String(error)}`))
+      reject(new Error(`스팸 체크 초기화 실패: ${error instanceof Error ? error.message : String(error)}`))
     }
   })
 }
@@ -156,12 +245,13 @@ async function checkSingleText(text: string, timeout: number = 600000): Promise<
  * title이 스팸이면 즉시 스팸으로 판정 (description 체크 생략)
  * @param title 행사 제목
  * @param description 행사 설명
+ * @param priority 판정 우선순위 (새 행사는 interactive)
  * @returns true면 스팸, false면 정상
  */
-export async function checkSpam(title: string, description: string): Promise<boolean> {
+export async function checkSpam(title: string, description: string, priority: SpamCheckPriority = 'normal'): Promise<boolean> {
   try {
     // title 먼저 체크
-    const titleResult = await checkSingleText(title || '')
+    const titleResult = await checkSingleText(title || '', priority)
     console.log(`[스팸 체크] title 판정: ${titleResult === 1 ? '스팸' : '정상'} - "${title?.substring(0, 50)}${title && title.length > 50 ? '...' : ''}"`)
     
     // title이 스팸이면 즉시 스팸으로 판정 (description 체크 생략)
@@ -171,7 +261,7 @@ export async function checkSpam(title: string, description: string): Promise<boo
     }
     
     // title이 정상이면 description 체크
-    const descriptionResult = await checkSingleText(description || '')
+    const descriptionResult = await checkSingleText(description || '', priority)
     console.log(`[스팸 체크] description 판정: ${descriptionResult === 1 ? '스팸' : '정상'} - "${description?.substring(0, 50)}${description && description.length > 50 ? '...' : ''}"`)
     
     // 둘 다 0이면 정상(스팸 아님), 그 외에는 스팸
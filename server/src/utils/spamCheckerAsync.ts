@@ -1,12 +1,13 @@
-import { checkSpam } from './spamChecker.js'
+import { checkSpam, type SpamCheckPriority } from './spamChecker.js'
 import { EventModel } from '../models/Event.js'
 
 /**
  * 비동기로 스팸 체크를 수행하고 결과를 DB에 업데이트
  * title이 스팸이면 즉시 스팸으로 판정 (description 체크 생략)
  * 스팸이 아니면 approved로, 스팸이면 spam으로 상태 업데이트
+ * priority: 새로 등록된 행사는 interactive로 보내 수정 재판정/일괄 재판정보다 먼저 처리
  */
-export async function checkSpamAsync(eventId: number, title: string, description: string): Promise<void> {
+export async function checkSpamAsync(eventId: number, title: string, description: string, priority: SpamCheckPriority = 'normal'): Promise<void> {
   const MAX_RETRIES = 3
   
   console.log(`\n[스팸 체크] 행사 ${eventId} 스팸 체크 시작`)
@@ -18,7 +19,7 @@ export async function checkSpamAsync(eventId: number, title: string, description
         console.log(`[스팸 체크] 행사 ${eventId} 재시도 (${retryCount + 1}/${MAX_RETRIES})`)
       }
       
-      const isSpam = await checkSpam(title, description)
+      const isSpam = await checkSpam(title, description, priority)
       
       // 결과에 따라 상태 업데이트
       const status = isSpam ? 'spam' : 'approved'